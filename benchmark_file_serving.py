@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark file responses: 8KB generator vs large-buffer reads vs pathsend.
+
+Writes a throwaway file (256MB by default) and serves it through each
+response type to a local socket that is drained by a reader thread, the way
+a server writes to a client. For pathsend the "server" side transfers the file
+with os.sendfile, as servers implementing the extension do. Reports throughput
+and process CPU seconds per GB served.
+
+Usage: python benchmark_file_serving.py [--size-mb 256] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from fastapi.responses import StreamingResponse
+from file_serving import RangeFileResponse
+
+def legacy_response(path: str):
+    """The generator-based response downloads used before serve_file"""
+    def file_stream():
+        with open(path, "rb") as f:
+            while chunk := f.read(8192):
+                yield chunk
+    return StreamingResponse(file_stream(), media_type="application/octet-stream")
+
+def range_response(path: str):
+    return RangeFileResponse(path, stat_result=os.stat(path), media_type="application/octet-stream")
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def drain(sock: socket.socket, received: list):
+    total = 0
+    while chunk := sock.recv(1024 * 1024):
+        total += len(chunk)
+    received.append(total)
+
+async def serve(make_response, path: str, pathsend: bool) -> int:
+    server_sock, client_sock = socket.socketpair()
+    received = []
+    reader = threading.Thread(target=drain, args=(client_sock, received))
+    reader.start()
+    scope = {"type": "http", "method": "GET", "headers": [], "extensions": {}}
+    if pathsend:
+        scope["extensions"]["http.response.pathsend"] = {}
+
+    requested = []
+
+    async def receive():
+        # The request body comes first; after it the client simply never disconnects
+        if not requested:
+            requested.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            server_sock.sendall(message.get("body", b""))
+        elif message["type"] == "http.response.pathsend":
+            with open(message["path"], "rb") as f:
+                offset, size = 0, os.fstat(f.fileno()).st_size
+                while offset < size:
+                    offset += os.sendfile(server_sock.fileno(), f.fileno(), offset, size - offset)
+
+    try:
+        await make_response(path)(scope, receive, send)
+    finally:
+        server_sock.shutdown(socket.SHUT_WR)
+        reader.join()
+        server_sock.close()
+        client_sock.close()
+    return received[0]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "benchmark.bin")
+    print(f"Writing {args.size_mb}MB test file...")
+    with open(path, "wb") as f:
+        for _ in range(args.size_mb):
+            f.write(os.urandom(1024 * 1024))
+    size = os.path.getsize(path)
+    gigabytes = size / 1024 ** 3
+
+    cases = [
+        ("generator 8KB", legacy_response, False),
+        ("async reads 1MB", range_response, False),
+        ("pathsend", range_response, True)
+    ]
+    print()
+    print(f"{'response':<18} {'MB/s':>10} {'CPU s/GB':>10}")
+    for name, make_response, pathsend in cases:
+        throughputs, cpu_per_gb = [], []
+        for _ in range(args.repeat):
+            cpu_started, started = cpu_seconds(), time.perf_counter()
+            sent = asyncio.run(serve(make_response, path, pathsend))
+            elapsed, cpu = time.perf_counter() - started, cpu_seconds() - cpu_started
+            assert sent == size, f"{name} sent {sent} of {size} bytes"
+            throughputs.append(size / 1024 ** 2 / elapsed)
+            cpu_per_gb.append(cpu / gigabytes)
+        print(f"{name:<18} {statistics.median(throughputs):>10.0f} {statistics.median(cpu_per_gb):>10.2f}")
+    os.remove(path)
+
+if __name__ == "__main__":
+    main()
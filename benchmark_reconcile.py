@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark payment reconciliation against a local Paystack stub.
+
+Builds a throwaway SQLite database with pending transactions (10k by default)
+and a stub of the Paystack verify endpoint that answers after ``--latency-ms``
+with a mix of outcomes (5% success, 25% failed, 55% abandoned, 15% still
+ongoing). Each run resets the rows to pending and reconciles them through
+PaymentService.verify_payment and the shared Paystack client; successful
+payments are fulfilled as in production. A sequential baseline (one
+verification at a time, one commit per row) runs on ``--baseline-rows``.
+
+Usage: python benchmark_reconcile.py [--rows 10000] [--latency-ms 20]
+                                     [--concurrency 10,25,50] [--baseline-rows 500]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+OUTCOMES = [("success", 5), ("failed", 25), ("abandoned", 55), ("ongoing", 15)]
+
+def outcome(reference: str) -> str:
+    bucket = int(hashlib.md5(reference.encode()).hexdigest(), 16) % 100
+    for status, share in OUTCOMES:
+        if bucket < share:
+            return status
+        bucket -= share
+    return "ongoing"
+
+def start_stub(latency: float) -> int:
+    """Serve the verify endpoint from a thread with its own event loop; returns the port"""
+    from aiohttp import web
+    started = threading.Event()
+    port = []
+
+    async def verify(request):
+        await asyncio.sleep(latency)
+        reference = request.match_info["reference"]
+        return web.json_response({"status": True, "data": {
+            "reference": reference, "status": outcome(reference), "amount": 1000, "currency": "NGN",
+            "customer": {"email": "buyer@example.com"}, "paid_at": None, "gateway_response": ""
+        }})
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get("/transaction/verify/{reference}", verify)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0, backlog=1024)
+        await site.start()
+        port.append(site._server.sockets[0].getsockname()[1])
+        started.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    started.wait()
+    return port[0]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--latency-ms", type=int, default=20)
+    parser.add_argument("--concurrency", default="10,25,50")
+    parser.add_argument("--baseline-rows", type=int, default=500)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    directory = tempfile.mkdtemp()
+    port = start_stub(args.latency_ms / 1000)
+    # Point the app modules at the throwaway database and the stub before importing them
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'reconcile.db')}",
+        "BUNDLE_DIR": os.path.join(directory, "bundles"),
+        "PAYSTACK_BASE_URL": f"http://127.0.0.1:{port}",
+        "PAYSTACK_MAX_CONCURRENCY": str(max(levels)),
+        "PAYSTACK_MAX_CONNECTIONS": str(max(levels))
+    })
+    os.environ.setdefault("SMTP_USERNAME", "benchmark")  # No mail is sent
+    os.environ.setdefault("SMTP_PASSWORD", "benchmark")
+    from sqlalchemy import delete, insert
+    from database import Base, SessionLocal, engine
+    from models_mysql import BundleJob, DownloadToken, License, OrderItem, Product, Transaction, User
+    from payment_service import payment_service
+    from paystack_client import paystack_client
+    from bundle_jobs import bundle_jobs
+    from reconcile_payments import PaymentReconciler
+    logging.disable(logging.WARNING)  # Per-payment logs would dominate the timings
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        session.add(User(id="u1", email="buyer@example.com", name="Buyer"))
+        session.add(Product(id="p1", name="Bot", slug="bot", price=10))
+        session.commit()
+
+    def reset(rows: int):
+        created_at = datetime.utcnow() - timedelta(hours=1)
+        with SessionLocal() as session:
+            for model in (License, OrderItem, BundleJob, DownloadToken, Transaction):
+                session.execute(delete(model))
+            session.execute(insert(Transaction), [{
+                "id": str(uuid.uuid4()), "user_id": "u1", "paystack_reference": f"bench-{uuid.uuid4().hex}",
+                "amount": 10, "currency": "NGN", "status": "pending", "created_at": created_at,
+                "purchased_items": [{"id": "p1", "price": 10, "quantity": 1}]
+            } for _ in range(rows)])
+            session.commit()
+
+    def run(concurrency: int, batch_size: int, rows: int):
+        reset(rows)
+        reconciler = PaymentReconciler(
+            SessionLocal, payment_service, concurrency=concurrency, batch_size=batch_size,
+            min_age_minutes=15, max_age_days=7
+        )
+        started = time.perf_counter()
+        stats = asyncio.run(reconciler.run())
+        elapsed = time.perf_counter() - started
+        asyncio.run(paystack_client.close())
+        return elapsed, stats
+
+    print(f"Stub latency {args.latency_ms}ms, {args.rows} pending rows")
+    print()
+    print(f"{'run':<28} {'rows':>6} {'seconds':>8} {'rows/s':>8} {'fulfilled':>10} {'errors':>7}")
+    cases = [("sequential, commit per row", 1, 1, args.baseline_rows)]
+    cases += [(f"concurrency {level}, batch 200", level, 200, args.rows) for level in levels]
+    for name, concurrency, batch_size, rows in cases:
+        elapsed, stats = run(concurrency, batch_size, rows)
+        assert stats["scanned"] == rows, stats
+        print(
+            f"{name:<28} {rows:>6} {elapsed:>8.2f} {rows / elapsed:>8.0f} "
+            f"{stats.get('success', 0):>10} {stats.get('errors', 0) + stats.get('apply_errors', 0):>7}"
+        )
+    bundle_jobs.shutdown()
+
+if __name__ == "__main__":
+    main()
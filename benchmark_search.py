@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark product search: ILIKE scan vs the full-text search index.
+
+Builds a throwaway SQLite database with synthetic products (100k by default),
+then times the storefront search query with both strategies.
+
+Usage: python benchmark_search.py [--products 100000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import Product
+from search_index import SearchIndex
+
+DOMAIN_WORDS = [
+    "trading", "bot", "indicator", "scalper", "grid", "hedge", "martingale", "trend",
+    "breakout", "signal", "copier", "telegram", "risk", "manager", "session", "volume",
+    "momentum", "oscillator", "fibonacci", "pivot", "supply", "demand", "news", "filter",
+    "dashboard", "journal", "backtest", "optimizer", "portfolio", "currency", "gold", "index"
+]
+CATEGORIES = ["trading-bot", "indicator", "analysis-tool", "risk-management", "education"]
+QUERIES = ["scalper", "trend break", "telegram copier", "gold hedge grid", "fibo", "xyzzy"]
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "zu", "pe", "si", "do", "ga", "bi", "fe", "hu", "jo"]
+
+def make_vocabulary(size: int):
+    """Filler vocabulary so that domain words are selective, as in real descriptions"""
+    vocabulary = set()
+    while len(vocabulary) < size:
+        vocabulary.add("".join(random.choice(SYLLABLES) for _ in range(random.randint(2, 4))))
+    return sorted(vocabulary)
+
+def words(count: int, vocabulary) -> str:
+    picked = []
+    for _ in range(count):
+        if random.random() < 0.03:
+            picked.append(random.choice(DOMAIN_WORDS))
+        else:
+            picked.append(random.choice(vocabulary))
+    return " ".join(picked)
+
+def populate(session_factory, count: int):
+    vocabulary = make_vocabulary(20000)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "name": f"{words(3, vocabulary).title()} {i}",
+            "slug": f"product-{i}",
+            "description": words(120, vocabulary),
+            "short_description": words(12, vocabulary),
+            "price": round(random.uniform(10, 500), 2),
+            "category": random.choice(CATEGORIES),
+            "is_active": True,
+            "is_featured": i % 50 == 0,
+            "rating": round(random.uniform(0, 5), 1),
+            "created_at": now - timedelta(minutes=i)
+        })
+    session = session_factory()
+    for start in range(0, len(rows), 5000):
+        session.execute(insert(Product), rows[start:start + 5000])
+    session.commit()
+    session.close()
+
+def time_query(session_factory, index: SearchIndex, term: str, repeat: int):
+    session = session_factory()
+    timings = []
+    result_count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        query = session.query(Product.id).filter(Product.is_active == True)
+        query, score = index.apply(query, Product, term)
+        if score is not None:
+            query = query.order_by(score.desc())
+        else:
+            query = query.order_by(Product.created_at.desc())
+        result_count = len(query.limit(50).all())
+        timings.append((time.perf_counter() - started) * 1000)
+    session.close()
+    return statistics.median(timings), max(timings), result_count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(42)
+    db_path = os.path.join(tempfile.mkdtemp(), "search_benchmark.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    session_factory = sessionmaker(bind=engine)
+    Base.metadata.create_all(bind=engine, tables=[Product.__table__])
+
+    print(f"Populating {args.products} products...")
+    started = time.perf_counter()
+    populate(session_factory, args.products)
+    print(f"  done in {time.perf_counter() - started:.1f}s")
+
+    ilike_index = SearchIndex(engine)  # never set up: falls back to ILIKE
+    fts_index = SearchIndex(engine)
+    started = time.perf_counter()
+    fts_index.setup()
+    print(f"Built full-text index in {time.perf_counter() - started:.1f}s (enabled={fts_index.enabled})")
+
+    print()
+    print(f"{'query':<20} {'ILIKE p50':>10} {'ILIKE max':>10} {'FTS p50':>10} {'FTS max':>10} {'hits':>6}")
+    for term in QUERIES:
+        ilike_p50, ilike_max, _ = time_query(session_factory, ilike_index, term, args.repeat)
+        fts_p50, fts_max, hits = time_query(session_factory, fts_index, term, args.repeat)
+        print(f"{term:<20} {ilike_p50:>8.2f}ms {ilike_max:>8.2f}ms {fts_p50:>8.2f}ms {fts_max:>8.2f}ms {hits:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models_mysql import BundleJob, DownloadToken
+from zip_stream import ZipStream
+from bundle_store import BundleStore, bundle_store
+from config import settings
+from logging_config import file_logger
+
+# Builds the bundle of a transaction: (stream, download file name), or None
+BundleFactory = Callable[[Session, str, str], Optional[Tuple[ZipStream, str]]]
+
+class BundleJobs:
+    """Builds post-payment product bundles in a process pool.
+
+    Fulfillment records a ``bundle_jobs`` row and returns straight away; the
+    ZIP is compressed in a worker process into the bundle store and, once
+    written, its path is stored on the job and on the download token, which
+    from then on serves the finished file. The worker process also hashes
+    the files for the store key, so requests never read them; a bundle
+    already in the store is used as is, and jobs of one worker waiting for
+    the same bundle share a build. Jobs are claimed with a conditional UPDATE, so a job is built once
+    even when several app workers try to start it, and jobs that never
+    finished (worker restarts, crashes) are started again the next time
+    someone asks about them or on startup.
+    """
+
+    def __init__(self, session_factory, store: BundleStore, max_workers: int, stale_seconds: int):
+        self.session_factory = session_factory
+        self.store = store
+        self.max_workers = max_workers
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, Future] = {}
+        self._building: Dict[tuple, Future] = {}
+        if hasattr(os, "register_at_fork"):
+            # A pool created before fork belongs to the parent process
+            os.register_at_fork(after_in_child=self._forget_pool)
+
+    def _forget_pool(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._inflight = {}
+        self._building = {}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers only import zip_stream, not the app
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def enqueue(self, db: Session, transaction_id: str, download_token_id: str, file_name: str, stream: ZipStream) -> BundleJob:
+        """Record a bundle build for a download token and start it"""
+        job = BundleJob(
+            transaction_id=transaction_id,
+            download_token_id=download_token_id,
+            file_name=file_name,
+            status="pending"
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self.start(job.id, stream)
+        db.refresh(job)
+        return job
+
+    def start(self, job_id: str, stream: ZipStream) -> bool:
+        """Claim a pending or stalled job and submit its build; False when someone else has it"""
+        now = datetime.utcnow()
+        session = self.session_factory()
+        try:
+            claimed = session.execute(
+                update(BundleJob)
+                .where(
+                    BundleJob.id == job_id,
+                    or_(
+                        BundleJob.status == "pending",
+                        and_(BundleJob.status == "building", BundleJob.started_at < now - timedelta(seconds=self.stale_seconds))
+                    )
+                )
+                .values(status="building", started_at=now, attempts=BundleJob.attempts + 1)
+            ).rowcount
+            session.commit()
+        finally:
+            session.close()
+        if not claimed:
+            return False
+
+        try:
+            identity = stream.identity()
+            pool = self._pool()
+            with self._lock:
+                future = self._building.get(identity)
+                if future is None:
+                    future = pool.submit(stream.write_content_addressed, self.store.directory, self.store.key_length)
+                    self._building[identity] = future
+                self._inflight[job_id] = future
+        except Exception as e:
+            self._finish(job_id, "", error=e)
+            return False
+        future.add_done_callback(lambda done: self._on_done(job_id, identity, done))
+        file_logger.info(f"Started bundle build {job_id}")
+        return True
+
+    def _on_done(self, job_id: str, identity: tuple, future: Future):
+        with self._lock:
+            self._inflight.pop(job_id, None)
+            if self._building.get(identity) is future:
+                del self._building[identity]
+        if future.cancelled():
+            return
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            # Start a fresh pool for the next build
+            with self._lock:
+                self._executor = None
+        if error is not None:
+            self._finish(job_id, "", error=error)
+            return
+        path, size, stored = future.result()
+        if stored:
+            file_logger.info(f"Bundle build {job_id} found {os.path.basename(path)} in the store")
+            self.store.lookup(path)
+        else:
+            self.store.count_lookup(False)
+            self.store.evict(keep=path)
+        self._finish(job_id, path, size=size)
+
+    def _finish(self, job_id: str, path: str, size: Optional[int] = None, error: Optional[BaseException] = None):
+        """Mark a build ready (activating its download token) or failed"""
+        session = self.session_factory()
+        try:
+            job = session.get(BundleJob, job_id)
+            if job is None:
+                return
+            job.finished_at = datetime.utcnow()
+            if error is None:
+                job.status = "ready"
+                job.file_path = path
+                job.file_size = size
+                token = session.get(DownloadToken, job.download_token_id)
+                if token is not None:
+                    token.file_path = path
+            else:
+                job.status = "failed"
+                job.error_message = str(error)[:500]
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            file_logger.error(f"Failed to record bundle build {job_id}: {e}")
+            return
+        finally:
+            session.close()
+
+        if error is None:
+            file_logger.info(f"Bundle build {job_id} ready ({size} bytes)")
+        else:
+            file_logger.error(f"Bundle build {job_id} failed: {error}")
+
+    def is_stalled(self, job: BundleJob) -> bool:
+        """Whether a job is waiting for a build nobody is running"""
+        if job.status == "pending":
+            return True
+        return (
+            job.status == "building"
+            and job.started_at is not None
+            and job.started_at < datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        )
+
+    def resume(self, db: Session, job: BundleJob, bundle_factory: BundleFactory) -> bool:
+        """Start a stalled job again; the bundle is rebuilt from its transaction"""
+        if not self.is_stalled(job):
+            return False
+        token = db.get(DownloadToken, job.download_token_id)
+        bundle = bundle_factory(db, job.transaction_id, token.user_id) if token else None
+        if bundle is None:
+            self._finish(job.id, "", error=ValueError("Products for the bundle no longer exist"))
+            return False
+        return self.start(job.id, bundle[0])
+
+    def rebuild(self, db: Session, token: DownloadToken, job: Optional[BundleJob], bundle_factory: BundleFactory) -> Optional[BundleJob]:
+        """Build a token's bundle again after it was evicted from the store.
+
+        Tokens issued before the store (no job, zip in a removed temporary
+        directory) get a new job. Returns the job, or None when the products
+        no longer exist.
+        """
+        bundle = bundle_factory(db, token.transaction_id, token.user_id)
+        if bundle is None:
+            return None
+        if job is None:
+            return self.enqueue(db, token.transaction_id, token.id, bundle[1], bundle[0])
+        # Only one app worker gets to reset the finished job
+        reset = db.execute(
+            update(BundleJob)
+            .where(BundleJob.id == job.id, BundleJob.status == "ready")
+            .values(status="pending", file_path=None, file_size=None, started_at=None, finished_at=None)
+        ).rowcount
+        db.commit()
+        if reset:
+            file_logger.info(f"Rebuilding evicted bundle of job {job.id}")
+            self.start(job.id, bundle[0])
+        db.refresh(job)
+        return job
+
+    def resume_stalled(self, bundle_factory: BundleFactory) -> int:
+        """Start every stalled job; called when the app starts"""
+        session = self.session_factory()
+        try:
+            jobs = session.query(BundleJob).filter(BundleJob.status.in_(["pending", "building"])).all()
+            return sum(self.resume(session, job, bundle_factory) for job in jobs)
+        finally:
+            session.close()
+
+    def job_for_token(self, db: Session, download_token_id: str) -> Optional[BundleJob]:
+        return db.query(BundleJob).filter(
+            BundleJob.download_token_id == download_token_id
+        ).order_by(BundleJob.created_at.desc()).first()
+
+    def job_for_transaction(self, db: Session, transaction_id: str) -> Optional[BundleJob]:
+        return db.query(BundleJob).filter(
+            BundleJob.transaction_id == transaction_id
+        ).order_by(BundleJob.created_at.desc()).first()
+
+    def shutdown(self):
+        """Stop the pool; builds that did not finish go back to pending"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            unfinished = list(self._inflight)
+            self._inflight = {}
+            self._building = {}
+        if executor is None:
+            return
+        executor.shutdown(wait=False, cancel_futures=True)
+        if unfinished:
+            session = self.session_factory()
+            try:
+                session.execute(
+                    update(BundleJob)
+                    .where(BundleJob.id.in_(unfinished), BundleJob.status == "building")
+                    .values(status="pending", started_at=None)
+                )
+                session.commit()
+            finally:
+                session.close()
+
+# Create global bundle jobs instance
+bundle_jobs = BundleJobs(
+    SessionLocal,
+    store=bundle_store,
+    max_workers=settings.bundle_build_workers,
+    stale_seconds=settings.bundle_build_stale_seconds
+)
@@ -0,0 +1,23 @@
+from package_cache import DiskLRU
+from zip_stream import ZipStream
+from config import settings
+
+class BundleStore(DiskLRU):
+    """Content-addressed store of the post-payment product bundles.
+
+    A bundle is stored as ``{key}.zip``, where the key is the fingerprint of
+    what goes into it (entry names and the SHA-256 of every file and README),
+    so customers buying the same products share one file. The store is kept
+    under ``max_bytes`` by evicting the least recently downloaded bundles;
+    download tokens pointing at an evicted bundle have it rebuilt on their
+    next use.
+    """
+
+    # Hex digits of the fingerprint used as the file name
+    key_length = 40
+
+    def bundle_key(self, stream: ZipStream) -> str:
+        return stream.fingerprint(self.file_digest)[:self.key_length]
+
+# Create global bundle store instance
+bundle_store = BundleStore(settings.bundle_dir, max_bytes=settings.bundle_store_max_bytes)
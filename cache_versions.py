@@ -0,0 +1,99 @@
+import sys
+import threading
+import uuid
+from typing import Dict, Iterable, Tuple
+import redis
+from config import settings
+from logging_config import app_logger
+
+# Redis client for sharing version counters between workers
+redis_client = None
+try:
+    redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+    redis_client.ping()
+except Exception:
+    redis_client = None
+
+class CacheVersions:
+    """Named version counters used to invalidate in-process caches.
+
+    Counters live in Redis when it is reachable so that a write handled by one
+    worker invalidates the caches of every worker. Without Redis the counters
+    are process-local and caches fall back to their TTL for cross-worker
+    freshness.
+    """
+
+    key_prefix = "jarvistrade:cache_version:"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local: Dict[str, int] = {}
+        # Distinguishes counters that restarted from zero (process restart or
+        # Redis flush) from the counters they replaced
+        self._local_epoch = uuid.uuid4().hex[:12]
+
+    @property
+    def shared(self) -> bool:
+        """Whether versions are shared between workers"""
+        return redis_client is not None
+
+    def get(self, name: str) -> int:
+        """Return the current version of a named cache scope"""
+        if redis_client:
+            try:
+                value = redis_client.get(self.key_prefix + name)
+                return int(value) if value else 0
+            except Exception as e:
+                app_logger.warning(f"Cache version lookup failed for {name}: {e}")
+        with self._lock:
+            return self._local.get(name, 0)
+
+    def get_many(self, names: Iterable[str]) -> Tuple[int, ...]:
+        """Return the current versions of several cache scopes in one lookup"""
+        names = list(names)
+        if redis_client:
+            try:
+                values = redis_client.mget([self.key_prefix + name for name in names])
+                return tuple(int(value) if value else 0 for value in values)
+            except Exception as e:
+                app_logger.warning(f"Cache version lookup failed for {', '.join(names)}: {e}")
+        with self._lock:
+            return tuple(self._local.get(name, 0) for name in names)
+
+    def bump(self, name: str) -> int:
+        """Advance the version of a named cache scope and return the new value"""
+        with self._lock:
+            self._local[name] = self._local.get(name, 0) + 1
+            local_value = self._local[name]
+        if redis_client:
+            try:
+                return int(redis_client.incr(self.key_prefix + name))
+            except Exception as e:
+                app_logger.warning(f"Cache version bump failed for {name}: {e}")
+        return local_value
+
+    def token(self, names: Iterable[str]) -> str:
+        """Return an opaque token that changes whenever any named version changes"""
+        names = list(names)
+        if redis_client:
+            try:
+                epoch_key = self.key_prefix + "epoch"
+                values = redis_client.mget([epoch_key] + [self.key_prefix + name for name in names])
+                epoch = values[0]
+                if epoch is None:
+                    redis_client.setnx(epoch_key, uuid.uuid4().hex[:12])
+                    epoch = redis_client.get(epoch_key)
+                return ":".join([epoch] + [value or "0" for value in values[1:]])
+            except Exception as e:
+                app_logger.warning(f"Cache version token lookup failed: {e}")
+        with self._lock:
+            return ":".join([self._local_epoch] + [str(self._local.get(name, 0)) for name in names])
+
+# Create global cache versions instance
+cache_versions = CacheVersions()
+
+if __name__ == "__main__":
+    # Invalidate caches after writing to the database outside the API,
+    # e.g. python cache_versions.py catalog blog
+    for name in sys.argv[1:]:
+        print(f"✅ {name} cache version: {cache_versions.bump(name)}")
@@ -0,0 +1,320 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session, load_only
+from models_mysql import Product
+from cache_versions import cache_versions
+from config import settings
+
+# Price fields that are stored in USD and converted to the user's currency
+PRODUCT_PRICE_FIELDS = ("price", "original_price", "rental_price")
+
+CURRENCY_SYMBOLS = {
+    "USD": "$",
+    "NGN": "₦",
+    "EUR": "€",
+    "GBP": "£"
+}
+
+# Catalog payload fields and how each is read from a Product. Fields mapped to
+# None are derived from the currency rather than loaded from a column.
+PRODUCT_FIELDS: Dict[str, Optional[Callable[[Product], Any]]] = {
+    "id": lambda product: product.id,
+    "name": lambda product: product.name,
+    "slug": lambda product: product.slug,
+    "description": lambda product: product.description,
+    "short_description": lambda product: product.short_description,
+    "price": lambda product: product.price,
+    "original_price": lambda product: product.original_price,
+    "category": lambda product: product.category,
+    "platform": lambda product: product.platform or "MT4",
+    "image": lambda product: product.image,
+    "tags": lambda product: product.tags or [],
+    "features": lambda product: product.features or [],
+    "images": lambda product: product.images or [],
+    "rating": lambda product: product.rating or 0.0,
+    "total_reviews": lambda product: product.total_reviews,
+    "is_active": lambda product: product.is_active,
+    "is_featured": lambda product: product.is_featured,
+    "is_digital": lambda product: product.is_digital,
+    "file_path": lambda product: product.file_path,
+    "file_size": lambda product: product.file_size,
+    "download_count": lambda product: product.download_count,
+    "youtube_demo_link": lambda product: product.youtube_demo_link,
+    "test_download_link": lambda product: product.test_download_link,
+    "max_activations": lambda product: product.max_activations,
+    "version": lambda product: product.version,
+    "user_id": lambda product: product.user_id,
+    "created_at": lambda product: product.created_at,
+    "updated_at": lambda product: product.updated_at,
+
+    # Rental fields
+    "has_rental_option": lambda product: product.has_rental_option or False,
+    "rental_price": lambda product: product.rental_price,
+    "rental_duration_days": lambda product: product.rental_duration_days or 30,
+
+    # Currency information
+    "currency": None,
+    "currency_symbol": None
+}
+
+def parse_product_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a comma separated ``fields`` parameter into a normalized field tuple.
+
+    Returns None when no fields were requested (the full payload). The id is
+    always included. Raises ValueError for unknown field names.
+    """
+    if fields is None or not fields.strip():
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - PRODUCT_FIELDS.keys()
+    if unknown:
+        raise ValueError(
+            f"Unknown product fields: {', '.join(sorted(unknown))}. "
+            f"Must be any of: {', '.join(PRODUCT_FIELDS)}"
+        )
+    requested.add("id")
+    return tuple(name for name in PRODUCT_FIELDS if name in requested)
+
+# Most ids plus slugs resolved by one batch lookup
+MAX_BATCH_PRODUCTS = 200
+
+def parse_batch_params(ids: Optional[str], slugs: Optional[str]) -> Tuple[List[str], List[str]]:
+    """Split the comma separated ``ids`` and ``slugs`` of a batch lookup, dropping empty entries.
+
+    Raises ValueError when more than ``MAX_BATCH_PRODUCTS`` are requested.
+    """
+    product_ids = [item.strip() for item in (ids or "").split(",") if item.strip()]
+    product_slugs = [item.strip() for item in (slugs or "").split(",") if item.strip()]
+    if len(product_ids) + len(product_slugs) > MAX_BATCH_PRODUCTS:
+        raise ValueError(f"At most {MAX_BATCH_PRODUCTS} products can be requested at once")
+    return product_ids, product_slugs
+
+def product_columns(fields: Iterable[str]) -> List[Any]:
+    """Return the Product columns needed to serialize the given fields"""
+    return [getattr(Product, name) for name in fields if PRODUCT_FIELDS[name] is not None]
+
+def serialize_product(product: Product, fields: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+    """Build the USD catalog payload for a product, optionally limited to some fields.
+
+    Only the columns of the requested fields are read, so products loaded with
+    ``load_only(*product_columns(fields))`` serialize without further queries.
+    """
+    payload = {}
+    for name in fields or PRODUCT_FIELDS:
+        getter = PRODUCT_FIELDS[name]
+        if getter is not None:
+            payload[name] = getter(product)
+    if fields is None or "currency" in fields:
+        payload["currency"] = "USD"
+    if fields is None or "currency_symbol" in fields:
+        payload["currency_symbol"] = CURRENCY_SYMBOLS["USD"]
+    return payload
+
+def trim_payload(payload: Dict[str, Any], fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """Return a copy of a full payload restricted to the given fields"""
+    return {name: payload[name] for name in fields}
+
+def localize_payload(payload: Dict[str, Any], currency: str, convert: Callable[[float], float]) -> Dict[str, Any]:
+    """Return a copy of a USD payload with prices converted to another currency"""
+    localized = dict(payload)
+    for field in PRODUCT_PRICE_FIELDS:
+        if localized.get(field):
+            localized[field] = convert(localized[field])
+    if "currency" in localized:
+        localized["currency"] = currency
+    if "currency_symbol" in localized:
+        localized["currency_symbol"] = CURRENCY_SYMBOLS.get(currency, "$")
+    return localized
+
+class CatalogCache:
+    """In-process cache of serialized product payloads and listing orders.
+
+    Rows are keyed by ``(product_id, currency, fields)`` and listings by the
+    normalized filter/sort key of the query that produced them, so a storefront
+    page is served by slicing a cached id list and looking up precomputed rows.
+    Listing totals and facet counts are cached by filter key alone, independent
+    of sorting. Sparse rows are trimmed from cached full rows when available,
+    and at most ``max_field_sets`` distinct field sets are cached. The whole
+    cache is dropped when the shared ``catalog`` or ``exchange_rates`` version
+    changes or the TTL expires. Cached payloads are shared between requests and
+    must be treated as read-only.
+    """
+
+    def __init__(self, ttl_seconds: int = 300, max_listings: int = 128, max_field_sets: int = 16):
+        self.ttl_seconds = ttl_seconds
+        self.max_listings = max_listings
+        self.max_field_sets = max_field_sets
+        self._lock = threading.Lock()
+        self._rows: Dict[Tuple[str, str, Optional[Tuple[str, ...]]], Dict[str, Any]] = {}
+        self._listings: "OrderedDict[tuple, List[str]]" = OrderedDict()
+        self._counts: "OrderedDict[tuple, int]" = OrderedDict()
+        self._facets: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._field_sets: Set[Tuple[str, ...]] = set()
+        self._version: Optional[Tuple[int, int]] = None
+        self._loaded_at = 0.0
+
+    def _sync(self):
+        """Drop cached data if the catalog or exchange rates changed or the TTL expired"""
+        version = cache_versions.get_many(("catalog", "exchange_rates"))
+        now = time.monotonic()
+        with self._lock:
+            if version != self._version or now - self._loaded_at > self.ttl_seconds:
+                self._rows.clear()
+                self._listings.clear()
+                self._counts.clear()
+                self._facets.clear()
+                self._field_sets.clear()
+                self._version = version
+                self._loaded_at = now
+            return self._version
+
+    def invalidate(self):
+        """Invalidate cached catalog data in every worker"""
+        cache_versions.bump("catalog")
+        with self._lock:
+            self._rows.clear()
+            self._listings.clear()
+            self._counts.clear()
+            self._facets.clear()
+            self._field_sets.clear()
+            self._version = None
+
+    @staticmethod
+    def listing_key(**params) -> tuple:
+        """Normalize listing parameters into a hashable cache key"""
+        return tuple(sorted(params.items()))
+
+    def _get_cached(self, store: "OrderedDict[tuple, Any]", key: tuple, loader: Callable[[], Any]) -> Any:
+        """Return a cached value from one of the keyed stores, loading it on a miss"""
+        version = self._sync()
+        with self._lock:
+            value = store.get(key)
+            if value is not None:
+                store.move_to_end(key)
+                return value
+
+        value = loader()
+        with self._lock:
+            # Values loaded while the catalog was invalidated are not kept
+            if version != self._version:
+                return value
+            store[key] = value
+            while len(store) > self.max_listings:
+                store.popitem(last=False)
+        return value
+
+    def get_listing(self, key: tuple, loader: Callable[[], Iterable[str]]) -> List[str]:
+        """Return the ordered product ids for a listing, loading them on a miss"""
+        return self._get_cached(self._listings, key, lambda: list(loader()))
+
+    def get_count(self, key: tuple, loader: Callable[[], int]) -> int:
+        """Return the total for a filter set, loading it on a miss"""
+        return self._get_cached(self._counts, key, loader)
+
+    def get_facets(self, key: tuple, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the facet counts for a filter set, loading them on a miss"""
+        return self._get_cached(self._facets, key, loader)
+
+    def _lookup_row(self, product_id: str, currency: str, fields: Optional[Tuple[str, ...]]) -> Optional[Dict[str, Any]]:
+        """Return a cached row, trimming a cached full row for sparse requests. Call with the lock held."""
+        row = self._rows.get((product_id, currency, fields))
+        if row is None and fields is not None:
+            full_row = self._rows.get((product_id, currency, None))
+            if full_row is not None:
+                row = trim_payload(full_row, fields)
+        return row
+
+    def _admit_fields(self, fields: Optional[Tuple[str, ...]]) -> bool:
+        """Whether rows for a field set may be cached. Call with the lock held."""
+        if fields is None or fields in self._field_sets:
+            return True
+        if len(self._field_sets) >= self.max_field_sets:
+            return False
+        self._field_sets.add(fields)
+        return True
+
+    def get_rows(
+        self,
+        db: Session,
+        product_ids: List[str],
+        currency: str,
+        convert: Callable[[float], float],
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> List[Dict[str, Any]]:
+        """Return catalog payloads for the given product ids in the given order.
+
+        Missing USD rows are loaded with a single IN query; rows in other
+        currencies are derived from the USD rows with ``convert``. With
+        ``fields`` (see ``parse_product_fields``) the query loads only the
+        columns those fields need and the payloads contain only those fields.
+        Ids that no longer exist are skipped.
+        """
+        version = self._sync()
+        with self._lock:
+            rows = {pid: self._lookup_row(pid, currency, fields) for pid in product_ids}
+            base_rows = {pid: self._lookup_row(pid, "USD", fields) for pid, row in rows.items() if row is None}
+
+        missing_ids = [pid for pid, row in base_rows.items() if row is None]
+        if missing_ids:
+            query = db.query(Product).filter(Product.id.in_(missing_ids))
+            if fields is not None:
+                query = query.options(load_only(*product_columns(fields)))
+            for product in query.all():
+                base_rows[product.id] = serialize_product(product, fields)
+
+        new_rows = {}
+        for pid, base_row in base_rows.items():
+            if base_row is None:
+                continue
+            new_rows[(pid, "USD", fields)] = base_row
+            if currency != "USD":
+                rows[pid] = new_rows[(pid, currency, fields)] = localize_payload(base_row, currency, convert)
+            else:
+                rows[pid] = base_row
+
+        if new_rows:
+            with self._lock:
+                # Rows loaded while the catalog was invalidated are not kept
+                if version == self._version and self._admit_fields(fields):
+                    self._rows.update(new_rows)
+
+        return [rows[pid] for pid in product_ids if rows.get(pid) is not None]
+
+    def get_batch(
+        self,
+        db: Session,
+        product_ids: List[str],
+        product_slugs: List[str],
+        currency: str,
+        convert: Callable[[float], float],
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> Dict[str, Any]:
+        """Resolve products by id and/or slug with one slug query and ``get_rows``.
+
+        Items follow the request order (ids first, then slugs) with None for
+        products that were not found; those are also listed, once each, in
+        ``missing_ids`` and ``missing_slugs``.
+        """
+        slug_ids = {}
+        if product_slugs:
+            slug_ids = dict(db.query(Product.slug, Product.id).filter(Product.slug.in_(set(product_slugs))).all())
+
+        requested_ids = list(dict.fromkeys(product_ids + list(slug_ids.values())))
+        rows = self.get_rows(db, requested_ids, currency, convert, fields)
+        rows_by_id = {row["id"]: row for row in rows}
+
+        items = [rows_by_id.get(product_id) for product_id in product_ids]
+        items += [rows_by_id.get(slug_ids.get(slug)) for slug in product_slugs]
+        return {
+            "items": items,
+            "missing_ids": [product_id for product_id in dict.fromkeys(product_ids) if product_id not in rows_by_id],
+            "missing_slugs": [slug for slug in dict.fromkeys(product_slugs) if slug_ids.get(slug) not in rows_by_id]
+        }
+
+# Create global catalog cache instance
+catalog_cache = CatalogCache(
+    ttl_seconds=settings.catalog_cache_ttl_seconds,
+    max_listings=settings.catalog_cache_max_listings
+)
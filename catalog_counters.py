@@ -0,0 +1,134 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from models_mysql import CatalogCounter, Product
+from logging_config import product_logger
+
+# Counter scope covering every active product
+ALL_PRODUCTS_SCOPE = "all"
+
+def category_scope(category: str) -> str:
+    """Counter scope for the active products of one category"""
+    return f"category:{category}"
+
+def product_state(product: Optional[Product]) -> Optional[Tuple[bool, Optional[str]]]:
+    """Capture the fields that decide which counters a product contributes to"""
+    if product is None:
+        return None
+    return bool(product.is_active), product.category
+
+class CatalogCounters:
+    """Maintained active-product counts for unfiltered and category-only listings.
+
+    Counts are adjusted in the same transaction as the product write, so
+    reading a total is a primary key lookup instead of a COUNT(*) scan.
+    Counters are seeded at startup; reads never write, and every insert is
+    an upsert, so concurrent workers cannot collide on a scope.
+    """
+
+    def get(self, db: Session, category: Optional[str] = None) -> int:
+        """Return the number of active products, optionally within one category"""
+        scope = category_scope(category) if category else ALL_PRODUCTS_SCOPE
+        counts = dict(db.query(CatalogCounter.scope, CatalogCounter.count).filter(
+            CatalogCounter.scope.in_([scope, ALL_PRODUCTS_SCOPE])
+        ).all())
+        if ALL_PRODUCTS_SCOPE not in counts:
+            # Counters have not been seeded yet for this database
+            return self.count(db, category)
+        return counts.get(scope, 0)
+
+    def count(self, db: Session, category: Optional[str] = None) -> int:
+        """Count the active products with a query, bypassing the counters"""
+        query = db.query(func.count(Product.id)).filter(Product.is_active == True)
+        if category:
+            query = query.filter(Product.category == category)
+        return query.scalar() or 0
+
+    def setup(self, db: Session):
+        """Seed the counters of a database that has none; called at startup"""
+        if db.get(CatalogCounter, ALL_PRODUCTS_SCOPE) is None:
+            self.rebuild(db)
+
+    def adjust(
+        self,
+        db: Session,
+        before: Optional[Tuple[bool, Optional[str]]],
+        after: Optional[Tuple[bool, Optional[str]]]
+    ):
+        """Apply the counter changes for a product moving from ``before`` to ``after``.
+
+        States come from product_state; None means the product does not exist
+        (creation or deletion). The caller commits.
+        """
+        deltas = Counter()
+        for state, sign in ((before, -1), (after, 1)):
+            if state is None or not state[0]:
+                continue
+            deltas[ALL_PRODUCTS_SCOPE] += sign
+            if state[1]:
+                deltas[category_scope(state[1])] += sign
+
+        for scope, delta in deltas.items():
+            if delta == 0:
+                continue
+            updated = db.query(CatalogCounter).filter(CatalogCounter.scope == scope).update(
+                {CatalogCounter.count: CatalogCounter.count + delta},
+                synchronize_session=False
+            )
+            if not updated and scope != ALL_PRODUCTS_SCOPE:
+                # First product of a category; another worker may be adding it too
+                self._upsert(db, {scope: max(delta, 0)}, increment=True)
+
+    def rebuild(self, db: Session) -> dict:
+        """Recompute every counter from the products table"""
+        counts = {ALL_PRODUCTS_SCOPE: 0}
+        rows = db.query(Product.category, func.count(Product.id)).filter(
+            Product.is_active == True
+        ).group_by(Product.category).all()
+        for category, count in rows:
+            counts[ALL_PRODUCTS_SCOPE] += count
+            if category:
+                counts[category_scope(category)] = count
+
+        self._upsert(db, counts, increment=False)
+        db.query(CatalogCounter).filter(CatalogCounter.scope.notin_(list(counts))).delete(synchronize_session=False)
+        db.commit()
+        product_logger.info(f"Rebuilt catalog counters ({len(counts)} scopes)")
+        return counts
+
+    @staticmethod
+    def _upsert(db: Session, counts: Dict[str, int], increment: bool):
+        """Insert counters, adding to (``increment``) or replacing the count of existing scopes"""
+        table = CatalogCounter.__table__
+        rows = [{"scope": scope, "count": count, "updated_at": datetime.utcnow()} for scope, count in counts.items()]
+        dialect = db.get_bind().dialect.name
+        if dialect == "mysql":
+            statement = mysql.insert(table).values(rows)
+            new_count = statement.inserted.count
+            statement = statement.on_duplicate_key_update(
+                count=table.c.count + new_count if increment else new_count,
+                updated_at=statement.inserted.updated_at
+            )
+        else:
+            statement = (postgresql if dialect == "postgresql" else sqlite).insert(table).values(rows)
+            new_count = statement.excluded.count
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.scope],
+                set_={"count": table.c.count + new_count if increment else new_count, "updated_at": statement.excluded.updated_at}
+            )
+        db.execute(statement)
+
+# Create global catalog counters instance
+catalog_counters = CatalogCounters()
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        counts = catalog_counters.rebuild(db)
+        print(f"✅ Catalog counters rebuilt: {counts}")
+    finally:
+        db.close()
@@ -35,6 +35,13 @@ class Settings(BaseSettings):
     # Payment Configuration
     paystack_secret_key: str = os.getenv("PAYSTACK_SECRET_KEY", "")
     paystack_public_key: str = os.getenv("PAYSTACK_PUBLIC_KEY", "")
+    paystack_base_url: str = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
+    paystack_connect_timeout: float = float(os.getenv("PAYSTACK_CONNECT_TIMEOUT", "5"))  # Seconds
+    paystack_read_timeout: float = float(os.getenv("PAYSTACK_READ_TIMEOUT", "15"))  # Seconds
+    paystack_max_connections: int = int(os.getenv("PAYSTACK_MAX_CONNECTIONS", "20"))  # Pooled keep-alive connections per worker
+    paystack_max_concurrency: int = int(os.getenv("PAYSTACK_MAX_CONCURRENCY", "10"))  # Calls in flight per worker
+    paystack_max_retries: int = int(os.getenv("PAYSTACK_MAX_RETRIES", "2"))  # Retries of 5xx responses and connection failures
+    paystack_retry_backoff_ms: int = int(os.getenv("PAYSTACK_RETRY_BACKOFF_MS", "200"))  # Base of the jittered exponential backoff
     
     # File Storage Configuration
     upload_dir: str = os.getenv("UPLOAD_DIR", "./uploads")
@@ -66,6 +73,56 @@ class Settings(BaseSettings):
     session_secret_key: str = os.getenv("SESSION_SECRET_KEY", "your-session-secret-key")
     session_expire_seconds: int = int(os.getenv("SESSION_EXPIRE_SECONDS", "3600"))
     
+    # Catalog Cache Configuration
+    catalog_cache_ttl_seconds: int = int(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+    catalog_cache_max_listings: int = int(os.getenv("CATALOG_CACHE_MAX_LISTINGS", "128"))
+    exchange_rate_snapshot_ttl_seconds: int = int(os.getenv("EXCHANGE_RATE_SNAPSHOT_TTL_SECONDS", "300"))
+    
+    # HTTP Cache Configuration
+    etag_window_seconds: int = int(os.getenv("ETAG_WINDOW_SECONDS", "300"))  # Upper bound on ETag lifetime
+    
+    # Download Package Cache Configuration
+    package_cache_dir: str = os.getenv("PACKAGE_CACHE_DIR", "./package_cache")
+    package_cache_max_bytes: int = int(os.getenv("PACKAGE_CACHE_MAX_BYTES", "5368709120"))  # 5GB
+    
+    # Download Offload Configuration
+    download_offload: bool = os.getenv("DOWNLOAD_OFFLOAD", "False").lower() == "true"  # Let nginx send file bodies via X-Accel-Redirect
+    download_offload_locations: str = os.getenv(
+        "DOWNLOAD_OFFLOAD_LOCATIONS",
+        "./uploads=/_protected/uploads/,./digital_products=/_protected/digital_products/,"
+        "./package_cache=/_protected/package_cache/,./bundles=/_protected/bundles/,./licenses=/_protected/licenses/"
+    )  # Comma-separated directory=internal nginx location pairs
+    
+    # Download Log Buffer Configuration
+    download_log_flush_ms: int = int(os.getenv("DOWNLOAD_LOG_FLUSH_MS", "500"))  # Write buffered download events at least this often
+    download_log_flush_events: int = int(os.getenv("DOWNLOAD_LOG_FLUSH_EVENTS", "200"))  # ...or as soon as this many are waiting
+    
+    # Bundle Build Configuration
+    bundle_dir: str = os.getenv("BUNDLE_DIR", "./bundles")  # Content-addressed bundle store
+    bundle_store_max_bytes: int = int(os.getenv("BUNDLE_STORE_MAX_BYTES", "10737418240"))  # 10GB
+    bundle_build_workers: int = int(os.getenv("BUNDLE_BUILD_WORKERS", "2"))  # Processes compressing post-payment bundles
+    bundle_build_stale_seconds: int = int(os.getenv("BUNDLE_BUILD_STALE_SECONDS", "900"))  # Builds running longer than this are restarted
+    
+    # Webhook Inbox Configuration
+    webhook_poll_interval_ms: int = int(os.getenv("WEBHOOK_POLL_INTERVAL_MS", "1000"))  # Consumers look for due events at least this often
+    webhook_max_attempts: int = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))  # Events failing this often are marked failed
+    webhook_retry_backoff_seconds: float = float(os.getenv("WEBHOOK_RETRY_BACKOFF_SECONDS", "5"))  # Doubles with every failed attempt
+    webhook_stale_seconds: int = int(os.getenv("WEBHOOK_STALE_SECONDS", "300"))  # Events processing longer than this are claimed again
+    
+    # Payment Reconciliation Configuration
+    reconcile_interval_minutes: float = float(os.getenv("RECONCILE_INTERVAL_MINUTES", "15"))  # 0 disables the scheduled run
+    reconcile_concurrency: int = int(os.getenv("RECONCILE_CONCURRENCY", "10"))  # Paystack verifications in flight
+    reconcile_batch_size: int = int(os.getenv("RECONCILE_BATCH_SIZE", "200"))  # Rows per page and per commit
+    reconcile_min_age_minutes: int = int(os.getenv("RECONCILE_MIN_AGE_MINUTES", "15"))  # Leave checkouts in progress alone
+    reconcile_max_age_days: int = int(os.getenv("RECONCILE_MAX_AGE_DAYS", "7"))  # Older transactions are no longer checked
+    reconcile_lock_file: str = os.getenv("RECONCILE_LOCK_FILE", "/tmp/jarvistrade_reconcile.lock")  # One run per host at a time
+    
+    # Payment Verification Single Flight Configuration
+    payment_verify_lock_ttl_seconds: float = float(os.getenv("PAYMENT_VERIFY_LOCK_TTL_SECONDS", "30"))  # Cross-worker lock of one verification
+    payment_verify_result_ttl_seconds: float = float(os.getenv("PAYMENT_VERIFY_RESULT_TTL_SECONDS", "60"))  # Final Paystack statuses are reused this long
+    payment_verify_wait_seconds: float = float(os.getenv("PAYMENT_VERIFY_WAIT_SECONDS", "15"))  # Then a worker waiting on another verifies itself
+    payment_verify_share_ttl_seconds: float = float(os.getenv("PAYMENT_VERIFY_SHARE_TTL_SECONDS", "5"))  # Any verification result is handed to the workers waiting on it this long
+    
     # Backup Configuration
     backup_enabled: bool = os.getenv("BACKUP_ENABLED", "True").lower() == "true"
     backup_schedule: str = os.getenv("BACKUP_SCHEDULE", "0 2 * * *")  # Daily at 2 AM
@@ -1,6 +1,8 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, JSON, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.types import TypeDecorator
+import json
 import os
 from dotenv import load_dotenv
 
@@ -18,6 +20,37 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create Base class
 Base = declarative_base()
 
+# Dialects that store JSONType columns in a native JSON column
+NATIVE_JSON_DIALECTS = ("mysql", "postgresql")
+
+class JSONType(TypeDecorator):
+    """JSON value stored natively on MySQL/PostgreSQL and as text elsewhere.
+
+    Values are decoded once when a row is loaded, so attributes hold lists and
+    dicts. Malformed legacy text loads as None. In-place mutation is not
+    tracked; assign a new value to persist changes.
+    """
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name in NATIVE_JSON_DIALECTS:
+            return dialect.type_descriptor(JSON(none_as_null=True))
+        return dialect.type_descriptor(Text())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name in NATIVE_JSON_DIALECTS:
+            return value
+        return json.dumps(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None or not isinstance(value, str) or dialect.name in NATIVE_JSON_DIALECTS:
+            return value
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
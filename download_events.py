@@ -0,0 +1,168 @@
+import atexit
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import bindparam, func, insert, update
+from database import SessionLocal
+from models_mysql import DownloadLog, DownloadToken, Product
+from config import settings
+from logging_config import download_logger
+
+class DownloadEvents:
+    """Write-behind buffer for download logs and download counters.
+
+    Downloads only append an event in memory; a background thread writes
+    the buffered events every ``flush_interval_ms`` or as soon as
+    ``max_events`` are waiting, with one bulk insert into ``download_logs``
+    and one aggregated ``download_count = download_count + n`` update per
+    table. The buffer is flushed on close (lifespan shutdown, gunicorn
+    ``worker_exit`` and ``atexit``), so recycled workers do not lose counts.
+    Events of a failed flush are kept and retried on the next one.
+    """
+
+    def __init__(self, session_factory, flush_interval_ms: int, max_events: int):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_events = max_events
+        self._reset()
+        atexit.register(self.close)
+        if hasattr(os, "register_at_fork"):
+            # Threads do not survive fork; preloaded workers start their own
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._condition = threading.Condition()
+        self._events: List[Dict[str, Any]] = []
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def record(
+        self,
+        user_id: Optional[str],
+        product_id: Optional[str] = None,
+        download_token_id: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        success: bool = True,
+        error_message: Optional[str] = None,
+        count_product: bool = False,
+        count_token: bool = False
+    ):
+        """Buffer one download log row and, optionally, the counter increments it implies"""
+        now = datetime.utcnow()
+        event = {
+            "log": {
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "product_id": product_id,
+                "license_id": None,
+                "download_token_id": download_token_id,
+                "ip_address": ip_address,
+                "user_agent": (user_agent or "")[:500],
+                "download_time": now,
+                "created_at": now,
+                "download_status": "success" if success else "failed",
+                "success": success,
+                "error_message": error_message[:500] if error_message else None
+            },
+            "product_id": product_id if count_product else None,
+            "token_id": download_token_id if count_token else None
+        }
+        with self._condition:
+            self._events.append(event)
+            closed = self._closed
+            if not closed:
+                self._start_thread()
+                if len(self._events) >= self.max_events:
+                    self._condition.notify()
+        if closed:
+            # Late events after shutdown are written straight away
+            self.flush()
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._events)
+
+    def _start_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="download-events", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        retrying = False
+        while True:
+            with self._condition:
+                # After a failed flush wait a full interval even if the buffer is full
+                if not self._closed and (retrying or len(self._events) < self.max_events):
+                    self._condition.wait(self.flush_interval)
+                if self._closed:
+                    return
+            retrying = self.flush() == 0 and self.pending() > 0
+
+    def flush(self) -> int:
+        """Write all buffered events; returns how many were written"""
+        with self._flush_lock:
+            with self._condition:
+                events, self._events = self._events, []
+            if not events:
+                return 0
+
+            started = time.monotonic()
+            product_counts = Counter(event["product_id"] for event in events if event["product_id"])
+            token_counts = Counter(event["token_id"] for event in events if event["token_id"])
+            session = None
+            try:
+                session = self.session_factory()
+                session.execute(insert(DownloadLog), [event["log"] for event in events])
+                self._increment(session, Product, product_counts)
+                self._increment(session, DownloadToken, token_counts)
+                session.commit()
+            except Exception as e:
+                if session is not None:
+                    session.rollback()
+                with self._condition:
+                    self._events[:0] = events
+                download_logger.error(f"Failed to flush {len(events)} download events, will retry: {e}")
+                return 0
+            finally:
+                if session is not None:
+                    session.close()
+
+            download_logger.debug(
+                f"Flushed {len(events)} download events in {(time.monotonic() - started) * 1000:.1f}ms"
+            )
+            return len(events)
+
+    @staticmethod
+    def _increment(session, model, counts: Counter):
+        if not counts:
+            return
+        table = model.__table__
+        session.connection().execute(
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            .values(download_count=func.coalesce(table.c.download_count, 0) + bindparam("increment")),
+            [{"row_id": row_id, "increment": increment} for row_id, increment in counts.items()]
+        )
+
+    def close(self):
+        """Stop the flush thread and write whatever is still buffered"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+# Create global download events instance
+download_events = DownloadEvents(
+    SessionLocal,
+    flush_interval_ms=settings.download_log_flush_ms,
+    max_events=settings.download_log_flush_events
+)
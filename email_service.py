@@ -1,5 +1,4 @@
 import os
-import json
 from datetime import datetime
 from typing import List, Optional
 from dotenv import load_dotenv
@@ -545,13 +544,7 @@ class EmailService:
         try:
             subject = f"New Project Request: {project_request.project_title} - {self.app_name}"
             
-            # Parse platforms from JSON
-            platforms = []
-            if project_request.platforms:
-                try:
-                    platforms = json.loads(project_request.platforms)
-                except:
-                    platforms = [project_request.platforms]
+            platforms = project_request.platforms or []
             
             # Email body
             body = f"""
@@ -0,0 +1,114 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from models_mysql import ExchangeRate
+from cache_versions import cache_versions
+from config import settings
+
+class ExchangeRateSnapshot:
+    """Immutable view of all active exchange rates at a point in time"""
+
+    def __init__(self, rates: Dict[Tuple[str, str], float], version: int = 0):
+        self.rates = rates
+        self.version = version
+
+    def get_rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        """Resolve the rate for a currency pair, falling back to the reverse pair"""
+        if from_currency == to_currency:
+            return 1.0
+        rate = self.rates.get((from_currency, to_currency))
+        if rate is not None:
+            return rate
+        reverse_rate = self.rates.get((to_currency, from_currency))
+        if reverse_rate:
+            return 1 / reverse_rate
+        return None
+
+    def convert(self, amount: float, from_currency: str, to_currency: str) -> float:
+        """Convert an amount, returning it unchanged when no rate is known"""
+        if from_currency == to_currency:
+            return amount
+        rate = self.get_rate(from_currency, to_currency)
+        if rate is None:
+            return amount
+        return amount * rate
+
+    def convert_many(self, amounts: Iterable[float], from_currency: str, to_currency: str) -> List[float]:
+        """Convert several amounts with a single rate lookup"""
+        amounts = list(amounts)
+        if from_currency == to_currency:
+            return amounts
+        rate = self.get_rate(from_currency, to_currency)
+        if rate is None:
+            return amounts
+        return [amount * rate if amount is not None else None for amount in amounts]
+
+    def base_rates(self, base_currency: str = "USD") -> Dict[str, float]:
+        """Return the direct rates quoted from a base currency"""
+        return {
+            to_currency: rate
+            for (from_currency, to_currency), rate in self.rates.items()
+            if from_currency == base_currency
+        }
+
+class ExchangeRateService:
+    """Per-worker exchange rate snapshot, refreshed when the rates version changes.
+
+    The shared ``exchange_rates`` version is checked at most once per
+    ``version_check_interval`` seconds, so conversions on the request path are
+    pure in-memory lookups.
+    """
+
+    def __init__(self, ttl_seconds: int = 300, version_check_interval: float = 1.0):
+        self.ttl_seconds = ttl_seconds
+        self.version_check_interval = version_check_interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[ExchangeRateSnapshot] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+
+    def snapshot(self, db: Session) -> ExchangeRateSnapshot:
+        """Return the current snapshot, reloading all active pairs if it is stale"""
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._loaded_at <= self.ttl_seconds:
+            if now - self._checked_at < self.version_check_interval:
+                return snapshot
+            self._checked_at = now
+            if cache_versions.get("exchange_rates") == snapshot.version:
+                return snapshot
+
+        version = cache_versions.get("exchange_rates")
+        rows = db.query(
+            ExchangeRate.from_currency,
+            ExchangeRate.to_currency,
+            ExchangeRate.rate
+        ).filter(ExchangeRate.is_active == True).all()
+        snapshot = ExchangeRateSnapshot(
+            {(row.from_currency, row.to_currency): row.rate for row in rows},
+            version
+        )
+        with self._lock:
+            self._snapshot = snapshot
+            self._loaded_at = self._checked_at = time.monotonic()
+        return snapshot
+
+    def convert(self, amount: float, from_currency: str, to_currency: str, db: Session) -> float:
+        """Convert an amount using the current snapshot"""
+        if from_currency == to_currency:
+            return amount
+        return self.snapshot(db).convert(amount, from_currency, to_currency)
+
+    def convert_many(self, amounts: Iterable[float], from_currency: str, to_currency: str, db: Session) -> List[float]:
+        """Convert several amounts using the current snapshot"""
+        return self.snapshot(db).convert_many(amounts, from_currency, to_currency)
+
+    def invalidate(self):
+        """Force every worker to reload its snapshot on next use"""
+        cache_versions.bump("exchange_rates")
+        with self._lock:
+            self._snapshot = None
+
+# Create global exchange rate service instance
+exchange_rate_service = ExchangeRateService(ttl_seconds=settings.exchange_rate_snapshot_ttl_seconds)
@@ -0,0 +1,263 @@
+import hashlib
+import os
+import stat
+import uuid
+from email.utils import parsedate_to_datetime
+from typing import List, Mapping, Optional, Tuple
+from urllib.parse import quote
+import anyio
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+from config import settings
+
+# Requests asking for more ranges than this get the whole file
+MAX_RANGES = 16
+
+ByteRange = Tuple[int, int]  # inclusive (start, end)
+
+def parse_range_header(header: str, size: int) -> Optional[List[ByteRange]]:
+    """Parse a ``Range: bytes=...`` header against a file size.
+
+    Returns None when the header is malformed or uses another unit (the
+    whole file is served), and an empty list when no range is satisfiable.
+    Overlapping and adjacent ranges are merged.
+    """
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs.strip():
+        return None
+
+    ranges = []
+    for spec in specs.split(","):
+        spec = spec.strip()
+        if not spec:
+            continue
+        start_text, separator, end_text = spec.partition("-")
+        if not separator:
+            return None
+        try:
+            if not start_text.strip():
+                suffix = int(end_text)
+                if suffix <= 0 or size == 0:
+                    continue
+                ranges.append((max(size - suffix, 0), size - 1))
+                continue
+            start = int(start_text)
+            end = int(end_text) if end_text.strip() else None
+        except ValueError:
+            return None
+        if start < 0 or (end is not None and end < start):
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, size - 1 if end is None else min(end, size - 1)))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    if len(ranges) > 1:
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        ranges = merged
+    return ranges
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Strong ETag for a file version, derived from its size and modification time"""
+    material = f"{stat_result.st_mtime_ns}-{stat_result.st_size}"
+    return '"' + hashlib.md5(material.encode(), usedforsecurity=False).hexdigest() + '"'
+
+def if_range_matches(if_range: str, etag: str, stat_result: os.stat_result) -> bool:
+    """Whether an If-Range validator still identifies the current file version"""
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Weak validators never match If-Range
+        return if_range == etag
+    try:
+        return int(parsedate_to_datetime(if_range).timestamp()) == int(stat_result.st_mtime)
+    except (TypeError, ValueError):
+        return False
+
+class RangeFileResponse(FileResponse):
+    """FileResponse that can send one or several byte ranges of the file.
+
+    With one range the body is that slice of the file; with several it is a
+    ``multipart/byteranges`` document. Whole files are handed to the server
+    with the ASGI ``http.response.pathsend`` extension when it is available,
+    so the server can ``sendfile`` them without copying through Python.
+    Otherwise the file is read in large ``chunk_size`` blocks, so memory use
+    does not depend on the file or range size.
+    """
+
+    chunk_size = 1024 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        ranges: Optional[List[ByteRange]] = None,
+        **kwargs
+    ):
+        super().__init__(path, stat_result=stat_result, **kwargs)
+        self.ranges = ranges or []
+        self.headers["accept-ranges"] = "bytes"
+        size = stat_result.st_size
+        self._parts: List[Tuple[bytes, int, int]] = [(b"", 0, size - 1)]
+        self._closing = b""
+        if not self.ranges:
+            return
+
+        self.status_code = 206
+        if len(self.ranges) == 1:
+            start, end = self.ranges[0]
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(end - start + 1)
+            self._parts = [(b"", start, end)]
+            return
+
+        boundary = uuid.uuid4().hex
+        content_type = self.media_type
+        self._parts = []
+        for index, (start, end) in enumerate(self.ranges):
+            part_header = (
+                f"--{boundary}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+            ).encode("latin-1")
+            # Every part after the first starts on a new line
+            if index:
+                part_header = b"\r\n" + part_header
+            self._parts.append((part_header, start, end))
+        self._closing = f"\r\n--{boundary}--\r\n".encode("latin-1")
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        self.headers["content-length"] = str(
+            sum(len(header) + end - start + 1 for header, start, end in self._parts) + len(self._closing)
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif not self.ranges and "http.response.pathsend" in scope.get("extensions", {}):
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                for part_header, start, end in self._parts:
+                    if part_header:
+                        await send({"type": "http.response.body", "body": part_header, "more_body": True})
+                    await file.seek(start)
+                    remaining = end - start + 1
+                    while remaining > 0:
+                        chunk = await file.read(min(self.chunk_size, remaining))
+                        if not chunk:
+                            break
+                        remaining -= len(chunk)
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": self._closing, "more_body": False})
+        if self.background is not None:
+            await self.background()
+
+def content_disposition(filename: str) -> str:
+    """Attachment header for a download name, RFC 5987 encoded when not plain ASCII"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+class DownloadOffload:
+    """Hands file transfers to nginx with ``X-Accel-Redirect``.
+
+    ``locations`` maps served directories to internal nginx locations that
+    alias them. The API still runs its own checks; when offload is enabled
+    and a file lives under one of the directories, the response only names
+    the internal URI and nginx sends the bytes (including ranges).
+    """
+
+    def __init__(self, enabled: bool, locations: Mapping[str, str]):
+        self.enabled = enabled
+        self.locations = [
+            (os.path.realpath(directory), prefix.rstrip("/") + "/")
+            for directory, prefix in locations.items()
+        ]
+
+    @classmethod
+    def from_setting(cls, enabled: bool, setting: str) -> "DownloadOffload":
+        """Build from ``directory=location`` pairs separated by commas"""
+        locations = {}
+        for pair in setting.split(","):
+            directory, separator, prefix = pair.strip().partition("=")
+            if separator and directory and prefix:
+                locations[directory.strip()] = prefix.strip()
+        return cls(enabled, locations)
+
+    def internal_uri(self, path: str) -> Optional[str]:
+        """Internal nginx URI for a file, or None when it cannot be offloaded"""
+        if not self.enabled:
+            return None
+        real_path = os.path.realpath(path)
+        for directory, prefix in self.locations:
+            if os.path.commonpath([real_path, directory]) == directory and real_path != directory:
+                return prefix + quote(os.path.relpath(real_path, directory).replace(os.sep, "/"))
+        return None
+
+def serve_file(
+    request: Request,
+    path: str,
+    media_type: Optional[str] = None,
+    filename: Optional[str] = None,
+    headers: Optional[Mapping[str, str]] = None
+) -> Response:
+    """Serve a file from disk honouring ``Range`` and ``If-Range``.
+
+    Full responses carry ``Accept-Ranges``, a strong ETag and Last-Modified
+    so clients can resume later; partial requests get a 206 (single or
+    multipart) or a 416 when no requested range lies inside the file. With
+    download offload enabled the transfer, ranges included, is left to nginx.
+    """
+    stat_result = os.stat(path)
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise FileNotFoundError(path)
+    response_headers = dict(headers or {})
+
+    internal_uri = download_offload.internal_uri(path)
+    if internal_uri is not None:
+        response_headers["X-Accel-Redirect"] = internal_uri
+        if filename is not None:
+            response_headers["Content-Disposition"] = content_disposition(filename)
+        return Response(media_type=media_type, headers=response_headers)
+
+    etag = file_etag(stat_result)
+    response_headers["etag"] = etag
+
+    ranges = None
+    range_header = request.headers.get("range")
+    if range_header:
+        if_range = request.headers.get("if-range")
+        if if_range is None or if_range_matches(if_range, etag, stat_result):
+            ranges = parse_range_header(range_header, stat_result.st_size)
+
+    if ranges == []:
+        response_headers["content-range"] = f"bytes */{stat_result.st_size}"
+        return Response(status_code=416, headers=response_headers)
+
+    return RangeFileResponse(
+        path,
+        stat_result=stat_result,
+        ranges=ranges,
+        media_type=media_type,
+        filename=filename,
+        headers=response_headers,
+        method=request.method
+    )
+
+def is_resumed_request(request: Request) -> bool:
+    """Whether a request continues a download (asks for a range not starting at byte 0)"""
+    range_header = request.headers.get("range", "")
+    _, _, specs = range_header.partition("=")
+    first = specs.split(",")[0].strip()
+    return bool(first) and not first.startswith("0-")
+
+# Create global download offload instance
+download_offload = DownloadOffload.from_setting(settings.download_offload, settings.download_offload_locations)
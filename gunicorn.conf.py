@@ -87,3 +87,8 @@ def post_worker_init(worker):
 def worker_abort(worker):
     worker.log.info("Worker aborted (pid: %s)", worker.pid)
 
+
+def worker_exit(server, worker):
+    # Write the exiting worker's buffered download logs and counts (also on max_requests recycling)
+    from download_events import download_events
+    download_events.close()
@@ -2,6 +2,11 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from database import get_db, check_database_health
 from config import settings
+from bundle_store import bundle_store
+from package_cache import package_cache
+from paystack_client import paystack_client
+from webhook_inbox import webhook_inbox
+from single_flight import payment_verifications
 import redis
 import psutil
 import os
@@ -208,6 +213,13 @@ async def metrics():
                 "num_threads": process.num_threads(),
                 "num_fds": process.num_fds() if hasattr(process, 'num_fds') else None
             },
+            "storage": {
+                "bundle_store": bundle_store.stats(),
+                "package_cache": package_cache.stats()
+            },
+            "paystack": paystack_client.stats(),
+            "payment_verifications": payment_verifications.stats(),
+            "webhook_inbox": webhook_inbox.stats(),
             "timestamp": datetime.utcnow().isoformat()
         }
         
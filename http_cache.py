@@ -0,0 +1,108 @@
+import hashlib
+import time
+from typing import Optional, Tuple
+from fastapi import Request, Response
+from cache_versions import cache_versions
+from config import settings
+
+class CachePolicy:
+    """Conditional GET policy for a group of read-only routes.
+
+    ``scopes`` are the cache version counters the response is derived from.
+    ``cache_control`` applies to anonymous requests and
+    ``private_cache_control`` to authenticated ones, whose bodies may depend
+    on the user (e.g. their currency). Weak ETags are used when the body
+    contains counters that change without a version bump, such as view counts.
+    """
+
+    def __init__(
+        self,
+        scopes: Tuple[str, ...],
+        cache_control: str,
+        private_cache_control: str = "private, no-cache",
+        weak: bool = False
+    ):
+        self.scopes = scopes
+        self.cache_control = cache_control
+        self.private_cache_control = private_cache_control
+        self.weak = weak
+
+# Product listings and details, priced in the user's currency
+CATALOG_POLICY = CachePolicy(("catalog", "exchange_rates"), "public, max-age=60")
+
+# Blog listings; like, comment and view counts change without a version bump
+BLOG_POLICY = CachePolicy(("blog",), "public, max-age=60", weak=True)
+
+# Single blog posts are always revalidated so that every view is counted
+BLOG_POST_POLICY = CachePolicy(("blog",), "public, no-cache", weak=True)
+
+# Public exchange rates
+EXCHANGE_RATE_POLICY = CachePolicy(("exchange_rates",), "public, max-age=300")
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+class HTTPCache:
+    """ETag and Cache-Control handling for read endpoints.
+
+    ETags are derived from the request URL, the version counters of the
+    policy's scopes and a variant such as the user's currency, so they can be
+    checked before the response is built. A time window is mixed in so that
+    data changed outside the API (without a version bump) is picked up after
+    at most ``window_seconds``.
+    """
+
+    def __init__(self, window_seconds: int = 300):
+        self.window_seconds = max(window_seconds, 1)
+
+    def etag(self, request: Request, policy: CachePolicy, variant: str = "") -> str:
+        """Compute the ETag for a request under a policy"""
+        query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+        window = int(time.time() // self.window_seconds)
+        material = "|".join([
+            request.url.path,
+            query,
+            cache_versions.token(policy.scopes),
+            variant,
+            str(window)
+        ])
+        digest = hashlib.sha256(material.encode()).hexdigest()[:32]
+        return f'W/"{digest}"' if policy.weak else f'"{digest}"'
+
+    def check(
+        self,
+        request: Request,
+        response: Response,
+        policy: CachePolicy,
+        variant: str = ""
+    ) -> Optional[Response]:
+        """Set caching headers on ``response`` and return a 304 response if the client copy is current.
+
+        Endpoints call this before building their body and return the 304
+        response as-is when one is returned.
+        """
+        etag = self.etag(request, policy, variant)
+        authenticated = "authorization" in request.headers
+        headers = {
+            "ETag": etag,
+            "Cache-Control": policy.private_cache_control if authenticated else policy.cache_control,
+            "Vary": "Authorization"
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return None
+
+# Create global HTTP cache instance
+http_cache = HTTPCache(window_seconds=settings.etag_window_seconds)
@@ -1,14 +1,17 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, UploadFile, File, Form
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import FileResponse, StreamingResponse, RedirectResponse
+from fastapi.responses import FileResponse, StreamingResponse, RedirectResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, case
-from typing import List, Optional
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import func, or_, case, cast
+from typing import List, Optional, Tuple, Union
 import uvicorn
 import json
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 import aiohttp
 import os
@@ -33,12 +36,13 @@ from logging_config import (
 
 from logging_config import get_logger, safe_log
 
-from database import engine, get_db, Base
-from models_mysql import Product, User, Transaction, OrderItem, DownloadToken, DownloadLog, Review, ProjectRequest, BlogPost, BlogLike, BlogComment, Notification, ExchangeRate, ProjectResponse, ProjectInvoice, ProjectProgress, UserProductActivation, License
+from config import settings
+from database import engine, get_db, Base, SessionLocal
+from models_mysql import Product, ProductTag, User, Transaction, OrderItem, DownloadToken, DownloadLog, Review, ProjectRequest, BlogPost, BlogPostTag, BlogLike, BlogComment, Notification, ExchangeRate, ProjectResponse, ProjectInvoice, ProjectProgress, UserProductActivation, License
 from license_encryption import LicenseEncryption, LicenseSystem, create_license_data, verify_account_in_license, check_license_expiry, get_license_info
 from schemas import (
     ProductCreate, ProductUpdate, ProductResponse, UserResponse, CategoryResponse, 
-    PRODUCT_CATEGORIES, ReviewCreate, ReviewUpdate, ReviewResponse, 
+    PRODUCT_CATEGORIES, TagResponse, ReviewCreate, ReviewUpdate, ReviewResponse, ReviewSummaryResponse, 
     ProjectRequestCreate, ProjectRequestUpdate, ProjectRequestResponse, 
     BlogPostCreate, BlogPostUpdate, BlogPostResponse, BlogLikeResponse, 
     NotificationCreate, NotificationUpdate, NotificationResponse, 
@@ -50,7 +54,7 @@ from schemas import (
     ProjectProgressCreate, ProjectProgressUpdate, ProjectProgressResponse,
     ProjectDashboardData,
     UserCreate, UserUpdate,
-    ProductBase,
+    ProductBase, ProductListResponse, ProductBatchResponse,
     ForgotPasswordRequest, ResetPasswordRequest, PasswordResetResponse,
 
     ExchangeRateCreate, ExchangeRateResponse,
@@ -59,6 +63,25 @@ from schemas import (
 from auth import get_current_user, get_current_user_optional, create_access_token, verify_token, get_password_hash, verify_password, authenticate_user
 from payment_service import payment_service
 from email_service import email_service
+from catalog_cache import catalog_cache, parse_batch_params, parse_product_fields, product_columns, serialize_product
+from cache_versions import cache_versions
+from http_cache import http_cache, CATALOG_POLICY, BLOG_POLICY, BLOG_POST_POLICY, EXCHANGE_RATE_POLICY
+from exchange_rates import exchange_rate_service
+from search_index import search_index
+from pagination import SortKey, keyset_page
+from review_stats import review_stats, review_state
+from package_cache import package_cache, PackageSource
+from file_serving import serve_file, is_resumed_request
+from download_events import download_events
+from bundle_jobs import bundle_jobs
+from bundle_store import bundle_store
+from paystack_client import paystack_client, PaystackError
+from webhook_inbox import webhook_inbox
+from reconcile_payments import create_reconciler
+from orders import insert_order_items
+from catalog_counters import catalog_counters, product_state
+from product_facets import compute_product_facets
+from tag_index import tag_index
 
 origins = [
     os.getenv('FRONTEND_URL', 'http://localhost:3000'),  # React dev server
@@ -111,87 +134,49 @@ def determine_payment_currency(country_code: str) -> str:
     else:
         return "USD"
 
-def convert_blog_post_json_fields(post):
-    """Convert JSON string fields back to lists for blog post responses"""
-    # Convert tags from JSON string to list
-    if post.tags:
-        try:
-            post.tags = json.loads(post.tags)
-        except:
-            post.tags = []
-    else:
-        post.tags = []
-    
-    # Convert youtube_links from JSON string to list
-    if post.youtube_links:
-        try:
-            post.youtube_links = json.loads(post.youtube_links)
-        except:
-            post.youtube_links = []
-    else:
-        post.youtube_links = []
-    
-    # Convert attached_files from JSON string to list
-    if post.attached_files:
-        try:
-            post.attached_files = json.loads(post.attached_files)
-        except:
-            post.attached_files = []
-    else:
-        post.attached_files = []
-    
-    # Convert gallery_images from JSON string to list
-    if post.gallery_images:
-        try:
-            post.gallery_images = json.loads(post.gallery_images)
-        except:
-            post.gallery_images = []
-    else:
-        post.gallery_images = []
-    
-    return post
-
-def convert_product_json_fields(product):
-    """Convert JSON string fields back to lists for product responses"""
-    # Convert tags from JSON string to list
-    if product.tags:
-        try:
-            product.tags = json.loads(product.tags)
-        except:
-            product.tags = []
-    else:
-        product.tags = []
-    
-    # Convert features from JSON string to list
-    if product.features:
-        try:
-            product.features = json.loads(product.features)
-        except:
-            product.features = []
-    else:
-        product.features = []
-    
-    # Convert images from JSON string to list
-    if product.images:
-        try:
-            product.images = json.loads(product.images)
-        except:
-            product.images = []
-    else:
-        product.images = []
-    
-    return product
-
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+# Create or verify the full-text search indexes
+search_index.setup()
+
+# Populate the tag tables for databases created before they existed
+with SessionLocal() as session:
+    tag_index.setup(session)
+    # Seed the listing counters; reads fall back to COUNT(*) until then
+    catalog_counters.setup(session)
+
 # Create uploads directory
 os.makedirs("./uploads/products", exist_ok=True)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Restart bundle builds left unfinished by stopped workers
+    await asyncio.to_thread(bundle_jobs.resume_stalled, payment_service.transaction_bundle)
+    # One pooled Paystack session per worker, kept alive between calls
+    await paystack_client.start()
+    # Apply webhook events received while no worker was running
+    webhook_inbox.start(payment_service.process_webhook_event)
+    # Verify transactions left pending against Paystack on a schedule
+    reconcile_task = None
+    if settings.reconcile_interval_minutes > 0:
+        reconcile_task = asyncio.create_task(
+            create_reconciler(payment_service).run_periodically(settings.reconcile_interval_minutes)
+        )
+    yield
+    if reconcile_task is not None:
+        reconcile_task.cancel()
+    await asyncio.to_thread(webhook_inbox.close)
+    await paystack_client.close()
+    bundle_jobs.shutdown()
+    # Write buffered download logs and counts before the worker exits
+    await asyncio.to_thread(download_events.close)
+
 app = FastAPI(
     title="JarvisTrade API",
     description="Backend API for JarvisTrade - Premium Trading Tools & Professional Services",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Custom static file handler with CORS headers
@@ -199,12 +184,13 @@ from fastapi.responses import FileResponse
 from pathlib import Path
 
 @app.get("/uploads/{file_path:path}")
-async def serve_uploaded_file(file_path: str):
+async def serve_uploaded_file(file_path: str, request: Request):
     """Serve uploaded files with CORS headers"""
     file_location = Path("uploads") / file_path
-    if file_location.exists():
-        return FileResponse(
-            path=str(file_location),
+    if file_location.is_file():
+        return serve_file(
+            request,
+            str(file_location),
             headers={
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Methods": "GET",
@@ -349,10 +335,8 @@ async def create_project_request(
 ):
     """Create a new project request"""
     try:
-        # Convert lists to JSON strings for SQLite compatibility
         project_data = project_request.dict()
-        project_data['platforms'] = json.dumps(project_data['platforms'])
-        project_data['file_uploads'] = json.dumps(project_data.get('file_uploads', []))
+        project_data['file_uploads'] = project_data.get('file_uploads') or []
         
         # Set user_id if user is logged in
         if current_user:
@@ -478,10 +462,6 @@ async def update_project_request(
     
     update_data = project_update.dict(exclude_unset=True)
     
-    # Convert lists to JSON strings for SQLite compatibility
-    if 'platforms' in update_data:
-        update_data['platforms'] = json.dumps(update_data['platforms'])
-    
     for field, value in update_data.items():
         setattr(db_project_request, field, value)
     
@@ -580,14 +560,23 @@ async def upload_project_files(
     }
 
 # Admin-specific project request endpoints
+# Keyset pagination sort keys for /api/admin/project-requests
+PROJECT_REQUEST_SORT_KEYS = {
+    "created_at": SortKey(ProjectRequest.created_at),
+    "project_title": SortKey(ProjectRequest.project_title),
+    "status": SortKey(ProjectRequest.status)
+}
+
 @app.get("/api/admin/project-requests", response_model=List[ProjectRequestResponse])
 async def get_admin_project_requests(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     status: Optional[str] = None,
     search: Optional[str] = None,
     sort_by: Optional[str] = "created_at",  # created_at, project_title, status
     sort_order: Optional[str] = "desc",  # asc, desc
+    cursor: Optional[str] = None,  # opt-in keyset pagination; pass an empty value for the first page
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -613,6 +602,16 @@ async def get_admin_project_requests(
         )
         query = query.filter(search_filter)
     
+    if cursor is not None:
+        if sort_by not in PROJECT_REQUEST_SORT_KEYS:
+            sort_by = "created_at"
+        project_requests, next_cursor = keyset_page(
+            query, PROJECT_REQUEST_SORT_KEYS[sort_by], ProjectRequest.id, sort_by, sort_order, cursor, limit
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return project_requests
+    
     # Apply sorting
     if sort_by == "project_title":
         order_column = ProjectRequest.project_title
@@ -670,10 +669,6 @@ async def update_admin_project_request(
     
     update_data = project_update.dict(exclude_unset=True)
     
-    # Convert lists to JSON strings for SQLite compatibility
-    if 'platforms' in update_data:
-        update_data['platforms'] = json.dumps(update_data['platforms'])
-    
     for field, value in update_data.items():
         setattr(db_project_request, field, value)
     
@@ -751,17 +746,20 @@ async def verify_payment(
                 detail=f"Payment verification failed: {verification_result['error']}"
             )
         
-        # Update transaction status based on Paystack response
+        # Update transaction status based on Paystack response; a success is
+        # recorded by process_successful_payment, together with the fulfillment
         paystack_status = verification_result["data"]["status"]
-        transaction.status = paystack_status
+        if paystack_status != "success":
+            transaction.status = paystack_status
         transaction.payment_data = json.dumps(verification_result["data"])
         db.commit()
         
         safe_log("payment", "info", f"Transaction {reference} status updated to: {paystack_status}")
         
-        # If payment is successful, process the payment
+        # If payment is successful, process the payment (its blocking database
+        # writes run off the event loop; the bundle is built in the background)
         if paystack_status == "success":
-            result = payment_service.process_successful_payment(db, reference, current_user)
+            result = await asyncio.to_thread(payment_service.process_successful_payment, db, reference, current_user)
             
             safe_log("payment", "info", f"Payment status: {paystack_status}")
             safe_log("payment", "info", f"Processing result: {result}")
@@ -789,7 +787,8 @@ async def verify_payment(
                     "success": True,
                     "message": "Payment verified and processed successfully",
                     "status": paystack_status,
-                    "download_token": result.get("download_token")
+                    "download_token": result.get("download_token"),
+                    "bundle_status": result.get("bundle_status")
                 }
             else:
                 # Only show processing error if payment was actually successful but processing failed
@@ -906,7 +905,9 @@ async def verify_payment_manual(
         if paystack_status in ["success", "failed", "abandoned"]:
             # Don't update if current status is already success and Paystack returns success
             if not (transaction.status == "success" and paystack_status == "success"):
-                transaction.status = paystack_status
+                # A success is recorded by process_successful_payment below
+                if paystack_status != "success":
+                    transaction.status = paystack_status
                 # Store both the full verification data and the extracted log
                 transaction.payment_data = json.dumps({
                     **verification_result["data"],
@@ -921,9 +922,10 @@ async def verify_payment_manual(
         else:
             safe_log("payment", "info", f"Transaction {reference} status remains {old_status}, Paystack returned: {paystack_status}")
         
-        # If payment is successful, process the payment
+        # If payment is successful, process the payment (its blocking database
+        # writes run off the event loop; the bundle is built in the background)
         if paystack_status == "success":
-            result = payment_service.process_successful_payment(db, reference, current_user)
+            result = await asyncio.to_thread(payment_service.process_successful_payment, db, reference, current_user)
             
             if result["success"]:
                 # Format amount based on the actual transaction currency
@@ -948,7 +950,8 @@ async def verify_payment_manual(
                     "success": True,
                     "message": "Payment verified and processed successfully",
                     "status": paystack_status,
-                    "download_token": result.get("download_token")
+                    "download_token": result.get("download_token"),
+                    "bundle_status": result.get("bundle_status")
                 }
             else:
                 return {
@@ -1074,7 +1077,9 @@ async def retry_payment(
                 {
                     "id": item.product_id,
                     "quantity": item.quantity,
-                    "price": item.price
+                    "price": item.price,
+                    "is_rental": item.is_rental,
+                    "rental_duration_days": item.rental_duration_days
                 } for item in order_items
             ]
             
@@ -1096,63 +1101,46 @@ async def retry_payment(
             }
             
             # Make request to Paystack
-            paystack_url = "https://api.paystack.co/transaction/initialize"
-            headers = {
-                "Authorization": f"Bearer {os.getenv('PAYSTACK_SECRET_KEY')}",
-                "Content-Type": "application/json"
-            }
+            response = await paystack_client.initialize_transaction(paystack_data)
+            response_data = response.data
+            safe_log("payment", "info", f"Paystack Response: {response_data}")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(paystack_url, json=paystack_data, headers=headers) as response:
-                    response_data = await response.json()
-                    safe_log("payment", "info", f"Paystack Response: {response_data}")
-                    
-                    if response.status == 200:
-                        paystack_response = response_data
-                        
-                        # Create new transaction record in database
-                        new_transaction = Transaction(
-                            user_id=current_user.id,
-                            paystack_reference=transaction_ref,
-                            amount=total_amount,
-                            currency=currency,
-                            status="pending",
-                            payment_data=json.dumps({
-                                **paystack_response["data"],
-                                "original_transaction_id": transaction.id,
-                                "original_transaction_reference": transaction.paystack_reference,
-                                "is_retry_payment": True
-                            }),
-                            purchased_items=json.dumps(cart_items)
-                        )
-                        
-                        db.add(new_transaction)
-                        db.commit()
-                        db.refresh(new_transaction)
-                        
-                        # Create order items for each product
-                        for item in order_items:
-                            new_order_item = OrderItem(
-                                transaction_id=new_transaction.id,
-                                product_id=item.product_id,
-                                quantity=item.quantity,
-                                price=item.price
-                            )
-                            db.add(new_order_item)
-                        
-                        db.commit()
-                        
-                        return {
-                            "success": True,
-                            "message": "New payment session created",
-                            "checkout_url": paystack_response["data"]["authorization_url"],
-                            "reference": transaction_ref
-                        }
-                    else:
-                        return {
-                            "success": False,
-                            "message": f"Failed to create payment session: {response_data}"
-                        }
+            if response.status == 200:
+                paystack_response = response_data
+                
+                # Create new transaction record in database
+                new_transaction = Transaction(
+                    id=str(uuid.uuid4()),
+                    user_id=current_user.id,
+                    paystack_reference=transaction_ref,
+                    amount=total_amount,
+                    currency=currency,
+                    status="pending",
+                    payment_data=json.dumps({
+                        **paystack_response["data"],
+                        "original_transaction_id": transaction.id,
+                        "original_transaction_reference": transaction.paystack_reference,
+                        "is_retry_payment": True
+                    }),
+                    purchased_items=cart_items
+                )
+                
+                db.add(new_transaction)
+                db.flush()
+                insert_order_items(db, new_transaction.id, cart_items, existing=())
+                db.commit()
+                
+                return {
+                    "success": True,
+                    "message": "New payment session created",
+                    "checkout_url": paystack_response["data"]["authorization_url"],
+                    "reference": transaction_ref
+                }
+            else:
+                return {
+                    "success": False,
+                    "message": f"Failed to create payment session: {response_data}"
+                }
         else:
             return {
                 "success": False,
@@ -1161,6 +1149,12 @@ async def retry_payment(
             
     except HTTPException:
         raise
+    except PaystackError as e:
+        safe_log("payment", "error", f"Payment retry error: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Payment provider unavailable, please try again"
+        )
     except Exception as e:
         safe_log("payment", "error", f"Payment retry error: {e}")
         raise HTTPException(
@@ -1202,6 +1196,44 @@ async def get_payment_status(
             detail=f"Failed to get payment status: {str(e)}"
         )
 
+@app.get("/api/payment/bundle/{reference}")
+async def get_bundle_status(
+    reference: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Status of the product bundle built after a payment, polled by the frontend"""
+    transaction = db.query(Transaction).filter(
+        Transaction.paystack_reference == reference,
+        Transaction.user_id == current_user.id
+    ).first()
+    if not transaction:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    
+    job = bundle_jobs.job_for_transaction(db, transaction.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No bundle for this payment")
+    
+    # Builds whose worker went away are started again
+    if await asyncio.to_thread(bundle_jobs.resume, db, job, payment_service.transaction_bundle):
+        db.refresh(job)
+    
+    download_token = db.query(DownloadToken).filter(DownloadToken.id == job.download_token_id).first()
+    result = {
+        "success": True,
+        "status": job.status,
+        "reference": reference,
+        "file_name": job.file_name,
+        "file_size": job.file_size,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "download_url": None
+    }
+    # Failed builds are still downloadable: the bundle is then zipped while it is sent
+    if job.status in ("ready", "failed") and download_token:
+        result["download_url"] = f"/api/download?token={download_token.token}"
+    return result
+
 @app.get("/api/payment/details/{reference}")
 async def get_payment_details(
     reference: str,
@@ -1318,26 +1350,16 @@ async def download_product(
         if not product.file_path or not os.path.exists(product.file_path):
             raise HTTPException(status_code=404, detail="Product file not found")
         
-        try:
-            # Log the download
-            download_log = DownloadLog(
+        # Log the download and update the download count in the background;
+        # resumed downloads continue one that was already logged and counted
+        if not is_resumed_request(request):
+            download_events.record(
                 user_id=current_user.id,
                 product_id=product_id,
-                license_id=None,  # No specific license required for digital downloads
                 ip_address=client_ip,
                 user_agent=user_agent,
-                download_status="success",
-                created_at=datetime.utcnow()
+                count_product=True
             )
-            db.add(download_log)
-            
-            # Update download count
-            product.download_count += 1
-            db.commit()
-        except Exception as e:
-            download_logger.warning(f"Failed to log download or update count: {e}")
-            # Continue with download even if logging fails
-            db.rollback()
         
         # Prepare file for streaming
         file_path = product.file_path
@@ -1360,67 +1382,26 @@ async def download_product(
             download_logger.error(f"Current working directory: {os.getcwd()}")
             raise HTTPException(status_code=404, detail="Product file not found after path normalization")
         
-        def zip_stream():
-            try:
-                import zipfile
-                import io
-                
-                # Create zip file in memory
-                zip_buffer = io.BytesIO()
-                
-                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    # Add the product file to the zip
-                    zip_file.write(file_path, original_file_name)
-                    download_logger.info(f"Added product file to zip: {original_file_name}")
-                    
-                    # Add a README file with product information
-                    readme_content = f"""Product: {product.name}
-Description: {product.description}
-Category: {product.category}
-Download Date: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
-File: {original_file_name}
-Size: {file_size} bytes
-
-This file was purchased from JarvisTrade.
-Please ensure you have a valid license for this product.
-"""
-                    zip_file.writestr("README.txt", readme_content)
-                    download_logger.info("Added README.txt to zip")
-                    
-                    # List zip contents for verification
-                    zip_file.printdir()
-                
-                # Reset buffer position
-                zip_buffer.seek(0)
-                
-                # Get zip file size
-                zip_size = zip_buffer.tell()
-                zip_buffer.seek(0)
-                
-                download_logger.info(f"Zip file created successfully - Size: {zip_size} bytes")
-                
-                # Stream the zip file
-                while True:
-                    chunk = zip_buffer.read(8192)
-                    if not chunk:
-                        break
-                    yield chunk
-                    
-            except Exception as e:
-                download_logger.error(f"Error creating zip file: {e}")
-                # Fallback to direct file streaming if zip creation fails
-                download_logger.info("Falling back to direct file streaming...")
-                try:
-                    with open(file_path, "rb") as f:
-                        while chunk := f.read(8192):
-                            yield chunk
-                except Exception as fallback_error:
-                    download_logger.error(f"Fallback streaming also failed: {fallback_error}")
-                    raise
-        
         # Generate zip filename
         zip_filename = f"{product.name.replace(' ', '_')}_{datetime.utcnow().strftime('%Y%m%d')}.zip"
         
+        # Serve the cached package for this product version, building it on first use
+        try:
+            package_path = await asyncio.to_thread(
+                package_cache.get_package, PackageSource.from_product(product, file_path)
+            )
+        except Exception as e:
+            download_logger.error(f"Error creating zip file: {e}")
+            # Fallback to direct file streaming if zip creation fails
+            download_logger.info("Falling back to direct file streaming...")
+            return serve_file(
+                request,
+                file_path,
+                media_type="application/octet-stream",
+                filename=original_file_name,
+                headers={"Cache-Control": "no-cache"}
+            )
+        
         # Log download details
         download_logger.info(f"Direct download - User: {current_user.email}")
         download_logger.info(f"Product: {product.name}")
@@ -1429,14 +1410,12 @@ Please ensure you have a valid license for this product.
         download_logger.info(f"Transaction: {user_transaction.id}")
         download_logger.info(f"Zip filename: {zip_filename}")
         
-        return StreamingResponse(
-            zip_stream(),
+        return serve_file(
+            request,
+            package_path,
             media_type="application/zip",
-            headers={
-                "Content-Disposition": f"attachment; filename=\"{zip_filename}\"",
-                "Content-Type": "application/zip",
-                "Cache-Control": "no-cache"
-            }
+            filename=zip_filename,
+            headers={"Cache-Control": "no-cache"}
         )
         
     except HTTPException:
@@ -1445,17 +1424,14 @@ Please ensure you have a valid license for this product.
         download_logger.error(f"Direct download error: {e}")
         # Log failed download
         if 'current_user' in locals() and 'product_id' in locals():
-            download_log = DownloadLog(
+            download_events.record(
                 user_id=current_user.id,
                 product_id=product_id,
                 ip_address=client_ip,
                 user_agent=user_agent,
-                download_status="failed",
-                error_message=str(e),
-                created_at=datetime.utcnow()
+                success=False,
+                error_message=str(e)
             )
-            db.add(download_log)
-            db.commit()
         
         raise HTTPException(
             status_code=500,
@@ -1475,8 +1451,16 @@ async def download_file(
         client_ip = request.client.host
         user_agent = request.headers.get("user-agent", "")
         
-        # Validate token
-        result = payment_service.validate_download_token(db, token, client_ip, user_agent)
+        # Validate token; evicted bundles are queued for a rebuild
+        result = await asyncio.to_thread(payment_service.validate_download_token, db, token, client_ip, user_agent)
+        
+        # The bundle bought with this token is still being built
+        if result.get("pending"):
+            return JSONResponse(
+                status_code=202,
+                content={"status": result["bundle_status"], "message": result["error"]},
+                headers={"Retry-After": "5"}
+            )
         
         if not result["success"]:
             raise HTTPException(
@@ -1485,23 +1469,31 @@ async def download_file(
             )
         
         # Stream the file
-        file_path = result["file_path"]
-        file_name = os.path.basename(file_path)
+        file_path = result.get("file_path")
+        file_name = result.get("file_name") or os.path.basename(file_path)
         
-        # Create download notification
-        create_notification(
-            db=db,
-            user_id=result["user_id"],
-            title="Download Successful",
-            message=f"Your product has been downloaded successfully. File: {file_name}",
-            notification_type="success",
-            data={"product_id": result.get("product_id"), "file_name": file_name, "download_time": datetime.utcnow().isoformat()}
-        )
+        # Create download notification (once, not for each resumed part)
+        if not is_resumed_request(request):
+            create_notification(
+                db=db,
+                user_id=result["user_id"],
+                title="Download Successful",
+                message=f"Your product has been downloaded successfully. File: {file_name}",
+                notification_type="success",
+                data={"product_id": result.get("product_id"), "file_name": file_name, "download_time": datetime.utcnow().isoformat()}
+            )
         
-        def file_stream():
-            with open(file_path, "rb") as f:
-                while chunk := f.read(8192):
-                    yield chunk
+        # Bundles of several products are zipped on the fly as they are sent
+        if result.get("bundle") is not None:
+            download_logger.info(f"Streaming product bundle: {file_name}")
+            return StreamingResponse(
+                iter(result["bundle"]),
+                media_type="application/zip",
+                headers={
+                    "Content-Disposition": f"attachment; filename=\"{file_name}\"",
+                    "Cache-Control": "no-cache"
+                }
+            )
         
         # Log download details for debugging
         download_logger.info(f"Downloading file: {file_path}")
@@ -1515,15 +1507,12 @@ async def download_file(
         if actual_size != result["file_size"]:
             download_logger.warning(f"File size mismatch! Database: {result['file_size']}, Actual: {actual_size}")
         
-        return StreamingResponse(
-            file_stream(),
-            media_type="application/octet-stream",
-            headers={
-                "Content-Disposition": f"attachment; filename=\"{file_name}\"",
-                "Content-Length": str(actual_size),
-                "Accept-Ranges": "bytes",
-                "Cache-Control": "no-cache"
-            }
+        return serve_file(
+            request,
+            file_path,
+            media_type="application/zip" if result.get("is_zip") else "application/octet-stream",
+            filename=file_name,
+            headers={"Cache-Control": "no-cache"}
         )
         
     except HTTPException:
@@ -1602,41 +1591,47 @@ async def get_payment_success_data(
 
 # Categories endpoint
 @app.get("/api/categories", response_model=List[CategoryResponse])
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(request: Request, response: Response, db: Session = Depends(get_db)):
     """Get all product categories with counts"""
-    categories = []
-    
-    for category_id in PRODUCT_CATEGORIES:
-        # Get count of products in this category
-        count = db.query(Product).filter(
-            Product.category == category_id,
-            Product.is_active == True
-        ).count()
-        
-        # Map category ID to display name
-        category_names = {
-            "trading-bot": "Trading Bots",
-            "indicator": "Indicators", 
-            "analysis-tool": "Analysis Tools",
-            "risk-management": "Risk Management",
-            "education": "Education"
-        }
-        
-        categories.append(CategoryResponse(
-            id=category_id,
-            name=category_names.get(category_id, category_id.title()),
-            count=count
-        ))
+    not_modified = http_cache.check(request, response, CATALOG_POLICY)
+    if not_modified:
+        return not_modified
     
-    return categories
+    facets = catalog_cache.get_facets(
+        catalog_cache.listing_key(),
+        lambda: compute_product_facets(db.query(Product).filter(Product.is_active == True))
+    )
+    return [
+        CategoryResponse(id=bucket["value"], name=bucket["label"], count=bucket["count"])
+        for bucket in facets["categories"]
+        if bucket["value"] in PRODUCT_CATEGORIES
+    ]
 
 
+@app.get("/api/tags", response_model=List[TagResponse])
+async def get_tags(
+    source: str = "blog",  # blog, product
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """Get tags with the number of published blog posts or active products using them"""
+    if source == "blog":
+        tag_counts = tag_index.blog_tag_counts(db, limit=limit)
+    elif source == "product":
+        tag_counts = tag_index.product_tag_counts(db, limit=limit)
+    else:
+        raise HTTPException(status_code=400, detail="Tag source must be 'blog' or 'product'")
+    
+    return [TagResponse(tag=tag, count=count) for tag, count in tag_counts]
+
 # Notification endpoints
 @app.get("/api/notifications", response_model=List[NotificationResponse])
 async def get_notifications(
+    response: Response,
     skip: int = 0,
     limit: int = 50,
     unread_only: bool = False,
+    cursor: Optional[str] = None,  # opt-in keyset pagination; pass an empty value for the first page
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -1646,6 +1641,14 @@ async def get_notifications(
     if unread_only:
         query = query.filter(Notification.is_read == False)
     
+    if cursor is not None:
+        notifications, next_cursor = keyset_page(
+            query, SortKey(Notification.created_at), Notification.id, "created_at", "desc", cursor, limit
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return notifications
+    
     notifications = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
     return notifications
 
@@ -1783,7 +1786,7 @@ def create_notification(
             "title": title,
             "message": message,
             "type": notification_type,
-            "data": json.dumps(data) if data else None
+            "data": data or None
         }
 
         notification = Notification(**notification_data)
@@ -1843,23 +1846,73 @@ def ensure_unique_slug(db: Session, slug: str, product_id: str = None, counter:
     return test_slug
 
 # Product endpoints
-@app.get("/api/products", response_model=List[ProductResponse])
+# Keyset pagination sort keys for /api/products
+PRODUCT_SORT_KEYS = {
+    "created_at": SortKey(Product.created_at),
+    "price": SortKey(Product.price),
+    "rating": SortKey(Product.rating),
+    "name": SortKey(Product.name)
+}
+
+def parse_fields_param(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Validate the ``fields`` query parameter of the product list endpoints"""
+    try:
+        return parse_product_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def sparse_response(content, response: Response) -> JSONResponse:
+    """Return trimmed product payloads without the response model filling omitted fields back in.
+
+    Headers already set on ``response`` (totals, cursors, ETags) are carried over.
+    """
+    sparse = JSONResponse(jsonable_encoder(content))
+    for key, value in response.headers.items():
+        if key != "content-length":
+            sparse.headers[key] = value
+    return sparse
+
+@app.get("/api/products", response_model=Union[List[ProductResponse], ProductListResponse])
 async def get_products(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 50,
     category: Optional[str] = None,
     platform: Optional[str] = None,
+    tag: Optional[str] = None,
     search: Optional[str] = None,
     featured: Optional[bool] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     min_rating: Optional[float] = None,
-    sort_by: Optional[str] = "created_at",  # created_at, price, rating, name
+    sort_by: Optional[str] = None,  # created_at, price, rating, name, relevance (default: relevance when searching, else created_at)
     sort_order: Optional[str] = "desc",  # asc, desc
+    cursor: Optional[str] = None,  # opt-in keyset pagination; pass an empty value for the first page
+    envelope: bool = False,  # wrap the page as {items, total, skip, limit, next_cursor}
+    facets: bool = False,  # include facet counts for the filter sidebar (implies envelope)
+    fields: Optional[str] = None,  # comma separated product fields to return, e.g. id,name,price,image,rating
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    """Get products with optional currency conversion"""
+    """Get products with optional currency conversion.
+
+    The total number of matching products is returned in the X-Total-Count
+    header, or in the response body when ``envelope`` is set. ``facets`` adds
+    category, platform, price range and rating counts for the current filters.
+    ``fields`` restricts both the columns loaded and the fields returned.
+    """
+    sparse_fields = parse_fields_param(fields)
+    
+    # Always convert prices to user currency if authenticated, otherwise use USD
+    user_currency = "USD"
+    if current_user and current_user.currency:
+        user_currency = current_user.currency
+    
+    not_modified = http_cache.check(request, response, CATALOG_POLICY, user_currency)
+    if not_modified:
+        return not_modified
+    
     query = db.query(Product).filter(Product.is_active == True)
     
     # Apply filters
@@ -1869,15 +1922,12 @@ async def get_products(
     if platform:
         query = query.filter(Product.platform == platform)
     
+    if tag:
+        query = query.join(ProductTag, ProductTag.product_id == Product.id).filter(ProductTag.tag == tag)
+    
+    search_score = None
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Product.name.ilike(search_term),
-                Product.description.ilike(search_term),
-                Product.short_description.ilike(search_term)
-            )
-        )
+        query, search_score = search_index.apply(query, Product, search)
     
     if featured is not None:
         query = query.filter(Product.is_featured == featured)
@@ -1896,170 +1946,177 @@ async def get_products(
         query = query.filter(Product.price <= max_price)
     
     # Apply sorting
-    if sort_by == "price":
-        order_column = Product.price
-    elif sort_by == "rating":
-        order_column = Product.rating
-    elif sort_by == "name":
-        order_column = Product.name
-    else:
-        order_column = Product.created_at
+    if sort_by is None:
+        sort_by = "relevance" if search_score is not None else "created_at"
+    
+    rates = exchange_rate_service.snapshot(db)
+    convert = lambda amount: rates.convert(amount, "USD", user_currency)
+    
+    filter_key = catalog_cache.listing_key(
+        category=category,
+        platform=platform,
+        tag=tag,
+        featured=featured,
+        min_price=min_price,
+        max_price=max_price,
+        min_rating=min_rating
+    )
     
-    if sort_order == "asc":
-        query = query.order_by(order_column.asc())
+    def count_products(loader):
+        # Unfiltered and category-only totals come from maintained counters;
+        # other filter sets are cached until the next product write
+        if search:
+            return loader()
+        if platform is None and tag is None and featured is None and min_price is None and max_price is None and min_rating is None:
+            return catalog_counters.get(db, category)
+        return catalog_cache.get_count(filter_key, loader)
+    
+    def product_page(items, total, next_cursor=None):
+        response.headers["X-Total-Count"] = str(total)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if not (envelope or facets):
+            return sparse_response(items, response) if sparse_fields else items
+        page = {"items": items, "total": total, "skip": skip, "limit": limit, "next_cursor": next_cursor}
+        if facets:
+            loader = lambda: compute_product_facets(query)
+            page["facets"] = loader() if search else catalog_cache.get_facets(filter_key, loader)
+        return sparse_response(page, response) if sparse_fields else page
+    
+    if cursor is not None:
+        if sort_by == "relevance":
+            raise HTTPException(status_code=400, detail="Cursor pagination is not available for relevance sorting")
+        if sort_by not in PRODUCT_SORT_KEYS:
+            sort_by = "created_at"
+        rows, next_cursor = keyset_page(
+            query.with_entities(Product.id, Product.created_at, Product.price, Product.rating, Product.name),
+            PRODUCT_SORT_KEYS[sort_by], Product.id, sort_by, sort_order, cursor, limit
+        )
+        items = catalog_cache.get_rows(db, [row.id for row in rows], user_currency, convert, sparse_fields)
+        return product_page(items, count_products(query.count), next_cursor)
+    
+    if sort_by == "relevance" and search_score is not None:
+        query = query.order_by(search_score.desc(), Product.created_at.desc())
     else:
-        query = query.order_by(order_column.desc())
+        if sort_by == "price":
+            order_column = Product.price
+        elif sort_by == "rating":
+            order_column = Product.rating
+        elif sort_by == "name":
+            order_column = Product.name
+        else:
+            order_column = Product.created_at
+        
+        if sort_order == "asc":
+            query = query.order_by(order_column.asc())
+        else:
+            query = query.order_by(order_column.desc())
     
-    # Get total count before pagination
-    total_count = query.count()
+    # Resolve the ordered product ids for this filter set, then slice the page
+    listing_loader = lambda: [row.id for row in query.with_entities(Product.id).all()]
+    if search:
+        # Free-text searches are too varied to be worth caching as listings,
+        # so only the page is read
+        page_ids = [row.id for row in query.with_entities(Product.id).offset(skip).limit(limit).all()]
+        count_loader = query.order_by(None).count
+    else:
+        listing_key = catalog_cache.listing_key(
+            category=category,
+            platform=platform,
+            tag=tag,
+            featured=featured,
+            min_price=min_price,
+            max_price=max_price,
+            min_rating=min_rating,
+            sort_by=sort_by,
+            sort_order=sort_order
+        )
+        product_ids = catalog_cache.get_listing(listing_key, listing_loader)
+        page_ids = product_ids[skip:skip + limit]
+        count_loader = lambda: len(product_ids)
     
-    # Apply pagination
-    products = query.offset(skip).limit(limit).all()
+    items = catalog_cache.get_rows(db, page_ids, user_currency, convert, sparse_fields)
+    return product_page(items, count_products(count_loader))
+
+@app.get("/api/products/featured", response_model=List[ProductResponse])
+async def get_featured_products(
+    request: Request,
+    response: Response,
+    limit: int = 6,
+    fields: Optional[str] = None,  # comma separated product fields to return
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """Get featured products with currency conversion"""
+    sparse_fields = parse_fields_param(fields)
     
     # Always convert prices to user currency if authenticated, otherwise use USD
     user_currency = "USD"
     if current_user and current_user.currency:
         user_currency = current_user.currency
     
-    # Convert product prices
-    converted_products = []
-    for product in products:
-        product_dict = {
-            "id": product.id,
-            "name": product.name,
-            "slug": product.slug,
-            "description": product.description,
-            "short_description": product.short_description,
-            "price": product.price,
-            "original_price": product.original_price,
-            "category": product.category,
-            "platform": product.platform or "MT4",
-            "image": product.image,
-            "tags": json.loads(product.tags) if product.tags else [],
-            "features": json.loads(product.features) if product.features else [],
-            "images": json.loads(product.images) if product.images else [],
-            "rating": product.rating or 0.0,
-            "total_reviews": product.total_reviews,
-            "is_active": product.is_active,
-            "is_featured": product.is_featured,
-            "is_digital": product.is_digital,
-            "file_path": product.file_path,
-            "file_size": product.file_size,
-            "download_count": product.download_count,
-            "youtube_demo_link": product.youtube_demo_link,
-            "test_download_link": product.test_download_link,
-            "max_activations": product.max_activations,
-            "version": product.version,
-            "user_id": product.user_id,
-            "created_at": product.created_at,
-            "updated_at": product.updated_at,
-            
-            # Rental fields
-            "has_rental_option": product.has_rental_option or False,
-            "rental_price": product.rental_price,
-            "rental_duration_days": product.rental_duration_days or 30
-        }
-        
-        # Always convert price to user currency
-        if user_currency != "USD":
-            converted_price = convert_currency(product.price, "USD", user_currency, db)
-            product_dict["price"] = converted_price
-            if product.original_price:
-                converted_original_price = convert_currency(product.original_price, "USD", user_currency, db)
-                product_dict["original_price"] = converted_original_price
-            
-            # Convert rental price if available
-            if product.rental_price:
-                converted_rental_price = convert_currency(product.rental_price, "USD", user_currency, db)
-                product_dict["rental_price"] = converted_rental_price
-        
-        # Add currency information
-        product_dict["currency"] = user_currency
-        product_dict["currency_symbol"] = get_currency_symbol(user_currency)
-        
-        converted_products.append(product_dict)
+    not_modified = http_cache.check(request, response, CATALOG_POLICY, user_currency)
+    if not_modified:
+        return not_modified
     
-    return converted_products
+    product_ids = catalog_cache.get_listing(
+        catalog_cache.listing_key(featured_limit=limit),
+        lambda: [row.id for row in db.query(Product.id).filter(
+            Product.is_active == True,
+            Product.is_featured == True
+        ).order_by(Product.created_at.desc()).limit(limit).all()]
+    )
+    
+    rates = exchange_rate_service.snapshot(db)
+    items = catalog_cache.get_rows(
+        db, product_ids, user_currency,
+        lambda amount: rates.convert(amount, "USD", user_currency),
+        sparse_fields
+    )
+    return sparse_response(items, response) if sparse_fields else items
 
-@app.get("/api/products/featured", response_model=List[ProductResponse])
-async def get_featured_products(
-    limit: int = 6,
+@app.get("/api/products/batch", response_model=ProductBatchResponse)
+async def get_products_batch(
+    request: Request,
+    response: Response,
+    ids: Optional[str] = None,  # comma separated product ids
+    slugs: Optional[str] = None,  # comma separated product slugs
+    fields: Optional[str] = None,  # comma separated product fields to return
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    """Get featured products with currency conversion"""
-    products = db.query(Product).filter(
-        Product.is_active == True,
-        Product.is_featured == True
-    ).order_by(Product.created_at.desc()).limit(limit).all()
+    """Resolve many products by id and/or slug in one request.
+
+    Items follow the request order (ids first, then slugs) with null for
+    products that were not found; those are also listed in ``missing_ids``
+    and ``missing_slugs``. Prices are converted like the single product
+    endpoint.
+    """
+    try:
+        product_ids, product_slugs = parse_batch_params(ids, slugs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    sparse_fields = parse_fields_param(fields)
     
-    # Always convert prices to user currency if authenticated, otherwise use USD
     user_currency = "USD"
     if current_user and current_user.currency:
         user_currency = current_user.currency
     
-    # Convert product prices
-    converted_products = []
-    for product in products:
-        product_dict = {
-            "id": product.id,
-            "name": product.name,
-            "slug": product.slug,
-            "description": product.description,
-            "short_description": product.short_description,
-            "price": product.price,
-            "original_price": product.original_price,
-            "category": product.category,
-            "platform": product.platform or "MT4",
-            "image": product.image,
-            "tags": json.loads(product.tags) if product.tags else [],
-            "features": json.loads(product.features) if product.features else [],
-            "images": json.loads(product.images) if product.images else [],
-            "rating": product.rating or 0.0,
-            "total_reviews": product.total_reviews,
-            "is_active": product.is_active,
-            "is_featured": product.is_featured,
-            "is_digital": product.is_digital,
-            "file_path": product.file_path,
-            "file_size": product.file_size,
-            "download_count": product.download_count,
-            "youtube_demo_link": product.youtube_demo_link,
-            "test_download_link": product.test_download_link,
-            "max_activations": product.max_activations,
-            "version": product.version,
-            "user_id": product.user_id,
-            "created_at": product.created_at,
-            "updated_at": product.updated_at,
-            
-            # Rental fields
-            "has_rental_option": product.has_rental_option or False,
-            "rental_price": product.rental_price,
-            "rental_duration_days": product.rental_duration_days or 30
-        }
-        
-        # Always convert price to user currency
-        if user_currency != "USD":
-            converted_price = convert_currency(product.price, "USD", user_currency, db)
-            product_dict["price"] = converted_price
-            if product.original_price:
-                converted_original_price = convert_currency(product.original_price, "USD", user_currency, db)
-                product_dict["original_price"] = converted_original_price
-            
-            # Convert rental price if available
-            if product.rental_price:
-                converted_rental_price = convert_currency(product.rental_price, "USD", user_currency, db)
-                product_dict["rental_price"] = converted_rental_price
-        
-        # Add currency information
-        product_dict["currency"] = user_currency
-        product_dict["currency_symbol"] = get_currency_symbol(user_currency)
-        
-        converted_products.append(product_dict)
+    not_modified = http_cache.check(request, response, CATALOG_POLICY, user_currency)
+    if not_modified:
+        return not_modified
     
-    return converted_products
+    rates = exchange_rate_service.snapshot(db)
+    batch = catalog_cache.get_batch(
+        db, product_ids, product_slugs, user_currency,
+        lambda amount: rates.convert(amount, "USD", user_currency),
+        sparse_fields
+    )
+    return sparse_response(batch, response) if sparse_fields else batch
 
 @app.get("/api/admin/products", response_model=List[ProductResponse])
 async def get_admin_products(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     category: Optional[str] = None,
@@ -2068,8 +2125,9 @@ async def get_admin_products(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     min_rating: Optional[float] = None,
-    sort_by: Optional[str] = "created_at",  # created_at, price, rating, name
+    sort_by: Optional[str] = "created_at",  # created_at, price, rating, name, relevance
     sort_order: Optional[str] = "desc",  # asc, desc
+    fields: Optional[str] = None,  # comma separated product fields to return
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -2080,6 +2138,8 @@ async def get_admin_products(
             detail="Admin access required"
         )
     
+    sparse_fields = parse_fields_param(fields)
+    
     query = db.query(Product)  # No filter for is_active - returns all products
     
     # Apply filters
@@ -2088,12 +2148,9 @@ async def get_admin_products(
             raise HTTPException(status_code=400, detail=f"Invalid category. Must be one of: {', '.join(PRODUCT_CATEGORIES)}")
         query = query.filter(Product.category == category)
     
+    search_score = None
     if search:
-        query = query.filter(
-            Product.name.ilike(f"%{search}%") |
-            Product.description.ilike(f"%{search}%") |
-            Product.short_description.ilike(f"%{search}%")
-        )
+        query, search_score = search_index.apply(query, Product, search)
     
     if featured is not None:
         query = query.filter(Product.is_featured == featured)
@@ -2108,7 +2165,9 @@ async def get_admin_products(
         query = query.filter(Product.rating >= min_rating)
     
     # Apply sorting
-    if sort_by == "price":
+    if sort_by == "relevance" and search_score is not None:
+        query = query.order_by(search_score.desc(), Product.created_at.desc())
+    elif sort_by == "price":
         if sort_order == "asc":
             query = query.order_by(Product.price.asc())
         else:
@@ -2129,12 +2188,19 @@ async def get_admin_products(
         else:
             query = query.order_by(Product.created_at.desc())
     
+    if sparse_fields:
+        query = query.options(load_only(*product_columns(sparse_fields)))
+        products = query.offset(skip).limit(limit).all()
+        return sparse_response([serialize_product(product, sparse_fields) for product in products], response)
+    
     products = query.offset(skip).limit(limit).all()
     return products
 
 @app.get("/api/products/{product_id}", response_model=ProductResponse)
 async def get_product(
     product_id: str, 
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
     ):
@@ -2156,6 +2222,10 @@ async def get_product(
     if current_user and current_user.currency:
         user_currency = current_user.currency
     
+    not_modified = http_cache.check(request, response, CATALOG_POLICY, user_currency)
+    if not_modified:
+        return not_modified
+    
     product_dict = {
         "id": product.id,
         "name": product.name,
@@ -2167,9 +2237,9 @@ async def get_product(
         "category": product.category,
         "platform": product.platform or "MT4",
         "image": product.image,
-        "tags": json.loads(product.tags) if product.tags else [],
-        "features": json.loads(product.features) if product.features else [],
-        "images": json.loads(product.images) if product.images else [],
+        "tags": product.tags or [],
+        "features": product.features or [],
+        "images": product.images or [],
         "rating": product.rating or 0.0,
         "total_reviews": product.total_reviews,
         "is_active": product.is_active,
@@ -2194,16 +2264,16 @@ async def get_product(
     
     # Always convert price to user currency
     if user_currency != "USD":
-        converted_price = convert_currency(product.price, "USD", user_currency, db)
-        product_dict["price"] = converted_price
+        price, original_price, rental_price = exchange_rate_service.convert_many(
+            [product.price, product.original_price, product.rental_price], "USD", user_currency, db
+        )
+        product_dict["price"] = price
         if product.original_price:
-            converted_original_price = convert_currency(product.original_price, "USD", user_currency, db)
-            product_dict["original_price"] = converted_original_price
+            product_dict["original_price"] = original_price
         
         # Convert rental price if available
         if product.rental_price:
-            converted_rental_price = convert_currency(product.rental_price, "USD", user_currency, db)
-            product_dict["rental_price"] = converted_rental_price
+            product_dict["rental_price"] = rental_price
     
     # Add currency information
     product_dict["currency"] = user_currency
@@ -2224,14 +2294,10 @@ async def create_product(
             detail="Admin access required"
         )
     
-    # Convert lists to JSON strings for SQLite compatibility
     product_data = product.dict()
-    if 'tags' in product_data:
-        product_data['tags'] = json.dumps(product_data['tags'] or [])
-    if 'features' in product_data:
-        product_data['features'] = json.dumps(product_data['features'] or [])
-    if 'images' in product_data:
-        product_data['images'] = json.dumps(product_data['images'] or [])
+    for field in ('tags', 'features', 'images'):
+        if field in product_data:
+            product_data[field] = product_data[field] or []
     
     # Generate slug from product name if not provided, or ensure custom slug is unique
     if not product_data.get('slug'):
@@ -2246,9 +2312,13 @@ async def create_product(
     
     db_product = Product(**product_data)
     db.add(db_product)
+    db.flush()
+    catalog_counters.adjust(db, None, product_state(db_product))
+    tag_index.sync_product(db, db_product)
     db.commit()
     db.refresh(db_product)
-    return convert_product_json_fields(db_product)
+    catalog_cache.invalidate()
+    return db_product
 
 @app.put("/api/products/{product_id}", response_model=ProductResponse)
 async def update_product(
@@ -2288,15 +2358,16 @@ async def update_product(
             # Ensure custom slug is unique
             update_data['slug'] = ensure_unique_slug(db, update_data['slug'], product_id)
         
+        state_before = product_state(product)
         for field, value in update_data.items():
-            # Handle list fields by converting them to JSON strings
-            if field in ['tags', 'features', 'images'] and isinstance(value, list):
-                setattr(product, field, json.dumps(value) if value else None)
-            else:
-                setattr(product, field, value)
+            setattr(product, field, value)
+        catalog_counters.adjust(db, state_before, product_state(product))
+        if 'tags' in update_data:
+            tag_index.sync_product(db, product)
         
         db.commit()
         db.refresh(product)
+        catalog_cache.invalidate()
         
         # Send notifications to users who purchased this product
         if is_version_update or is_bug_fix:
@@ -2320,7 +2391,7 @@ async def update_product(
                     data={"product_id": product_id, "product_name": product.name, "version": product.version}
                 )
         
-        return convert_product_json_fields(product)
+        return product
         
     except Exception as e:
         product_logger.error(f"Error updating product: {e}")
@@ -2344,8 +2415,12 @@ async def delete_product(
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    catalog_counters.adjust(db, product_state(db_product), None)
+    tag_index.remove_product(db, db_product.id)
+    review_stats.remove_product(db, db_product.id)
     db.delete(db_product)
     db.commit()
+    catalog_cache.invalidate()
     return {"message": "Product deleted successfully"}
 
 # Review endpoints
@@ -2389,6 +2464,24 @@ async def get_product_reviews(
     
     return review_responses
 
+@app.get("/api/products/{product_id}/reviews/summary", response_model=ReviewSummaryResponse)
+async def get_product_review_summary(
+    product_id: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """Get the average rating, review count and star histogram of a product"""
+    product = db.query(Product.id).filter(Product.id == product_id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    not_modified = http_cache.check(request, response, CATALOG_POLICY)
+    if not_modified:
+        return not_modified
+    
+    return review_stats.summary(db, product_id)
+
 @app.post("/api/products/{product_id}/reviews", response_model=ReviewResponse)
 async def create_review(
     product_id: str,
@@ -2404,10 +2497,10 @@ async def create_review(
             raise HTTPException(status_code=404, detail="Product not found")
         
         # Check if user has purchased the product
-        transaction = db.query(Transaction).filter(
+        transaction = db.query(Transaction).join(OrderItem).filter(
             Transaction.user_id == current_user.id,
-            Transaction.product_id == product_id,
-            Transaction.status == "success"
+            Transaction.status == "success",
+            OrderItem.product_id == product_id
         ).first()
         
         if not transaction:
@@ -2432,16 +2525,13 @@ async def create_review(
         )
         
         db.add(db_review)
+        db.flush()
+        
+        # Update the product's rating aggregates in the same transaction
+        review_stats.adjust(db, product_id, None, review_state(db_review))
         db.commit()
         db.refresh(db_review)
-        
-        # Update product average rating
-        reviews = db.query(Review).filter(Review.product_id == product_id).all()
-        if reviews:
-            avg_rating = sum(r.rating for r in reviews) / len(reviews)
-            product.average_rating = round(avg_rating, 1)
-            product.review_count = len(reviews)
-            db.commit()
+        catalog_cache.invalidate()
         
         # Send notification to admin about new review
         admin_users = db.query(User).filter(User.is_admin == True).all()
@@ -2465,7 +2555,19 @@ async def create_review(
             data={"product_id": product_id, "review_id": db_review.id, "rating": review.rating}
         )
         
-        return convert_review_json_fields(db_review)
+        return ReviewResponse(
+            id=db_review.id,
+            user_id=db_review.user_id,
+            product_id=db_review.product_id,
+            rating=db_review.rating,
+            comment=db_review.comment,
+            is_verified_purchase=db_review.is_verified_purchase,
+            is_approved=db_review.is_approved,
+            created_at=db_review.created_at,
+            updated_at=db_review.updated_at,
+            user_name=current_user.name,
+            user_email=current_user.email
+        )
         
     except HTTPException:
         raise
@@ -2490,13 +2592,19 @@ async def update_review(
     if db_review.user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="You can only update your own reviews")
     
-    # Update the review
+    # Update the review and the product's rating aggregates
     update_data = review_update.dict(exclude_unset=True)
+    before = review_state(db_review)
     for field, value in update_data.items():
         setattr(db_review, field, value)
+    db.flush()
+    after = review_state(db_review)
+    review_stats.adjust(db, db_review.product_id, before, after)
     
     db.commit()
     db.refresh(db_review)
+    if before != after:
+        catalog_cache.invalidate()
     
     # Get user info
     user = db.query(User).filter(User.id == db_review.user_id).first()
@@ -2530,27 +2638,14 @@ async def delete_review(
     if db_review.user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="You can only delete your own reviews")
     
-    # Delete the review
+    # Delete the review and update the product's rating aggregates
+    before = review_state(db_review)
     db.delete(db_review)
+    db.flush()
+    review_stats.adjust(db, db_review.product_id, before, None)
     db.commit()
-    
-    # Update product rating and total reviews
-    product_id = db_review.product_id
-    all_reviews = db.query(Review).filter(
-        Review.product_id == product_id,
-        Review.is_approved == True
-    ).all()
-    
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if product:
-        if all_reviews:
-            avg_rating = sum(r.rating for r in all_reviews) / len(all_reviews)
-            product.rating = round(avg_rating, 1)
-            product.total_reviews = len(all_reviews)
-        else:
-            product.rating = 0.0
-            product.total_reviews = 0
-        db.commit()
+    if before is not None:
+        catalog_cache.invalidate()
     
     return {"message": "Review deleted successfully"}
 
@@ -2790,13 +2885,7 @@ async def get_user_dashboard(
     # Convert projects to the expected format
     projects = []
     for project in user_projects:
-        # Parse platforms from JSON string
-        platforms = []
-        if project.platforms:
-            try:
-                platforms = json.loads(project.platforms) if isinstance(project.platforms, str) else project.platforms
-            except (json.JSONDecodeError, TypeError):
-                platforms = []
+        platforms = project.platforms or []
         
         projects.append({
             "id": project.id,
@@ -2829,14 +2918,23 @@ async def get_user_dashboard(
     }
 
 # Admin User Management Endpoints
+# Keyset pagination sort keys for /api/admin/users
+USER_SORT_KEYS = {
+    "created_at": SortKey(User.created_at),
+    "name": SortKey(User.name),
+    "email": SortKey(User.email)
+}
+
 @app.get("/api/admin/users", response_model=List[UserResponse])
 async def get_all_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
     role: Optional[str] = None,  # "admin", "client", "all"
     sort_by: Optional[str] = "created_at",  # created_at, name, email
     sort_order: Optional[str] = "desc",  # asc, desc
+    cursor: Optional[str] = None,  # opt-in keyset pagination; pass an empty value for the first page
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -2862,6 +2960,14 @@ async def get_all_users(
     elif role == "client":
         query = query.filter(User.is_client == True)
     
+    if cursor is not None:
+        if sort_by not in USER_SORT_KEYS:
+            sort_by = "created_at"
+        users, next_cursor = keyset_page(query, USER_SORT_KEYS[sort_by], User.id, sort_by, sort_order, cursor, limit)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return users
+    
     # Apply sorting
     if sort_by == "name":
         if sort_order == "asc":
@@ -3328,31 +3434,20 @@ async def process_free_products(cart_items: list, current_user: User, db: Sessio
         transaction_ref = f"FREE_{datetime.now().strftime('%Y%m%d')}_{uuid.uuid4().hex[:8].upper()}"
         
         transaction = Transaction(
+            id=str(uuid.uuid4()),
             user_id=current_user.id,
             paystack_reference=transaction_ref,
             amount=0.0,
             currency="USD",
             status="success",  # Mark as successful immediately for free products
             payment_data=json.dumps({"type": "free_product", "items": cart_items}),
-            purchased_items=json.dumps(cart_items)
+            purchased_items=cart_items
         )
         
         db.add(transaction)
-        db.commit()
-        db.refresh(transaction)
-        
-        # Create order items for each product
-        for item in cart_items:
-            order_item = OrderItem(
-                transaction_id=transaction.id,
-                product_id=item["id"],
-                quantity=item["quantity"],
-                price=0.0,  # Free products have 0 price
-                is_rental=item.get("is_rental", False),
-                rental_duration_days=item.get("rental_duration_days")
-            )
-            db.add(order_item)
-        
+        db.flush()
+        # Free products have 0 price
+        insert_order_items(db, transaction.id, cart_items, free=True, existing=())
         db.commit()
         
         # Create notification for successful free product acquisition
@@ -3457,95 +3552,56 @@ async def checkout(
             }
             
             # Make request to Paystack
-            paystack_url = "https://api.paystack.co/transaction/initialize"
-            headers = {
-                "Authorization": f"Bearer {os.getenv('PAYSTACK_SECRET_KEY')}",
-                "Content-Type": "application/json"
-            }
+            response = await paystack_client.initialize_transaction(paystack_data)
+            response_data = response.data
+            safe_log("payment", "info", f"Paystack Response: {response_data}")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(paystack_url, json=paystack_data, headers=headers) as response:
-                    response_data = await response.json()
-                    safe_log("payment", "info", f"Paystack Response: {response_data}")
-                    
-                    if response.status == 200:
-                        paystack_response = response_data
-                        
-                        # Create transaction record in database
-                        transaction = Transaction(
-                            user_id=current_user.id,
-                            paystack_reference=transaction_ref,
-                            amount=total_amount,
-                            currency=currency,
-                            status="pending",
-                            payment_data=json.dumps(paystack_response["data"]),
-                            purchased_items=json.dumps(cart_items)
-                        )
-                        
-                        db.add(transaction)
-                        db.commit()
-                        db.refresh(transaction)
-                        
-                        # Create order items for each product
-                        for item in cart_items:
-                            order_item = OrderItem(
-                                transaction_id=transaction.id,
-                                product_id=item["id"],
-                                quantity=item["quantity"],
-                                price=item["price"],
-                                is_rental=item.get("is_rental", False),
-                                rental_duration_days=item.get("rental_duration_days")
-                            )
-                            db.add(order_item)
-                        
-                        db.commit()
-                        
-                        # Create licenses for each product purchase/rental
-                        for item in cart_items:
-                            # Generate license ID
-                            license_id = f"LIC-{uuid.uuid4().hex[:8].upper()}"
-                            
-                            # Check if this is a rental
-                            is_rental = item.get("is_rental", False)
-                            expires_at = None
-                            
-                            if is_rental:
-                                # Set expiry date for rental based on actual rental duration
-                                rental_duration = item.get("rental_duration_days", 30)
-                                expires_at = datetime.utcnow() + timedelta(days=rental_duration)
-                                app_logger.info(f"Creating rental license with {rental_duration} days duration, expires at: {expires_at}")
-                            
-                            license_obj = License(
-                                license_id=license_id,
-                                user_id=current_user.id,
-                                product_id=item["id"],
-                                transaction_id=transaction.id,
-                                is_active=True,
-                                expires_at=expires_at,
-                                is_rental=is_rental
-                            )
-                            db.add(license_obj)
-                        
-                        db.commit()
-                        
-                        return {
-                            "success": True,
-                            "data": paystack_response["data"],
-                            "message": "Payment initialized successfully",
-                            "currency": currency,
-                            "country": user_country
-                        }
-                    else:
-                        raise HTTPException(
-                            status_code=400,
-                            detail=f"Paystack error: {response_data}"
-                        )
+            if response.status == 200:
+                paystack_response = response_data
+                
+                # Create the order in one commit: the transaction and, in a
+                # single insert, its order items; licenses are granted once
+                # the payment succeeds
+                transaction = Transaction(
+                    id=str(uuid.uuid4()),
+                    user_id=current_user.id,
+                    paystack_reference=transaction_ref,
+                    amount=total_amount,
+                    currency=currency,
+                    status="pending",
+                    payment_data=json.dumps(paystack_response["data"]),
+                    purchased_items=cart_items
+                )
+                
+                db.add(transaction)
+                db.flush()
+                insert_order_items(db, transaction.id, cart_items, existing=())
+                db.commit()
+                
+                return {
+                    "success": True,
+                    "data": paystack_response["data"],
+                    "message": "Payment initialized successfully",
+                    "currency": currency,
+                    "country": user_country
+                }
+            else:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Paystack error: {response_data}"
+                )
         else:
             raise HTTPException(
                 status_code=400,
                 detail=f"Unsupported currency: {currency}"
             )
             
+    except PaystackError as e:
+        app_logger.error(f"Checkout error: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Payment provider unavailable, please try again"
+        )
     except Exception as e:
         app_logger.error(f"Checkout error: {e}")
         raise HTTPException(
@@ -3555,138 +3611,50 @@ async def checkout(
 
 @app.post("/api/webhook/paystack")
 async def paystack_webhook(request: Request, db: Session = Depends(get_db)):
-    """Handle Paystack webhook callbacks"""
+    """Handle Paystack webhook callbacks.
+
+    The event is stored in the webhook inbox and acknowledged at once;
+    fulfillment runs in the inbox consumer, so slow processing never makes
+    Paystack redeliver.
+    """
+    # Verify the webhook signature (you should implement this for security)
+    # signature = request.headers.get("X-Paystack-Signature")
+    # if not verify_signature(signature, webhook_data):
+    #     raise HTTPException(status_code=400, detail="Invalid signature")
+    
+    body = await request.body()
     try:
-        # Get the webhook data
-        webhook_data = await request.json()
-        
-        # Verify the webhook signature (you should implement this for security)
-        # signature = request.headers.get("X-Paystack-Signature")
-        # if not verify_signature(signature, webhook_data):
-        #     raise HTTPException(status_code=400, detail="Invalid signature")
-        
-        # Extract payment details
-        event = webhook_data.get("event")
-        data = webhook_data.get("data", {})
-        
-        if event == "charge.success":
-            # Payment was successful
-            reference = data.get("reference")
-            amount = data.get("amount")
-            customer_email = data.get("customer", {}).get("email")
-            metadata = data.get("metadata", {})
-            
-            # Find existing transaction and update status
-            transaction = db.query(Transaction).filter(
-                Transaction.paystack_reference == reference
-            ).first()
-            
-            if transaction:
-                # Update transaction status based on Paystack data
-                paystack_status = data.get("status", "success")
-                transaction.status = paystack_status
-                transaction.payment_data = json.dumps(data)
-                db.commit()
-                
-                safe_log("payment", "info", f"Transaction {reference} status updated to: {paystack_status}")
-                
-                # Check if this is a retry payment and update original transaction
-                # First check metadata from Paystack
-                original_transaction_id = None
-                if metadata.get("is_retry_payment") and metadata.get("original_transaction_id"):
-                    original_transaction_id = metadata.get("original_transaction_id")
-                    safe_log("payment", "info", f"Found retry payment via metadata: {original_transaction_id}")
-                
-                # If not found in metadata, check payment_data (our stored data)
-                if not original_transaction_id:
-                    try:
-                        payment_data = json.loads(transaction.payment_data)
-                        if payment_data.get("is_retry_payment") and payment_data.get("original_transaction_id"):
-                            original_transaction_id = payment_data.get("original_transaction_id")
-                            safe_log("payment", "info", f"Found retry payment via payment_data: {original_transaction_id}")
-                    except (json.JSONDecodeError, KeyError):
-                        pass
-                
-                if original_transaction_id:
-                    original_transaction = db.query(Transaction).filter(
-                        Transaction.id == original_transaction_id
-                    ).first()
-                    
-                    if original_transaction and paystack_status == "success":
-                        # Update original transaction status to indicate it was resolved by retry
-                        original_transaction.status = "resolved_by_retry"
-                        original_transaction.payment_data = json.dumps({
-                            "resolved_by": reference,
-                            "resolved_at": datetime.now().isoformat(),
-                            "original_status": original_transaction.status
-                        })
-                        db.commit()
-                        safe_log("payment", "info", f"Original transaction {original_transaction_id} marked as resolved by retry {reference}")
-                    elif not original_transaction:
-                        safe_log("payment", "warning", f"Original transaction {original_transaction_id} not found")
-                else:
-                    safe_log("payment", "info", f"No retry payment information found for transaction {reference}")
-                
-                # Find user by email
-                user = db.query(User).filter(User.email == customer_email).first()
-                
-                if user and paystack_status == "success":
-                    # Process the successful payment
-                    result = payment_service.process_successful_payment(db, reference, user)
-                    
-                    if result["success"]:
-                        safe_log("payment", "info", f"Payment processed successfully: {reference} - {amount} - {customer_email}")
-                        return {"status": "success", "message": "Payment processed successfully"}
-                    else:
-                        safe_log("payment", "error", f"Payment processing failed: {result['error']}")
-                        return {"status": "error", "message": result["error"]}
-                else:
-                    safe_log("payment", "error", f"User not found for email: {customer_email}")
-                    return {"status": "error", "message": "User not found"}
-            else:
-                safe_log("payment", "error", f"Transaction not found for reference: {reference}")
-                return {"status": "error", "message": "Transaction not found"}
-            
-        elif event == "charge.failed":
-            # Payment failed
-            reference = data.get("reference")
-            safe_log("payment", "error", f"Payment failed: {reference}")
-            
-            # Update transaction status to failed
-            transaction = db.query(Transaction).filter(
-                Transaction.paystack_reference == reference
-            ).first()
-            
-            if transaction:
-                # Update transaction status based on Paystack data
-                paystack_status = data.get("status", "failed")
-                transaction.status = paystack_status
-                transaction.payment_data = json.dumps(data)
-                db.commit()
-                safe_log("payment", "info", f"Transaction {reference} status updated to: {paystack_status}")
-            else:
-                safe_log("payment", "error", f"Transaction not found for reference: {reference}")
-            
-            return {"status": "failed", "message": "Payment failed"}
-            
-        else:
-            # Handle other events
-            safe_log("payment", "warning", f"Unhandled webhook event: {event}")
-            return {"status": "ignored", "message": "Event ignored"}
-            
+        event, created = webhook_inbox.receive(db, body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
     except Exception as e:
         safe_log("payment", "error", f"Webhook error: {e}")
         raise HTTPException(status_code=500, detail="Webhook processing failed")
+    
+    if not created:
+        safe_log("payment", "info", f"Duplicate webhook {event.event_id if event else ''} acknowledged")
+        return {"status": "duplicate", "message": "Event already received"}
+    safe_log("payment", "info", f"Webhook {event.event_type} for {event.reference} queued")
+    return {"status": "received", "message": "Event queued"}
 
 # Admin Order Management Endpoints
+# Keyset pagination sort keys for /api/admin/orders
+ORDER_SORT_KEYS = {
+    "created_at": SortKey(Transaction.created_at),
+    "amount": SortKey(Transaction.amount),
+    "status": SortKey(Transaction.status)
+}
+
 @app.get("/api/admin/orders", response_model=List[dict])
 async def get_all_orders(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
     status: Optional[str] = None,  # "pending", "success", "failed"
     sort_by: Optional[str] = "created_at",  # created_at, amount, status
     sort_order: Optional[str] = "desc",  # asc, desc
+    cursor: Optional[str] = None,  # opt-in keyset pagination; pass an empty value for the first page
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -3711,24 +3679,33 @@ async def get_all_orders(
     if status:
         query = query.filter(Transaction.status == status)
     
-    # Apply sorting
-    if sort_by == "amount":
-        if sort_order == "asc":
-            query = query.order_by(Transaction.amount.asc())
-        else:
-            query = query.order_by(Transaction.amount.desc())
-    elif sort_by == "status":
-        if sort_order == "asc":
-            query = query.order_by(Transaction.status.asc())
-        else:
-            query = query.order_by(Transaction.status.desc())
-    else:  # default: created_at
-        if sort_order == "asc":
-            query = query.order_by(Transaction.created_at.asc())
-        else:
-            query = query.order_by(Transaction.created_at.desc())
-    
-    transactions = query.offset(skip).limit(limit).all()
+    if cursor is not None:
+        if sort_by not in ORDER_SORT_KEYS:
+            sort_by = "created_at"
+        transactions, next_cursor = keyset_page(
+            query, ORDER_SORT_KEYS[sort_by], Transaction.id, sort_by, sort_order, cursor, limit
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+    else:
+        # Apply sorting
+        if sort_by == "amount":
+            if sort_order == "asc":
+                query = query.order_by(Transaction.amount.asc())
+            else:
+                query = query.order_by(Transaction.amount.desc())
+        elif sort_by == "status":
+            if sort_order == "asc":
+                query = query.order_by(Transaction.status.asc())
+            else:
+                query = query.order_by(Transaction.status.desc())
+        else:  # default: created_at
+            if sort_order == "asc":
+                query = query.order_by(Transaction.created_at.asc())
+            else:
+                query = query.order_by(Transaction.created_at.desc())
+        
+        transactions = query.offset(skip).limit(limit).all()
     
     # Format response with user and order item details
     orders = []
@@ -3739,7 +3716,7 @@ async def get_all_orders(
         items = []
         if transaction.purchased_items:
             try:
-                purchased_items = json.loads(transaction.purchased_items)
+                purchased_items = transaction.purchased_items
                 items = [
                     {
                         "id": f"item_{i}",
@@ -3754,7 +3731,7 @@ async def get_all_orders(
                     }
                     for i, item in enumerate(purchased_items)
                 ]
-            except (json.JSONDecodeError, TypeError):
+            except (AttributeError, TypeError):
                 # Fallback to order_items if purchased_items is invalid
                 order_items = db.query(OrderItem).filter(OrderItem.transaction_id == transaction.id).all()
                 for item in order_items:
@@ -3823,7 +3800,7 @@ async def get_order_by_id(
     items = []
     if transaction.purchased_items:
         try:
-            purchased_items = json.loads(transaction.purchased_items)
+            purchased_items = transaction.purchased_items
             items = [
                 {
                     "id": f"item_{i}",
@@ -3844,7 +3821,7 @@ async def get_order_by_id(
                 }
                 for i, item in enumerate(purchased_items)
             ]
-        except (json.JSONDecodeError, TypeError):
+        except (AttributeError, TypeError):
             # Fallback to order_items if purchased_items is invalid
             order_items = db.query(OrderItem).filter(OrderItem.transaction_id == transaction.id).all()
             for item in order_items:
@@ -3962,15 +3939,22 @@ async def update_order_status(
 # Blog Post Endpoints
 @app.get("/api/blog/posts", response_model=List[BlogPostResponse])
 async def get_blog_posts(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 10,
     status: Optional[str] = "published",
     featured: Optional[bool] = None,
     tag: Optional[str] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,  # opt-in keyset pagination; pass an empty value for the first page
     db: Session = Depends(get_db)
 ):
     """Get blog posts with filtering options"""
+    not_modified = http_cache.check(request, response, BLOG_POLICY)
+    if not_modified:
+        return not_modified
+    
     query = db.query(BlogPost)
     
     # Filter by status (default to published)
@@ -3981,29 +3965,34 @@ async def get_blog_posts(
     if featured is not None:
         query = query.filter(BlogPost.is_featured == featured)
     
-    # Filter by tag
+    # Filter by tag through the (tag, created_at) index
     if tag:
-        query = query.filter(BlogPost.tags.contains(f'"{tag}"'))
+        query = query.join(BlogPostTag, BlogPostTag.post_id == BlogPost.id).filter(BlogPostTag.tag == tag)
     
-    # Search in title and content
+    # Full-text search in title, excerpt and content, best matches first
+    search_score = None
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                BlogPost.title.ilike(search_term),
-                BlogPost.content.ilike(search_term),
-                BlogPost.excerpt.ilike(search_term)
-            )
-        )
-    
-    # Order by published_at (most recent first) or created_at for drafts
-    query = query.order_by(BlogPost.created_at.desc())
-    
-    posts = query.offset(skip).limit(limit).all()
+        query, search_score = search_index.apply(query, BlogPost, search)
     
-    # Convert JSON fields back to lists
-    for post in posts:
-        convert_blog_post_json_fields(post)
+    if cursor is not None:
+        if search_score is not None:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not available for relevance sorting")
+        posts, next_cursor = keyset_page(
+            query, SortKey(BlogPost.created_at), BlogPost.id, "created_at", "desc", cursor, limit
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+    else:
+        if search_score is not None:
+            query = query.order_by(search_score.desc())
+        
+        # Order by published_at (most recent first) or created_at for drafts
+        if tag:
+            query = query.order_by(BlogPostTag.created_at.desc())
+        else:
+            query = query.order_by(BlogPost.created_at.desc())
+        
+        posts = query.offset(skip).limit(limit).all()
     
     return posts
 
@@ -4022,14 +4011,13 @@ async def get_blog_post(
         post.view_count += 1
         db.commit()
     
-    # Convert JSON fields back to lists
-    convert_blog_post_json_fields(post)
-    
     return post
 
 @app.get("/api/blog/posts/slug/{slug}", response_model=BlogPostResponse)
 async def get_blog_post_by_slug(
     slug: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """Get a specific blog post by slug"""
@@ -4042,8 +4030,10 @@ async def get_blog_post_by_slug(
         post.view_count += 1
         db.commit()
     
-    # Convert JSON fields back to lists
-    convert_blog_post_json_fields(post)
+    # Views are counted above even when the client's copy is still current
+    not_modified = http_cache.check(request, response, BLOG_POST_POLICY)
+    if not_modified:
+        return not_modified
     
     return post
 
@@ -4072,14 +4062,6 @@ async def create_blog_post(
         slug = f"{original_slug}-{counter}"
         counter += 1
     
-    # Convert tags to JSON string
-    tags_json = json.dumps(post.tags) if post.tags else None
-    
-    # Convert list fields to JSON strings
-    youtube_links_json = json.dumps(post.youtube_links) if post.youtube_links else None
-    attached_files_json = json.dumps(post.attached_files) if post.attached_files else None
-    gallery_images_json = json.dumps(post.gallery_images) if post.gallery_images else None
-    
     blog_post = BlogPost(
         title=post.title,
         slug=slug,
@@ -4088,23 +4070,23 @@ async def create_blog_post(
         featured_image=post.featured_image,
         status=post.status,
         is_featured=post.is_featured,
-        tags=tags_json,
+        tags=post.tags or None,
         meta_title=post.meta_title,
         meta_description=post.meta_description,
         author_id=current_user.id,
         published_at=datetime.utcnow() if post.status == "published" else None,
-        youtube_links=youtube_links_json,
-        attached_files=attached_files_json,
-        gallery_images=gallery_images_json
+        youtube_links=post.youtube_links or None,
+        attached_files=post.attached_files or None,
+        gallery_images=post.gallery_images or None
     )
     
     db.add(blog_post)
+    db.flush()
+    tag_index.sync_post(db, blog_post)
     db.commit()
+    cache_versions.bump("blog")
     db.refresh(blog_post)
     
-    # Convert JSON fields back to lists
-    convert_blog_post_json_fields(blog_post)
-    
     return blog_post
 
 @app.get("/api/admin/blog/posts", response_model=List[BlogPostResponse])
@@ -4129,10 +4111,6 @@ async def get_admin_blog_posts(
     
     posts = query.order_by(BlogPost.created_at.desc()).offset(skip).limit(limit).all()
     
-    # Convert JSON fields back to lists
-    for post in posts:
-        convert_blog_post_json_fields(post)
-    
     return posts
 
 @app.get("/api/admin/blog/posts/{post_id}", response_model=BlogPostResponse)
@@ -4152,9 +4130,6 @@ async def get_admin_blog_post(
     if not post:
         raise HTTPException(status_code=404, detail="Blog post not found")
     
-    # Convert JSON fields back to lists
-    convert_blog_post_json_fields(post)
-    
     return post
 
 @app.put("/api/admin/blog/posts/{post_id}", response_model=BlogPostResponse)
@@ -4178,16 +4153,6 @@ async def update_blog_post(
     # Update fields
     update_data = post_update.dict(exclude_unset=True)
     
-    # Handle tags conversion
-    if "tags" in update_data:
-        update_data["tags"] = json.dumps(update_data["tags"])
-    
-    # Handle list fields conversion to JSON
-    list_fields = ["youtube_links", "attached_files", "gallery_images"]
-    for field in list_fields:
-        if field in update_data:
-            update_data[field] = json.dumps(update_data[field])
-    
     # Handle slug generation if title is updated
     if "title" in update_data:
         slug = update_data["title"].lower().replace(" ", "-").replace("_", "-")
@@ -4211,13 +4176,13 @@ async def update_blog_post(
     
     for field, value in update_data.items():
         setattr(post, field, value)
+    if "tags" in update_data:
+        tag_index.sync_post(db, post)
     
     db.commit()
+    cache_versions.bump("blog")
     db.refresh(post)
     
-    # Convert JSON fields back to lists
-    convert_blog_post_json_fields(post)
-    
     return post
 
 @app.delete("/api/admin/blog/posts/{post_id}")
@@ -4237,8 +4202,10 @@ async def delete_blog_post(
     if not post:
         raise HTTPException(status_code=404, detail="Blog post not found")
     
+    tag_index.remove_post(db, post.id)
     db.delete(post)
     db.commit()
+    cache_versions.bump("blog")
     
     return {"message": "Blog post deleted successfully"}
 
@@ -4300,6 +4267,7 @@ async def like_blog_post(
     # Update post like count
     post.like_count += 1
     db.commit()
+    cache_versions.bump("blog")
     db.refresh(db_like)
     
     # Send notification to blog post author (if different from liker)
@@ -4342,6 +4310,7 @@ async def unlike_blog_post(
     
     db.delete(like)
     db.commit()
+    cache_versions.bump("blog")
     
     return {"message": "Post unliked successfully"}
 
@@ -4381,6 +4350,7 @@ async def create_blog_comment(
     # Update post comment count
     post.comment_count += 1
     db.commit()
+    cache_versions.bump("blog")
     db.refresh(db_comment)
     
     # Send notification to blog post author (if different from commenter)
@@ -4485,6 +4455,7 @@ async def delete_blog_comment(
     
     db.delete(comment)
     db.commit()
+    cache_versions.bump("blog")
     
     return {"message": "Comment deleted successfully"}
 
@@ -4629,6 +4600,31 @@ async def get_notification_stats(
         project_logger.error(f"Error getting notification stats: {e}")
         raise HTTPException(status_code=500, detail="Failed to get notification stats")
 
+@app.get("/api/admin/webhooks/stats")
+async def get_webhook_stats(current_user: User = Depends(get_current_user)):
+    """Backlog, lag and retries of the webhook inbox (admin only)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return await asyncio.to_thread(webhook_inbox.stats)
+
+@app.get("/api/admin/storage/stats")
+async def get_storage_stats(current_user: User = Depends(get_current_user)):
+    """Disk usage and hit rate of the bundle store and package cache (admin only)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    # Hits and misses are counted by this worker since it started
+    bundle_stats, package_stats = await asyncio.gather(
+        asyncio.to_thread(bundle_store.stats),
+        asyncio.to_thread(package_cache.stats)
+    )
+    return {
+        "bundle_store": bundle_stats,
+        "package_cache": package_stats,
+        "pid": os.getpid()
+    }
+
 @app.post("/api/admin/notifications/send-review-prompts")
 async def send_review_prompts(
     db: Session = Depends(get_db),
@@ -4679,7 +4675,7 @@ def send_review_prompt(db: Session, user_id: str, product_id: str, days_after_pu
         existing_prompt = db.query(Notification).filter(
             Notification.user_id == user_id,
             Notification.type == "review_prompt",
-            Notification.data.contains(f'"product_id": "{product_id}"')
+            cast(Notification.data, Text).contains(f'"product_id": "{product_id}"')
         ).first()
         
         if existing_prompt:
@@ -4764,18 +4760,16 @@ async def update_notification_preferences(
 
 # Public Exchange Rate Endpoint (for frontend currency conversion)
 @app.get("/api/exchange-rates")
-async def get_public_exchange_rates(db: Session = Depends(get_db)):
+async def get_public_exchange_rates(request: Request, response: Response, db: Session = Depends(get_db)):
     """Get active exchange rates for frontend currency conversion"""
-    exchange_rates = db.query(ExchangeRate).filter(ExchangeRate.is_active == True).all()
+    not_modified = http_cache.check(request, response, EXCHANGE_RATE_POLICY)
+    if not_modified:
+        return not_modified
     
-    # Convert to a more frontend-friendly format
-    rates_dict = {}
-    for rate in exchange_rates:
-        if rate.from_currency == "USD":
-            rates_dict[rate.to_currency] = rate.rate
+    rates = exchange_rate_service.snapshot(db)
     
     return {
-        "rates": rates_dict,
+        "rates": rates.base_rates("USD"),
         "base_currency": "USD",
         "timestamp": datetime.utcnow().isoformat()
     }
@@ -4822,6 +4816,7 @@ async def create_exchange_rate(
     db.add(new_rate)
     db.commit()
     db.refresh(new_rate)
+    exchange_rate_service.invalidate()
     
     return new_rate
 
@@ -4848,6 +4843,7 @@ async def update_exchange_rate(
     
     db.commit()
     db.refresh(rate)
+    exchange_rate_service.invalidate()
     
     return rate
 
@@ -4867,37 +4863,14 @@ async def delete_exchange_rate(
     
     db.delete(rate)
     db.commit()
+    exchange_rate_service.invalidate()
     
     return {"message": "Exchange rate deleted successfully"}
 
 # Currency conversion utility function
 def convert_currency(amount: float, from_currency: str, to_currency: str, db: Session) -> float:
-    """Convert amount from one currency to another using stored exchange rates"""
-    if from_currency == to_currency:
-        return amount
-    
-    # Find the exchange rate
-    rate = db.query(ExchangeRate).filter(
-        ExchangeRate.from_currency == from_currency,
-        ExchangeRate.to_currency == to_currency,
-        ExchangeRate.is_active == True
-    ).first()
-    
-    if not rate:
-        # If no direct rate, try reverse rate
-        reverse_rate = db.query(ExchangeRate).filter(
-            ExchangeRate.from_currency == to_currency,
-            ExchangeRate.to_currency == from_currency,
-            ExchangeRate.is_active == True
-        ).first()
-        
-        if reverse_rate:
-            return amount / reverse_rate.rate
-        else:
-            # Default fallback - return original amount
-            return amount
-    
-    return amount * rate.rate
+    """Convert amount from one currency to another using the worker's exchange rate snapshot"""
+    return exchange_rate_service.convert(amount, from_currency, to_currency, db)
 
 def get_currency_symbol(currency: str) -> str:
     """Get the currency symbol for a given currency code"""
@@ -4948,13 +4921,7 @@ async def get_user_projects(
     
     projects = query.order_by(ProjectRequest.created_at.desc()).offset(skip).limit(limit).all()
     
-    # Convert JSON fields and add counts
     for project in projects:
-        if project.platforms:
-            project.platforms = json.loads(project.platforms)
-        if project.file_uploads:
-            project.file_uploads = json.loads(project.file_uploads)
-        
         # Add counts for responses, invoices, and progress
         responses_count = db.query(ProjectResponse).filter(
             ProjectResponse.project_request_id == project.id
@@ -4996,12 +4963,6 @@ async def get_user_project_dashboard(
     if not project_request:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Convert JSON fields
-    if project_request.platforms:
-        project_request.platforms = json.loads(project_request.platforms)
-    if project_request.file_uploads:
-        project_request.file_uploads = json.loads(project_request.file_uploads)
-    
     # Get project responses
     responses = db.query(ProjectResponse).filter(
         ProjectResponse.project_request_id == project_id
@@ -5556,6 +5517,7 @@ async def upload_project_invoice(
 @app.get("/api/invoices/{invoice_id}/download")
 async def download_invoice_pdf(
     invoice_id: str,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -5579,8 +5541,9 @@ async def download_invoice_pdf(
         raise HTTPException(status_code=404, detail="PDF file not found")
     
     # Return the PDF file
-    return FileResponse(
-        path=invoice.file_path,
+    return serve_file(
+        request,
+        invoice.file_path,
         filename=f"invoice_{invoice.invoice_number}.pdf",
         media_type="application/pdf"
     )
@@ -5874,6 +5837,7 @@ async def generate_license_file(
 @app.get("/api/licenses/{license_id}/download-file")
 async def download_license_file(
     license_id: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -5902,8 +5866,9 @@ async def download_license_file(
         raise HTTPException(status_code=404, detail="License file not found")
     
     # Return file for download
-    return FileResponse(
-        path=file_path,
+    return serve_file(
+        request,
+        file_path,
         filename=filename,
         media_type="application/octet-stream"
     )
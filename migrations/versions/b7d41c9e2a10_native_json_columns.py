@@ -0,0 +1,73 @@
+"""Store list-valued fields in native JSON columns
+
+Revision ID: b7d41c9e2a10
+Revises: e6e8445173d8
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d41c9e2a10'
+down_revision = 'e6e8445173d8'
+branch_labels = None
+depends_on = None
+
+# Columns that hold JSON documents, by table
+JSON_COLUMNS = {
+    'products': ['tags', 'features', 'images'],
+    'blog_posts': ['tags', 'youtube_links', 'attached_files', 'gallery_images'],
+    'project_requests': ['platforms', 'file_uploads'],
+    'transactions': ['purchased_items'],
+    'notifications': ['data'],
+}
+
+NATIVE_JSON_DIALECTS = ('mysql', 'postgresql')
+
+
+def _clear_invalid_values(bind, table, column):
+    """Null out values that are not valid JSON so the type change cannot fail"""
+    rows = bind.execute(sa.text(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL")).fetchall()
+    for row_id, value in rows:
+        try:
+            json.loads(value)
+        except (TypeError, ValueError):
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {column} = NULL WHERE id = :id"),
+                {"id": row_id}
+            )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name not in NATIVE_JSON_DIALECTS:
+        # SQLite keeps JSON as text; decoding happens in the JSONType column type
+        return
+
+    for table, columns in JSON_COLUMNS.items():
+        for column in columns:
+            _clear_invalid_values(bind, table, column)
+            op.alter_column(
+                table, column,
+                existing_type=sa.Text(),
+                type_=sa.JSON(),
+                postgresql_using=f"{column}::json"
+            )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name not in NATIVE_JSON_DIALECTS:
+        return
+
+    for table, columns in JSON_COLUMNS.items():
+        for column in columns:
+            op.alter_column(
+                table, column,
+                existing_type=sa.JSON(),
+                type_=sa.Text(),
+                postgresql_using=f"{column}::text"
+            )
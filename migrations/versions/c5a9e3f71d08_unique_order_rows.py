@@ -0,0 +1,76 @@
+"""One order item and one license per transaction and product
+
+Revision ID: c5a9e3f71d08
+Revises: b7d41c9e2a10
+Create Date: 2026-10-17 12:00:00.000000
+
+Checkout and fulfillment both used to insert the order items and licenses of
+a transaction, so paid orders have them twice. The duplicates are removed
+before the unique constraints are added: of each group the oldest order item
+is kept, and the oldest license with activations (or else the oldest
+license), with the activations of the other licenses moved to it.
+
+"""
+from collections import defaultdict
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a9e3f71d08'
+down_revision = 'b7d41c9e2a10'
+branch_labels = None
+depends_on = None
+
+
+def _duplicates(bind, table):
+    """Rows of ``table`` sharing a transaction and product, oldest first"""
+    rows = bind.execute(sa.text(
+        f"SELECT id, transaction_id, product_id FROM {table} "
+        f"WHERE transaction_id IS NOT NULL ORDER BY created_at, id"
+    )).fetchall()
+    groups = defaultdict(list)
+    for row_id, transaction_id, product_id in rows:
+        groups[(transaction_id, product_id)].append(row_id)
+    return [ids for ids in groups.values() if len(ids) > 1]
+
+
+def _delete(bind, table, ids):
+    for row_id in ids:
+        bind.execute(sa.text(f"DELETE FROM {table} WHERE id = :id"), {"id": row_id})
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    for ids in _duplicates(bind, 'order_items'):
+        _delete(bind, 'order_items', ids[1:])
+
+    for ids in _duplicates(bind, 'licenses'):
+        activated = {
+            license_id for (license_id,) in bind.execute(
+                sa.text("SELECT DISTINCT license_id FROM user_product_activations WHERE license_id IN :ids")
+                .bindparams(sa.bindparam('ids', expanding=True)),
+                {"ids": ids}
+            )
+        }
+        keep = next((license_id for license_id in ids if license_id in activated), ids[0])
+        removed = [license_id for license_id in ids if license_id != keep]
+        for license_id in removed:
+            bind.execute(
+                sa.text("UPDATE user_product_activations SET license_id = :keep WHERE license_id = :id"),
+                {"keep": keep, "id": license_id}
+            )
+        _delete(bind, 'licenses', removed)
+
+    with op.batch_alter_table('order_items') as batch_op:
+        batch_op.create_unique_constraint('unique_order_item_product', ['transaction_id', 'product_id'])
+    with op.batch_alter_table('licenses') as batch_op:
+        batch_op.create_unique_constraint('unique_license_transaction_product', ['transaction_id', 'product_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('licenses') as batch_op:
+        batch_op.drop_constraint('unique_license_transaction_product', type_='unique')
+    with op.batch_alter_table('order_items') as batch_op:
+        batch_op.drop_constraint('unique_order_item_product', type_='unique')
@@ -0,0 +1,28 @@
+"""Indexes for the price and amount sort orders
+
+Revision ID: d8f2b4a6c913
+Revises: c5a9e3f71d08
+Create Date: 2026-10-17 14:00:00.000000
+
+Product listings can be sorted by price and admin transactions by amount;
+keyset pages seek on the raw column, so these indexes serve them.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f2b4a6c913'
+down_revision = 'c5a9e3f71d08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_product_price', 'products', ['price'])
+    op.create_index('idx_transaction_amount', 'transactions', ['amount'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_transaction_amount', table_name='transactions')
+    op.drop_index('idx_product_price', table_name='products')
@@ -0,0 +1,53 @@
+"""Full-text search indexes for products and blog posts
+
+Revision ID: e3a1c7f5b209
+Revises: d8f2b4a6c913
+Create Date: 2026-10-17 16:00:00.000000
+
+MySQL gets FULLTEXT indexes and PostgreSQL GIN indexes over a tsvector of
+the searchable columns. They used to be created by every app worker at
+startup, where workers racing on the same ALTER TABLE failed and fell back
+to ILIKE; search_index now only checks that they exist. SQLite keeps
+creating its FTS5 tables at startup.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a1c7f5b209'
+down_revision = 'd8f2b4a6c913'
+branch_labels = None
+depends_on = None
+
+# Searchable columns by table, most important first (as in search_index)
+SEARCH_SOURCES = {
+    'products': ['name', 'short_description', 'description'],
+    'blog_posts': ['title', 'excerpt', 'content'],
+}
+
+
+def _index_exists(bind, table, index_name):
+    return any(index['name'] == index_name for index in sa.inspect(bind).get_indexes(table))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for table, columns in SEARCH_SOURCES.items():
+        if bind.dialect.name == 'mysql':
+            # Databases whose workers already created the index at startup keep it
+            if not _index_exists(bind, table, f'ft_{table}_search'):
+                op.execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX ft_{table}_search ({', '.join(columns)})")
+        elif bind.dialect.name == 'postgresql':
+            document = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+            op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN (to_tsvector('simple', {document}))")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table in SEARCH_SOURCES:
+        if bind.dialect.name == 'mysql':
+            op.execute(f"ALTER TABLE {table} DROP INDEX ft_{table}_search")
+        elif bind.dialect.name == 'postgresql':
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search")
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Text, ForeignKey, UniqueConstraint, Index
+from sqlalchemy import BigInteger, Column, String, Integer, Float, Boolean, DateTime, Text, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
-from database import Base
+from database import Base, JSONType
 
 class User(Base):
     __tablename__ = "users"
@@ -47,10 +48,10 @@ class ProjectRequest(Base):
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     project_title = Column(String(255), nullable=False)
     description = Column(Text, nullable=False)
-    platforms = Column(Text)  # JSON string of selected platforms
+    platforms = Column(JSONType)  # List of selected platforms
     expected_completion_time = Column(String(100))
     budget_range = Column(String(100))
-    file_uploads = Column(Text)  # JSON string of file paths
+    file_uploads = Column(JSONType)  # List of file paths
     contact_email = Column(String(255))
     telegram_handle = Column(String(100))
     status = Column(String(50), default="Pending Review")  # Pending Review, In Progress, Completed, Cancelled
@@ -83,9 +84,9 @@ class Product(Base):
     original_price = Column(Float)  # For discounted prices
     category = Column(String(100), index=True)
     image = Column(String(500))
-    tags = Column(Text)  # JSON string
-    features = Column(Text)  # JSON string
-    images = Column(Text)  # JSON string
+    tags = Column(JSONType)  # List of tags
+    features = Column(JSONType)  # List of features
+    images = Column(JSONType)  # List of image paths
     rating = Column(Float, default=0.0)
     total_reviews = Column(Integer, default=0)
     is_active = Column(Boolean, default=True)
@@ -123,11 +124,24 @@ class Product(Base):
         Index('idx_product_category', 'category'),
         Index('idx_product_is_active', 'is_active'),
         Index('idx_product_is_featured', 'is_featured'),
+        Index('idx_product_price', 'price'),
         Index('idx_product_rating', 'rating'),
         Index('idx_product_created_at', 'created_at'),
         {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
     )
 
+class ProductTag(Base):
+    __tablename__ = "product_tags"
+    
+    product_id = Column(String(36), ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String(100), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)  # Copy of the product's created_at for ordered tag pages
+    
+    __table_args__ = (
+        Index('idx_product_tag_tag_created', 'tag', 'created_at'),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+    )
+
 class Transaction(Base):
     __tablename__ = "transactions"
     
@@ -138,7 +152,7 @@ class Transaction(Base):
     currency = Column(String(3), default="USD")
     status = Column(String(50), default="pending")  # pending, success, failed
     payment_data = Column(Text)  # JSON string of payment details
-    purchased_items = Column(Text)  # JSON string of purchased items snapshot
+    purchased_items = Column(JSONType)  # Purchased items snapshot
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -151,6 +165,7 @@ class Transaction(Base):
         Index('idx_transaction_status', 'status'),
         Index('idx_transaction_user_id', 'user_id'),
         Index('idx_transaction_created_at', 'created_at'),
+        Index('idx_transaction_amount', 'amount'),
         Index('idx_transaction_currency', 'currency'),
         {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
     )
@@ -175,6 +190,7 @@ class OrderItem(Base):
     __table_args__ = (
         Index('idx_order_item_transaction', 'transaction_id'),
         Index('idx_order_item_product', 'product_id'),
+        UniqueConstraint('transaction_id', 'product_id', name='unique_order_item_product'),
         {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
     )
 
@@ -238,6 +254,62 @@ class DownloadLog(Base):
         {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
     )
 
+class BundleJob(Base):
+    __tablename__ = "bundle_jobs"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    transaction_id = Column(String(36), ForeignKey("transactions.id"), nullable=False)
+    download_token_id = Column(String(36), ForeignKey("download_tokens.id"), nullable=False)
+    status = Column(String(20), default="pending", nullable=False)  # pending, building, ready, failed
+    file_name = Column(String(255))  # Download name of the bundle
+    file_path = Column(String(500), nullable=True)  # Set once the build is ready
+    file_size = Column(BigInteger, nullable=True)
+    error_message = Column(String(500), nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    transaction = relationship("Transaction")
+    download_token = relationship("DownloadToken")
+    
+    # MySQL-specific optimizations
+    __table_args__ = (
+        Index('idx_bundle_job_transaction', 'transaction_id'),
+        Index('idx_bundle_job_token', 'download_token_id'),
+        Index('idx_bundle_job_status', 'status'),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+    )
+
+# Microsecond timestamps on MySQL, so events of one reference keep their order
+PreciseDateTime = DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
+
+class WebhookEvent(Base):
+    __tablename__ = "webhook_events"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    event_id = Column(String(191), nullable=False)  # Provider event id, or a hash of the body
+    provider = Column(String(20), default="paystack", nullable=False)
+    event_type = Column(String(100))
+    reference = Column(String(255), nullable=True)  # Events of one reference are processed in order
+    payload = Column(Text, nullable=False)  # Raw request body
+    status = Column(String(20), default="pending", nullable=False)  # pending, processing, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String(500), nullable=True)
+    received_at = Column(PreciseDateTime, default=datetime.utcnow, nullable=False)
+    available_at = Column(PreciseDateTime, default=datetime.utcnow, nullable=False)  # Retries wait until then
+    locked_at = Column(DateTime, nullable=True)
+    processed_at = Column(PreciseDateTime, nullable=True)
+    
+    # MySQL-specific optimizations
+    __table_args__ = (
+        UniqueConstraint('event_id', name='unique_webhook_event'),
+        Index('idx_webhook_event_status', 'status', 'available_at'),
+        Index('idx_webhook_event_reference', 'reference', 'received_at'),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+    )
+
 class Review(Base):
     __tablename__ = "reviews"
     
@@ -277,7 +349,7 @@ class BlogPost(Base):
     status = Column(String(50), default="draft")  # draft, published, archived
     is_featured = Column(Boolean, default=False)
     view_count = Column(Integer, default=0)
-    tags = Column(Text)  # JSON string of tags
+    tags = Column(JSONType)  # List of tags
     meta_title = Column(String(255))
     meta_description = Column(String(500))
     published_at = Column(DateTime, nullable=True)
@@ -285,9 +357,9 @@ class BlogPost(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Additional media fields
-    youtube_links = Column(Text)  # JSON string of YouTube URLs
-    attached_files = Column(Text)  # JSON string of file paths
-    gallery_images = Column(Text)  # JSON string of additional image paths
+    youtube_links = Column(JSONType)  # List of YouTube URLs
+    attached_files = Column(JSONType)  # List of file paths
+    gallery_images = Column(JSONType)  # List of additional image paths
     like_count = Column(Integer, default=0)
     comment_count = Column(Integer, default=0)
     
@@ -304,6 +376,18 @@ class BlogPost(Base):
         {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
     )
 
+class BlogPostTag(Base):
+    __tablename__ = "blog_post_tags"
+    
+    post_id = Column(String(36), ForeignKey("blog_posts.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String(100), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)  # Copy of the post's created_at for ordered tag pages
+    
+    __table_args__ = (
+        Index('idx_blog_post_tag_tag_created', 'tag', 'created_at'),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+    )
+
 class BlogLike(Base):
     __tablename__ = "blog_likes"
     
@@ -360,7 +444,7 @@ class Notification(Base):
     message = Column(Text, nullable=False)
     type = Column(String(50), default="info")  # info, success, warning, error, order, payment, system
     is_read = Column(Boolean, default=False)
-    data = Column(Text)  # JSON string for additional data (order_id, product_id, etc.)
+    data = Column(JSONType)  # Additional data (order_id, product_id, etc.)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -395,6 +479,34 @@ class ExchangeRate(Base):
         {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
     )
 
+class CatalogCounter(Base):
+    __tablename__ = "catalog_counters"
+    
+    scope = Column(String(150), primary_key=True)  # "all" or "category:<category>"
+    count = Column(Integer, default=0, nullable=False)  # Active products in scope
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
+
+class ProductRatingStats(Base):
+    __tablename__ = "product_rating_stats"
+    
+    product_id = Column(String(36), ForeignKey("products.id"), primary_key=True)
+    rating_sum = Column(Integer, default=0, nullable=False)  # Sum of approved review ratings
+    rating_count = Column(Integer, default=0, nullable=False)  # Number of approved reviews
+    stars_1 = Column(Integer, default=0, nullable=False)
+    stars_2 = Column(Integer, default=0, nullable=False)
+    stars_3 = Column(Integer, default=0, nullable=False)
+    stars_4 = Column(Integer, default=0, nullable=False)
+    stars_5 = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
+
 class ProjectResponse(Base):
     __tablename__ = "project_responses"
     
@@ -513,6 +625,7 @@ class License(Base):
         Index('idx_license_product', 'product_id'),
         Index('idx_license_is_active', 'is_active'),
         Index('idx_license_expires_at', 'expires_at'),
+        UniqueConstraint('transaction_id', 'product_id', name='unique_license_transaction_product'),
         {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
     )
 
@@ -0,0 +1,96 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from models_mysql import License, OrderItem
+
+# Rental period when a cart item does not say
+DEFAULT_RENTAL_DAYS = 30
+
+def cart_lines(items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One line per product: repeated cart entries are merged and their quantities added up.
+
+    Order items and licenses are unique per transaction and product.
+    """
+    lines: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        product_id = item.get("id")
+        if not product_id:
+            continue
+        if product_id in lines:
+            lines[product_id]["quantity"] = lines[product_id].get("quantity", 1) + item.get("quantity", 1)
+        else:
+            lines[product_id] = dict(item)
+    return list(lines.values())
+
+def order_item_rows(transaction_id: str, items: Iterable[Dict[str, Any]], free: bool = False) -> List[Dict[str, Any]]:
+    """Insert parameters of the order items of a transaction, with their ids"""
+    now = datetime.utcnow()
+    return [{
+        "id": str(uuid.uuid4()),
+        "transaction_id": transaction_id,
+        "product_id": item["id"],
+        "quantity": item.get("quantity", 1),
+        "price": 0.0 if free else item.get("price", 0),
+        "is_rental": item.get("is_rental", False),
+        "rental_duration_days": item.get("rental_duration_days"),
+        "created_at": now
+    } for item in cart_lines(items)]
+
+def license_rows(transaction_id: str, user_id: str, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert parameters of the licenses granted by a transaction; rentals expire from now"""
+    now = datetime.utcnow()
+    rows = []
+    for item in cart_lines(items):
+        is_rental = item.get("is_rental", False)
+        expires_at = None
+        if is_rental:
+            expires_at = now + timedelta(days=item.get("rental_duration_days") or DEFAULT_RENTAL_DAYS)
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "license_id": f"LIC-{uuid.uuid4().hex[:8].upper()}",
+            "user_id": user_id,
+            "product_id": item["id"],
+            "transaction_id": transaction_id,
+            "is_active": True,
+            "expires_at": expires_at,
+            "is_rental": is_rental,
+            "created_at": now,
+            "updated_at": now
+        })
+    return rows
+
+def _insert_missing(db: Session, model, transaction_id: str, rows: List[Dict[str, Any]], existing: Optional[Iterable[str]]) -> int:
+    if existing is None:
+        existing = [product_id for (product_id,) in db.query(model.product_id).filter(model.transaction_id == transaction_id)]
+    existing = set(existing)
+    rows = [row for row in rows if row["product_id"] not in existing]
+    if rows:
+        # One executemany; the caller commits
+        db.execute(insert(model), rows)
+    return len(rows)
+
+def insert_order_items(
+    db: Session,
+    transaction_id: str,
+    items: Iterable[Dict[str, Any]],
+    free: bool = False,
+    existing: Optional[Iterable[str]] = None
+) -> int:
+    """Add the order items of a transaction that are not there yet; returns how many were added.
+
+    ``existing`` lists the product ids already ordered, when the caller
+    knows them (``()`` for a new transaction), and saves a query.
+    """
+    return _insert_missing(db, OrderItem, transaction_id, order_item_rows(transaction_id, items, free), existing)
+
+def grant_licenses(
+    db: Session,
+    transaction_id: str,
+    user_id: str,
+    items: Iterable[Dict[str, Any]],
+    existing: Optional[Iterable[str]] = None
+) -> int:
+    """Add the licenses of a transaction that are not there yet; returns how many were added"""
+    return _insert_missing(db, License, transaction_id, license_rows(transaction_id, user_id, items), existing)
@@ -0,0 +1,311 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from models_mysql import Product
+from config import settings
+from logging_config import download_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines: builds only coalesce within a worker
+    fcntl = None
+
+# Partial builds and lock files older than this are left over from crashed workers
+STALE_BUILD_SECONDS = 3600
+
+# Files used this recently are never evicted: with download offload nginx
+# opens the file only after the app has answered
+EVICTION_GRACE_SECONDS = 300
+
+README_TEMPLATE = """Product: {name}
+Description: {description}
+Category: {category}
+Build Date: {build_date}
+File: {file_name}
+Size: {file_size} bytes
+
+This file was purchased from JarvisTrade.
+Please ensure you have a valid license for this product.
+"""
+
+class PackageSource(NamedTuple):
+    """Everything a download package is built from, read from the product up front"""
+    product_id: str
+    version: Optional[str]
+    name: str
+    description: Optional[str]
+    category: Optional[str]
+    file_path: str
+
+    @classmethod
+    def from_product(cls, product: Product, file_path: str) -> "PackageSource":
+        return cls(product.id, product.version, product.name, product.description, product.category, file_path)
+
+class DiskLRU:
+    """Directory of built ZIP files kept under a size quota.
+
+    Reading a file through ``lookup`` refreshes its access time (its mtime
+    stays the build time, which range requests validate against), and the
+    least recently used files are evicted once the directory grows past
+    ``max_bytes``; files used within ``eviction_grace_seconds`` are kept.
+    Hits, misses and evictions are counted per process for the metrics
+    endpoint.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, eviction_grace_seconds: float = EVICTION_GRACE_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.eviction_grace_seconds = eviction_grace_seconds
+        self._lock = threading.Lock()
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def file_digest(self, file_path: str) -> str:
+        """Return the SHA-256 of a file, memoized by path, size and modification time"""
+        stat = os.stat(file_path)
+        memo_key = (file_path, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(memo_key)
+        if digest is None:
+            sha256 = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                while chunk := f.read(1024 * 1024):
+                    sha256.update(chunk)
+            digest = sha256.hexdigest()
+            with self._lock:
+                self._digests[memo_key] = digest
+        return digest
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.zip")
+
+    def lookup(self, path: str) -> bool:
+        """Whether a file is stored, counting the hit or miss"""
+        found = self._touch(path)
+        self.count_lookup(found)
+        return found
+
+    def count_lookup(self, found: bool):
+        """Count a hit or miss of a lookup made elsewhere (e.g. in a build worker)"""
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        """Mark a file as recently used; False when it is not stored"""
+        try:
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+            return True
+        except FileNotFoundError:
+            return False
+
+    @contextmanager
+    def _build_lock(self, key: str):
+        """Hold an exclusive lock file for a build across workers"""
+        if fcntl is None:
+            yield
+            return
+        lock_path = os.path.join(self.directory, f"{key}.lock")
+        while True:
+            lock_file = open(lock_path, "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # A sweep may have removed the file while we waited; the lock
+                # only counts when it is still the file at lock_path
+                current = os.stat(lock_path)
+            except FileNotFoundError:
+                current = None
+            if current is not None and current.st_ino == os.fstat(lock_file.fileno()).st_ino:
+                break
+            lock_file.close()
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def _sweep_lock(self, lock_path: str):
+        """Remove a lock file nobody holds"""
+        try:
+            lock_file = open(lock_path, "a")
+        except FileNotFoundError:
+            return
+        with lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            # Removed while held, so a waiter notices and opens a new one
+            self._remove(lock_path)
+
+    def _scan(self):
+        """Stored files as (atime, mtime, size, path), removing partial builds and
+        lock files left by crashed workers"""
+        files = []
+        now = time.time()
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return files
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith(".zip"):
+                files.append((stat.st_atime, stat.st_mtime, stat.st_size, entry.path))
+            elif now - stat.st_mtime <= STALE_BUILD_SECONDS:
+                continue
+            elif entry.name.endswith(".tmp"):
+                self._remove(entry.path)
+            elif entry.name.endswith(".lock") and fcntl is not None:
+                self._sweep_lock(entry.path)
+        return files
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Delete least recently used files until the directory fits its quota; returns how many"""
+        files = self._scan()
+        total = sum(size for _, _, size, _ in files)
+        recent = time.time() - self.eviction_grace_seconds
+        evicted = 0
+        for atime, mtime, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep or max(atime, mtime) > recent:
+                continue
+            # Downloads already streaming the file keep their open handle
+            self._remove(path)
+            total -= size
+            evicted += 1
+            download_logger.info(f"Evicted {os.path.basename(path)} from {self.directory}")
+        with self._lock:
+            self.evictions += evicted
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        """Disk usage of the directory and this process's hit rate"""
+        files = self._scan()
+        used = sum(size for _, _, size, _ in files)
+        with self._lock:
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        return {
+            "files": len(files),
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+            "usage_percent": round(used * 100 / self.max_bytes, 1) if self.max_bytes else None,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+            "evictions": evictions
+        }
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+class PackageCache(DiskLRU):
+    """Disk cache of the ZIP packages served by product downloads.
+
+    Packages are keyed by product id, version, the SHA-256 of the product file
+    and the README fields, built once and then served straight from disk.
+    Concurrent requests for a missing package wait for a single build: a
+    per-key lock coalesces threads of one worker and a lock file coalesces
+    workers.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, eviction_grace_seconds: float = EVICTION_GRACE_SECONDS):
+        super().__init__(cache_dir, max_bytes, eviction_grace_seconds)
+        # Per-key build locks and how many threads use each
+        self._key_locks: Dict[str, Tuple[threading.Lock, int]] = {}
+
+    def package_key(self, source: PackageSource) -> str:
+        """Cache key covering everything that ends up in the package"""
+        material = "|".join([
+            source.product_id,
+            source.version or "",
+            self.file_digest(source.file_path),
+            os.path.basename(source.file_path),
+            source.name or "",
+            source.description or "",
+            source.category or ""
+        ])
+        return hashlib.sha256(material.encode()).hexdigest()[:40]
+
+    def get_package(self, source: PackageSource) -> str:
+        """Return the path of the cached package for ``source``, building it on a miss.
+
+        Blocking; call it from a worker thread.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        key = self.package_key(source)
+        package_path = self.path_for(key)
+        if self.lookup(package_path):
+            return package_path
+
+        with self._lock:
+            key_lock, users = self._key_locks.get(key, (None, 0))
+            key_lock = key_lock or threading.Lock()
+            self._key_locks[key] = (key_lock, users + 1)
+        try:
+            with key_lock, self._build_lock(key):
+                # Another thread or worker may have finished the build while we waited
+                if self._touch(package_path):
+                    return package_path
+                self._build(source, package_path)
+        finally:
+            with self._lock:
+                key_lock, users = self._key_locks[key]
+                if users > 1:
+                    self._key_locks[key] = (key_lock, users - 1)
+                else:
+                    del self._key_locks[key]
+
+        self.evict(keep=package_path)
+        return package_path
+
+    def _build(self, source: PackageSource, package_path: str):
+        """Write the package to a temporary file and move it into place"""
+        started = time.monotonic()
+        file_name = os.path.basename(source.file_path)
+        readme = README_TEMPLATE.format(
+            name=source.name,
+            description=source.description,
+            category=source.category,
+            build_date=datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC'),
+            file_name=file_name,
+            file_size=os.path.getsize(source.file_path)
+        )
+        temp_path = f"{package_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+                zip_file.write(source.file_path, file_name)
+                zip_file.writestr("README.txt", readme)
+            os.replace(temp_path, package_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        download_logger.info(
+            f"Built download package for product {source.product_id} "
+            f"({os.path.getsize(package_path)} bytes in {time.monotonic() - started:.2f}s)"
+        )
+
+# Create global package cache instance
+package_cache = PackageCache(
+    cache_dir=settings.package_cache_dir,
+    max_bytes=settings.package_cache_max_bytes
+)
@@ -0,0 +1,121 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+class SortKey:
+    """A sortable column usable for keyset pagination.
+
+    Pages are ordered and compared on the raw column, so an index on it
+    (InnoDB secondary indexes carry the primary key as the tiebreaker) can
+    serve every page. NULLs sort as the lowest values, which is the native
+    order of MySQL and SQLite; the seek predicates handle them explicitly.
+    """
+
+    def __init__(self, column):
+        self.column = column
+
+    def value(self, row) -> Any:
+        """Return the sort value of a loaded row"""
+        return getattr(row, self.column.key)
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+def encode_cursor(sort_by: str, sort_order: str, value: Any, row_id: str) -> str:
+    """Build an opaque cursor pointing just after the given row"""
+    payload = {"s": sort_by, "o": sort_order, "v": _encode_value(value), "id": row_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        payload["v"] = _decode_value(payload["v"])
+        if not isinstance(payload.get("id"), str):
+            raise ValueError("missing id")
+        return payload
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def apply_keyset(
+    query: Query,
+    sort_key: SortKey,
+    id_column,
+    sort_by: str,
+    sort_order: str,
+    cursor: Optional[str]
+) -> Query:
+    """Order a query by ``(sort key, id)`` and seek past the cursor position.
+
+    An empty cursor starts from the first page. The cursor must have been
+    issued for the same ``sort_by``/``sort_order`` combination.
+    """
+    descending = sort_order != "asc"
+    column = sort_key.column
+    if cursor:
+        position = decode_cursor(cursor)
+        if position["s"] != sort_by or position["o"] != sort_order:
+            raise HTTPException(status_code=400, detail="Cursor does not match the requested sort order")
+        value, last_id = position["v"], position["id"]
+        # Comparisons with NULL are never true, so the NULL rows are added
+        # where they come in the order: first ascending, last descending
+        if descending and value is None:
+            query = query.filter(column.is_(None), id_column < last_id)
+        elif descending:
+            query = query.filter(or_(
+                column < value,
+                and_(column == value, id_column < last_id),
+                column.is_(None)
+            ))
+        elif value is None:
+            query = query.filter(or_(
+                and_(column.is_(None), id_column > last_id),
+                column.isnot(None)
+            ))
+        else:
+            query = query.filter(or_(
+                column > value,
+                and_(column == value, id_column > last_id)
+            ))
+
+    # PostgreSQL sorts NULLs as the highest values; MySQL has no NULLS FIRST/LAST
+    postgresql = query.session.get_bind().dialect.name == "postgresql"
+    if descending:
+        order = column.desc().nulls_last() if postgresql else column.desc()
+        return query.order_by(order, id_column.desc())
+    order = column.asc().nulls_first() if postgresql else column.asc()
+    return query.order_by(order, id_column.asc())
+
+def keyset_page(
+    query: Query,
+    sort_key: SortKey,
+    id_column,
+    sort_by: str,
+    sort_order: str,
+    cursor: Optional[str],
+    limit: int
+):
+    """Fetch one keyset page and return ``(rows, next_cursor)``.
+
+    ``next_cursor`` is None on the last page.
+    """
+    rows: List[Any] = apply_keyset(query, sort_key, id_column, sort_by, sort_order, cursor).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last_row = rows[-1]
+    return rows, encode_cursor(sort_by, sort_order, sort_key.value(last_row), getattr(last_row, id_column.key))
@@ -1,17 +1,22 @@
-import aiohttp
 import os
 import json
 import secrets
-import zipfile
-import tempfile
 import shutil
+import uuid
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
-from models_mysql import Transaction, OrderItem, DownloadToken, DownloadLog, Product, User, License
+from models_mysql import Transaction, OrderItem, DownloadToken, Product, User
 from email_service import email_service
-from logging_config import safe_log
+from logging_config import safe_log, file_logger
+from zip_stream import ZipStream
+from download_events import download_events
+from bundle_jobs import bundle_jobs
+from bundle_store import bundle_store
+from paystack_client import paystack_client
+from orders import grant_licenses, insert_order_items
+from single_flight import payment_verifications
 
 load_dotenv()
 
@@ -28,55 +33,56 @@ class PaymentService:
         self.download_token_expiry_hours = 24 * 365  # 1 year expiry (effectively unlimited)
     
     async def verify_payment(self, reference: str) -> Dict[str, Any]:
-        """Verify payment with Paystack"""
+        """Verify payment with Paystack.
+
+        Concurrent verifications of a reference (success page, dashboard,
+        reconciliation; in any worker) share one Paystack call, and final
+        statuses are reused for a short while.
+        """
+        return await payment_verifications.run(reference, lambda: self._verify_with_paystack(reference))
+    
+    async def _verify_with_paystack(self, reference: str) -> Dict[str, Any]:
         try:
-            url = f"https://api.paystack.co/transaction/verify/{reference}"
-            headers = {
-                "Authorization": f"Bearer {self.paystack_secret_key}",
-                "Content-Type": "application/json"
-            }
-            
             safe_log("payment", "info", f"Verifying payment with Paystack for reference: {reference}")
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    safe_log("payment", "info", f"Paystack response status: {response.status}")
+            response = await paystack_client.verify_transaction(reference)
+            safe_log("payment", "info", f"Paystack response status: {response.status}")
+            
+            if response.status == 200:
+                data = response.data or {}
+                safe_log("payment", "info", f"Paystack response data: {json.dumps(data, indent=2)}")
+                
+                # Check if verification was successful
+                if data.get("status") and data["status"]:
+                    transaction_data = data["data"]
+                    
+                    result = {
+                        "success": True,
+                        "data": transaction_data,
+                        "status": transaction_data["status"],
+                        "amount": transaction_data["amount"],
+                        "currency": transaction_data["currency"],
+                        "customer_email": transaction_data["customer"]["email"],
+                        "paid_at": transaction_data.get("paid_at"),
+                        "reference": transaction_data["reference"],
+                        "gateway_response": transaction_data.get("gateway_response", "")
+                    }
                     
-                    if response.status == 200:
-                        data = await response.json()
-                        safe_log("payment", "info", f"Paystack response data: {json.dumps(data, indent=2)}")
-                        
-                        # Check if verification was successful
-                        if data.get("status") and data["status"]:
-                            transaction_data = data["data"]
-                            
-                            result = {
-                                "success": True,
-                                "data": transaction_data,
-                                "status": transaction_data["status"],
-                                "amount": transaction_data["amount"],
-                                "currency": transaction_data["currency"],
-                                "customer_email": transaction_data["customer"]["email"],
-                                "paid_at": transaction_data.get("paid_at"),
-                                "reference": transaction_data["reference"],
-                                "gateway_response": transaction_data.get("gateway_response", "")
-                            }
-                            
-                            safe_log("payment", "info", f"Verification result: {json.dumps(result, indent=2)}")
-                            return result
-                        else:
-                            safe_log("payment", "error", f"Paystack verification failed: {data}")
-                            return {
-                                "success": False,
-                                "error": "Payment verification failed",
-                                "status": "failed"
-                            }
-                    else:
-                        safe_log("payment", "error", f"Paystack API error: {response.status} - {await response.text()}")
-                        return {
-                            "success": False,
-                            "error": f"Paystack API error: {response.status}",
-                            "status": "failed"
-                        }
+                    safe_log("payment", "info", f"Verification result: {json.dumps(result, indent=2)}")
+                    return result
+                else:
+                    safe_log("payment", "error", f"Paystack verification failed: {data}")
+                    return {
+                        "success": False,
+                        "error": "Payment verification failed",
+                        "status": "failed"
+                    }
+            else:
+                safe_log("payment", "error", f"Paystack API error: {response.status} - {response.text}")
+                return {
+                    "success": False,
+                    "error": f"Paystack API error: {response.status}",
+                    "status": "failed"
+                }
                 
         except Exception as e:
             safe_log("payment", "error", f"Verification error: {e}")
@@ -86,69 +92,62 @@ class PaymentService:
                 "status": "failed"
             }
     
-    def create_product_zip(self, products: List[Product], user: User) -> str:
-        """Create a zip file containing all purchased digital products"""
-        try:
-            file_logger.info(f"Creating zip file for {len(products)} products")
-            
-            # Create temporary directory for zip file
-            temp_dir = tempfile.mkdtemp()
-            zip_filename = f"jarvistrade_products_{user.id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
-            zip_path = os.path.join(temp_dir, zip_filename)
-            
-            file_logger.info(f"Zip path: {zip_path}")
-            
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for product in products:
-                    file_logger.info(f"Processing product: {product.name}, file_path: {product.file_path}")
-                    
-                    if product.file_path and os.path.exists(product.file_path):
-                        # Get the filename from the path
-                        filename = os.path.basename(product.file_path)
-                        file_logger.info(f"Adding file: {filename}")
-                        
-                        # Add product info file
-                        product_info = f"Product: {product.name}\n"
-                        product_info += f"Description: {product.description}\n"
-                        product_info += f"Price: ${product.price}\n"
-                        product_info += f"Category: {product.category}\n"
-                        product_info += f"Download Date: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}\n"
-                        product_info += f"Customer: {user.name} ({user.email})\n"
-                        product_info += "-" * 50 + "\n"
-                        
-                        # Add product info to zip
-                        zipf.writestr(f"{product.name}/README.txt", product_info)
-                        
-                        # Add the actual product file
-                        zipf.write(product.file_path, f"{product.name}/{filename}")
-                        
-                        # If product has additional files, add them too
-                        if hasattr(product, 'additional_files') and product.additional_files:
-                            additional_files = json.loads(product.additional_files)
-                            for file_path in additional_files:
-                                if os.path.exists(file_path):
-                                    additional_filename = os.path.basename(file_path)
-                                    zipf.write(file_path, f"{product.name}/{additional_filename}")
-                    else:
-                        file_logger.warning(f"Product {product.name} has no valid file path: {product.file_path}")
-                        # Create a placeholder file for products without files
-                        product_info = f"Product: {product.name}\n"
-                        product_info += f"Description: {product.description}\n"
-                        product_info += f"Price: ${product.price}\n"
-                        product_info += f"Category: {product.category}\n"
-                        product_info += f"Note: This is a digital product that will be delivered separately.\n"
-                        product_info += f"Download Date: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}\n"
-                        product_info += f"Customer: {user.name} ({user.email})\n"
-                        product_info += "-" * 50 + "\n"
-                        
-                        zipf.writestr(f"{product.name}/README.txt", product_info)
-            
-            file_logger.info(f"Zip file created successfully with size: {os.path.getsize(zip_path)} bytes")
-            return zip_path
-            
-        except Exception as e:
-            file_logger.error(f"Error creating product zip: {e}")
+    def product_bundle(self, products: List[Product]) -> ZipStream:
+        """Build the streamed zip bundle of purchased digital products.
+
+        Product details are read up front, so the returned stream can be
+        iterated after the database session is gone. Nothing in it depends on
+        the customer or the date, so everyone buying the same products gets
+        the same bundle from the bundle store.
+        """
+        bundle = ZipStream()
+        for product in sorted(products, key=lambda p: p.id):
+            file_logger.info(f"Processing product: {product.name}, file_path: {product.file_path}")
+            
+            product_info = f"Product: {product.name}\n"
+            product_info += f"Description: {product.description}\n"
+            product_info += f"Price: ${product.price}\n"
+            product_info += f"Category: {product.category}\n"
+            
+            if product.file_path and os.path.exists(product.file_path):
+                # Get the filename from the path
+                filename = os.path.basename(product.file_path)
+                file_logger.info(f"Adding file: {filename}")
+                
+                product_info += "-" * 50 + "\n"
+                
+                # Add product info and the actual product file
+                bundle.add_bytes(f"{product.name}/README.txt", product_info.encode())
+                bundle.add_file(product.file_path, f"{product.name}/{filename}")
+                
+                # If product has additional files, add them too
+                if hasattr(product, 'additional_files') and product.additional_files:
+                    additional_files = json.loads(product.additional_files)
+                    for file_path in additional_files:
+                        if os.path.exists(file_path):
+                            additional_filename = os.path.basename(file_path)
+                            bundle.add_file(file_path, f"{product.name}/{additional_filename}")
+            else:
+                file_logger.warning(f"Product {product.name} has no valid file path: {product.file_path}")
+                # Create a placeholder file for products without files
+                product_info += f"Note: This is a digital product that will be delivered separately.\n"
+                product_info += "-" * 50 + "\n"
+                
+                bundle.add_bytes(f"{product.name}/README.txt", product_info.encode())
+        return bundle
+    
+    def bundle_filename(self, user: User) -> str:
+        return f"jarvistrade_products_{user.id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
+    
+    def transaction_bundle(self, db: Session, transaction_id: str, user_id: str) -> Optional[Tuple[ZipStream, str]]:
+        """Bundle of the products bought in a transaction and its download name, or None"""
+        products = db.query(Product).join(OrderItem, OrderItem.product_id == Product.id).filter(
+            OrderItem.transaction_id == transaction_id
+        ).all()
+        user = db.query(User).filter(User.id == user_id).first()
+        if not products or not user:
             return None
+        return self.product_bundle(products), self.bundle_filename(user)
     
     def process_successful_payment(self, db: Session, reference: str, user: User) -> Dict[str, Any]:
         """Process successful payment and generate download tokens"""
@@ -177,9 +176,8 @@ class PaymentService:
                 }
             
             # Get the purchased items from the transaction
-            try:
-                purchased_items = json.loads(transaction.purchased_items) if transaction.purchased_items else []
-            except (json.JSONDecodeError, TypeError):
+            purchased_items = transaction.purchased_items or []
+            if not isinstance(purchased_items, list):
                 safe_log("payment", "error", f"Error parsing purchased items for reference: {reference}")
                 return {
                     "success": False,
@@ -208,82 +206,46 @@ class PaymentService:
             
             safe_log("payment", "info", f"Found {len(products)} products")
             
-            # Update transaction status to success
-            transaction.status = "success"
-            db.commit()
-            
-            # Create order items for each product
-            for item in purchased_items:
-                order_item = OrderItem(
-                    transaction_id=transaction.id,
-                    product_id=item["id"],
-                    quantity=item.get("quantity", 1),
-                    price=item.get("price", 0),
-                    is_rental=item.get("is_rental", False),
-                    rental_duration_days=item.get("rental_duration_days")
-                )
-                db.add(order_item)
-            
-            db.commit()
-            
-            # Create licenses for each product purchase/rental
-            for item in purchased_items:
-                # Generate license ID
-                license_id = f"LIC-{uuid.uuid4().hex[:8].upper()}"
-                
-                # Check if this is a rental
-                is_rental = item.get("is_rental", False)
-                expires_at = None
-                
-                if is_rental:
-                    # Set expiry date for rental based on actual rental duration
-                    rental_duration = item.get("rental_duration_days", 30)
-                    expires_at = datetime.utcnow() + timedelta(days=rental_duration)
-                    safe_log("payment", "info", f"Creating rental license with {rental_duration} days duration, expires at: {expires_at}")
-                
-                license_obj = License(
-                    license_id=license_id,
-                    user_id=user.id,
-                    product_id=item["id"],
-                    transaction_id=transaction.id,
-                    is_active=True,
-                    expires_at=expires_at,
-                    is_rental=is_rental
-                )
-                db.add(license_obj)
-            
-            db.commit()
-            
-            # Create zip file with purchased products
-            safe_log("payment", "info", "Creating product zip file...")
-            zip_path = self.create_product_zip(products, user)
-            
-            if not zip_path:
-                safe_log("payment", "error", "Failed to create product zip file")
+            # Claim the transaction: of concurrent fulfillments (verify endpoint,
+            # webhook, reconciliation) only one sees a row to update; the others
+            # wait for its commit and find it already processed
+            claimed = db.query(Transaction).filter(
+                Transaction.id == transaction.id,
+                Transaction.status != "success"
+            ).update({"status": "success", "updated_at": datetime.utcnow()}, synchronize_session="fetch")
+            if not claimed:
+                db.rollback()
+                safe_log("payment", "info", f"Transaction already processed for reference: {reference}")
                 return {
-                    "success": False,
-                    "error": "Failed to create product package"
+                    "success": True,
+                    "message": "Transaction already processed",
+                    "download_token": None
                 }
             
-            safe_log("payment", "info", f"Zip file created successfully: {zip_path}")
+            # Order items (written at checkout; older orders may lack them),
+            # licenses and the download token go in with the status, in one commit
+            insert_order_items(db, transaction.id, purchased_items)
+            grant_licenses(db, transaction.id, user.id, purchased_items)
             
-            # Generate download token for the zip file
+            # The download token serves the bundle once the background build
+            # below has written it
             safe_log("payment", "info", "Generating download token...")
-            download_token = self.generate_download_token_for_zip(db, user, transaction, zip_path, products)
-            
-            if not download_token:
-                safe_log("payment", "error", "Failed to generate download token")
-                return {
-                    "success": False,
-                    "error": "Failed to generate download token"
-                }
+            download_token = self.new_download_token(user, transaction, None)
+            db.add(download_token)
+            db.commit()
             
             safe_log("payment", "info", f"Download token generated successfully: {download_token}")
             
+            bundle_job = bundle_jobs.enqueue(
+                db, transaction.id, download_token.id, self.bundle_filename(user), self.product_bundle(products)
+            )
+            
             return {
                 "success": True,
                 "message": "Payment processed successfully",
                 "download_token": download_token,
+                "bundle_status": bundle_job.status,
+                "bundle_job_id": bundle_job.id,
                 "products": [{"id": p.id, "name": p.name} for p in products]
             }
             
@@ -295,8 +257,110 @@ class PaymentService:
                 "error": f"Payment processing error: {str(e)}"
             }
     
-    def generate_download_token_for_zip(self, db: Session, user: User, transaction: Transaction, zip_path: str, products: List[Product]) -> DownloadToken:
-        """Generate a secure download token for zip file"""
+    def process_webhook_event(self, db: Session, event: str, data: Dict[str, Any]) -> str:
+        """Apply a Paystack webhook event; called by the webhook inbox consumer.
+
+        Safe to run again for an event that was already applied (fulfillment
+        is skipped for transactions that are already successful). Raises when
+        the event should be retried.
+        """
+        reference = data.get("reference")
+        
+        if event == "charge.success":
+            amount = data.get("amount")
+            customer_email = (data.get("customer") or {}).get("email")
+            metadata = data.get("metadata") or {}
+            
+            transaction = db.query(Transaction).filter(
+                Transaction.paystack_reference == reference
+            ).first()
+            if not transaction:
+                safe_log("payment", "error", f"Transaction not found for reference: {reference}")
+                return "Transaction not found"
+            
+            stored_payment_data = transaction.payment_data
+            paystack_status = data.get("status", "success")
+            # The status itself is set by process_successful_payment, which
+            # skips transactions that are already successful
+            if paystack_status != "success":
+                transaction.status = paystack_status
+            transaction.payment_data = json.dumps(data)
+            db.commit()
+            
+            # Check if this is a retry payment and update original transaction
+            # First check metadata from Paystack
+            original_transaction_id = None
+            if metadata.get("is_retry_payment") and metadata.get("original_transaction_id"):
+                original_transaction_id = metadata.get("original_transaction_id")
+                safe_log("payment", "info", f"Found retry payment via metadata: {original_transaction_id}")
+            
+            # If not found in metadata, check payment_data (our stored data)
+            if not original_transaction_id and stored_payment_data:
+                try:
+                    payment_data = json.loads(stored_payment_data)
+                    if payment_data.get("is_retry_payment") and payment_data.get("original_transaction_id"):
+                        original_transaction_id = payment_data.get("original_transaction_id")
+                        safe_log("payment", "info", f"Found retry payment via payment_data: {original_transaction_id}")
+                except (json.JSONDecodeError, TypeError, AttributeError):
+                    pass
+            
+            if original_transaction_id:
+                original_transaction = db.query(Transaction).filter(
+                    Transaction.id == original_transaction_id
+                ).first()
+                
+                if original_transaction and paystack_status == "success" and original_transaction.status != "resolved_by_retry":
+                    # Update original transaction status to indicate it was resolved by retry
+                    original_transaction.payment_data = json.dumps({
+                        "resolved_by": reference,
+                        "resolved_at": datetime.now().isoformat(),
+                        "original_status": original_transaction.status
+                    })
+                    original_transaction.status = "resolved_by_retry"
+                    db.commit()
+                    safe_log("payment", "info", f"Original transaction {original_transaction_id} marked as resolved by retry {reference}")
+                elif not original_transaction:
+                    safe_log("payment", "warning", f"Original transaction {original_transaction_id} not found")
+            
+            if paystack_status != "success":
+                safe_log("payment", "info", f"Transaction {reference} status updated to: {paystack_status}")
+                return f"Payment status: {paystack_status}"
+            
+            # Find user by email, falling back to the buyer of the transaction
+            user = db.query(User).filter(User.email == customer_email).first()
+            if not user:
+                user = db.query(User).filter(User.id == transaction.user_id).first()
+            if not user:
+                safe_log("payment", "error", f"User not found for email: {customer_email}")
+                return "User not found"
+            
+            result = self.process_successful_payment(db, reference, user)
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+            safe_log("payment", "info", f"Payment processed successfully: {reference} - {amount} - {customer_email}")
+            return result["message"]
+        
+        if event == "charge.failed":
+            safe_log("payment", "error", f"Payment failed: {reference}")
+            transaction = db.query(Transaction).filter(
+                Transaction.paystack_reference == reference
+            ).first()
+            if not transaction:
+                safe_log("payment", "error", f"Transaction not found for reference: {reference}")
+                return "Transaction not found"
+            # A late failure never overrides a payment that already succeeded
+            if transaction.status != "success":
+                transaction.status = data.get("status", "failed")
+                transaction.payment_data = json.dumps(data)
+                db.commit()
+                safe_log("payment", "info", f"Transaction {reference} status updated to: {transaction.status}")
+            return "Payment failed"
+        
+        safe_log("payment", "warning", f"Unhandled webhook event: {event}")
+        return "Event ignored"
+    
+    def new_download_token(self, user: User, transaction: Transaction, zip_path: Optional[str]) -> DownloadToken:
+        """Unsaved bundle download token with a client-generated id"""
         # Generate unique token
         token_string = secrets.token_urlsafe(32)
         
@@ -304,23 +368,18 @@ class PaymentService:
         expires_at = datetime.utcnow() + timedelta(hours=self.download_token_expiry_hours)
         
         # Create download token with configurable security settings
-        download_token = DownloadToken(
+        return DownloadToken(
+            id=str(uuid.uuid4()),
             user_id=user.id,
             product_id=None,  # This is for a zip file containing multiple products
             transaction_id=transaction.id,
             token=token_string,
             is_single_use=self.enable_single_use_tokens,  # Use configurable setting
             expires_at=expires_at,
-            file_path=zip_path,  # Store the zip file path
+            file_path=zip_path,  # Store the zip file path (None for streamed bundles)
             download_count=0,  # Track number of downloads
             max_downloads=self.max_downloads_per_token  # Use configurable limit
         )
-        
-        db.add(download_token)
-        db.commit()
-        db.refresh(download_token)
-        
-        return download_token
     
     def validate_download_token(self, db: Session, token: str, ip_address: str, user_agent: str) -> Dict[str, Any]:
         """Validate download token and log download attempt"""
@@ -339,43 +398,72 @@ class PaymentService:
             # No restrictions since licensing is in place
             # Downloads are now unlimited with proper licensing protection
             
-            # Handle zip file downloads (when product_id is None)
-            if download_token.product_id is None and download_token.file_path:
-                # This is a zip file download
-                if not os.path.exists(download_token.file_path):
+            if download_token.product_id is None:
+                bundle_job = bundle_jobs.job_for_token(db, download_token.id)
+                
+                # The built bundle was evicted from the store (or, for tokens
+                # issued before it, its temporary directory was cleared)
+                if download_token.file_path and not bundle_store.lookup(download_token.file_path):
+                    bundle_job = bundle_jobs.rebuild(db, download_token, bundle_job, self.transaction_bundle)
+                
+                # Handle zip file downloads (built bundles and legacy zips)
+                if download_token.file_path and os.path.exists(download_token.file_path):
+                    # Track download for analytics (no restrictions)
+                    download_events.record(
+                        user_id=download_token.user_id,
+                        download_token_id=download_token.id,
+                        ip_address=ip_address,
+                        user_agent=user_agent,
+                        count_token=True
+                    )
+                    
+                    return {
+                        "success": True,
+                        "file_path": download_token.file_path,
+                        "file_name": bundle_job.file_name if bundle_job else None,
+                        "file_size": os.path.getsize(download_token.file_path),
+                        "is_zip": True,
+                        "downloads_remaining": "unlimited",
+                        "user_id": download_token.user_id,
+                        "product_id": None
+                    }
+                
+                # The bundle is still being built
+                if bundle_job is not None and bundle_job.status in ("pending", "building"):
+                    bundle_jobs.resume(db, bundle_job, self.transaction_bundle)
+                    return {
+                        "success": False,
+                        "pending": True,
+                        "bundle_status": bundle_job.status,
+                        "error": "Your download is still being prepared"
+                    }
+                
+                # Otherwise (no build, failed build) stream the bundle
+                bundle = self.transaction_bundle(db, download_token.transaction_id, download_token.user_id)
+                if bundle is None:
                     return {
                         "success": False,
                         "error": "Product package not found"
                     }
                 
                 # Track download for analytics (no restrictions)
-                download_token.download_count += 1
-                db.commit()
-                
-                # Log download attempt
-                download_log = DownloadLog(
-                    download_token_id=download_token.id,
+                download_events.record(
                     user_id=download_token.user_id,
-                    product_id=None,
+                    download_token_id=download_token.id,
                     ip_address=ip_address,
                     user_agent=user_agent,
-                    success=True
+                    count_token=True
                 )
                 
-                db.add(download_log)
-                db.commit()
-                
-                # Get file size
-                file_size = os.path.getsize(download_token.file_path)
-                
                 return {
                     "success": True,
-                    "file_path": download_token.file_path,
-                    "file_size": file_size,
+                    "bundle": bundle[0],
+                    "file_name": bundle[1],
+                    "file_size": None,
                     "is_zip": True,
                     "downloads_remaining": "unlimited",
                     "user_id": download_token.user_id,
-                    "product_id": download_token.product_id
+                    "product_id": None
                 }
             
             # Handle individual product downloads
@@ -394,26 +482,16 @@ class PaymentService:
                 }
             
             # Track download for analytics (no restrictions)
-            download_token.download_count += 1
-            db.commit()
-            
-            # Log download attempt
-            download_log = DownloadLog(
-                download_token_id=download_token.id,
+            download_events.record(
                 user_id=download_token.user_id,
                 product_id=download_token.product_id,
+                download_token_id=download_token.id,
                 ip_address=ip_address,
                 user_agent=user_agent,
-                success=True
+                count_product=True,
+                count_token=True
             )
             
-            db.add(download_log)
-            
-            # Update product download count
-            product.download_count += 1
-            
-            db.commit()
-            
             # Get actual file size from disk
             actual_file_size = os.path.getsize(product.file_path)
             
@@ -431,17 +509,15 @@ class PaymentService:
         except Exception as e:
             # Log failed download attempt
             if 'download_token' in locals():
-                download_log = DownloadLog(
-                    download_token_id=download_token.id,
+                download_events.record(
                     user_id=download_token.user_id,
                     product_id=download_token.product_id,
+                    download_token_id=download_token.id,
                     ip_address=ip_address,
                     user_agent=user_agent,
                     success=False,
                     error_message=str(e)
                 )
-                db.add(download_log)
-                db.commit()
             
             return {
                 "success": False,
@@ -0,0 +1,194 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, NamedTuple, Optional
+import aiohttp
+from config import settings
+from logging_config import safe_log
+
+# Latency samples kept per operation for the percentiles in ``stats``
+LATENCY_SAMPLES = 1000
+
+class PaystackError(Exception):
+    """Paystack could not be reached (connection failure or timeout), even after retrying"""
+
+class PaystackResponse(NamedTuple):
+    status: int
+    data: Any  # Parsed JSON body, or None when it was not JSON
+    text: str
+
+class _OperationStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 1)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "latency_ms": {
+                "avg": round(sum(latencies) / len(latencies), 1) if latencies else None,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(latencies[-1], 1) if latencies else None
+            }
+        }
+
+class PaystackClient:
+    """Long-lived Paystack API client of one worker.
+
+    One ``aiohttp.ClientSession`` with a pooled, keep-alive TCP connector is
+    opened in the app lifespan and reused by every call, so DNS lookups and
+    TLS handshakes are paid once per connection instead of once per request.
+    Calls have connect and read timeouts, at most ``max_concurrency`` run at
+    a time, and 5xx responses and connection failures are retried with
+    jittered exponential backoff (timeouts only for GETs, which are safe to
+    repeat). Latency, errors and retries are recorded per operation.
+    """
+
+    def __init__(
+        self,
+        secret_key: str,
+        base_url: str,
+        connect_timeout: float,
+        read_timeout: float,
+        max_connections: int,
+        max_concurrency: int,
+        max_retries: int,
+        retry_backoff_ms: int
+    ):
+        self.secret_key = secret_key
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, _OperationStats] = {}
+
+    async def start(self):
+        """Open the pooled session; called from the app lifespan"""
+        await self._ensure_session()
+
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._loop is loop:
+            return self._session
+        # Scripts and tests may call from a new event loop; sessions cannot move between loops
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            ttl_dns_cache=300,
+            keepalive_timeout=30
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=None, connect=self.connect_timeout, sock_read=self.read_timeout),
+            headers={
+                "Authorization": f"Bearer {self.secret_key}",
+                "Content-Type": "application/json"
+            }
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._loop = loop
+        return self._session
+
+    async def close(self):
+        """Close the session and its pooled connections; called on shutdown"""
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def request(self, operation: str, method: str, path: str, json: Optional[Dict[str, Any]] = None) -> PaystackResponse:
+        """Call the Paystack API, retrying 5xx responses and connection failures.
+
+        Returns the last response (4xx and exhausted 5xx included); raises
+        ``PaystackError`` when no response could be obtained.
+        """
+        session = await self._ensure_session()
+        url = f"{self.base_url}{path}"
+        retry_timeouts = method == "GET"
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    async with session.request(method, url, json=json) as response:
+                        text = await response.text()
+                        try:
+                            data = await response.json(content_type=None)
+                        except ValueError:
+                            data = None
+                        result = PaystackResponse(response.status, data, text)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                # A request may have reached Paystack before a read timeout
+                retryable = retry_timeouts or isinstance(e, aiohttp.ClientConnectorError)
+                self._record(operation, started, error=True)
+                if not retryable or attempt >= self.max_retries:
+                    raise PaystackError(f"Paystack {operation} failed: {e!r}") from e
+            else:
+                self._record(operation, started, error=result.status >= 500)
+                if result.status < 500 or attempt >= self.max_retries:
+                    return result
+            attempt += 1
+            self._record_retry(operation)
+            delay = random.uniform(0, self.retry_backoff * 2 ** (attempt - 1))
+            safe_log("payment", "warning", f"Retrying Paystack {operation} in {delay * 1000:.0f}ms (attempt {attempt + 1})")
+            await asyncio.sleep(delay)
+
+    async def verify_transaction(self, reference: str) -> PaystackResponse:
+        return await self.request("verify", "GET", f"/transaction/verify/{reference}")
+
+    async def initialize_transaction(self, payload: Dict[str, Any]) -> PaystackResponse:
+        return await self.request("initialize", "POST", "/transaction/initialize", json=payload)
+
+    def _operation(self, operation: str) -> _OperationStats:
+        stats = self._stats.get(operation)
+        if stats is None:
+            stats = self._stats.setdefault(operation, _OperationStats())
+        return stats
+
+    def _record(self, operation: str, started: float, error: bool):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            stats = self._operation(operation)
+            stats.calls += 1
+            stats.errors += error
+            stats.latencies.append(elapsed_ms)
+
+    def _record_retry(self, operation: str):
+        with self._stats_lock:
+            self._operation(operation).retries += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-operation call counts, errors, retries and latency of this worker"""
+        with self._stats_lock:
+            return {operation: stats.summary() for operation, stats in self._stats.items()}
+
+# Create global Paystack client instance
+paystack_client = PaystackClient(
+    secret_key=settings.paystack_secret_key,
+    base_url=settings.paystack_base_url,
+    connect_timeout=settings.paystack_connect_timeout,
+    read_timeout=settings.paystack_read_timeout,
+    max_connections=settings.paystack_max_connections,
+    max_concurrency=settings.paystack_max_concurrency,
+    max_retries=settings.paystack_max_retries,
+    retry_backoff_ms=settings.paystack_retry_backoff_ms
+)
@@ -0,0 +1,83 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import case, func
+from sqlalchemy.orm import Query
+from models_mysql import Product
+from schemas import PRODUCT_CATEGORIES, PRODUCT_CATEGORY_NAMES, PRODUCT_PLATFORMS
+
+# Price ranges in USD as (min, max); max is exclusive and None means no upper bound
+PRICE_RANGES: List[Tuple[float, Optional[float]]] = [
+    (0, 25),
+    (25, 50),
+    (50, 100),
+    (100, 250),
+    (250, None)
+]
+
+# Minimum ratings offered as "N stars & up" filters
+RATING_THRESHOLDS = [4, 3, 2, 1]
+
+def _price_label(low: float, high: Optional[float]) -> str:
+    if high is None:
+        return f"${low:g}+"
+    return f"${low:g} - ${high:g}"
+
+def compute_product_facets(query: Query) -> Dict[str, Any]:
+    """Count products by category, platform, price range and rating in one pass.
+
+    ``query`` is a filtered query on Product; its ordering is ignored. Products
+    without a price are left out of the price ranges.
+    """
+    price_bucket = case(
+        (Product.price == None, -1),
+        *[(Product.price < high, index) for index, (_, high) in enumerate(PRICE_RANGES) if high is not None],
+        else_=len(PRICE_RANGES) - 1
+    )
+    rating_floor = case(
+        *[(Product.rating >= threshold, threshold) for threshold in RATING_THRESHOLDS],
+        else_=0
+    )
+    rows = query.order_by(None).with_entities(
+        Product.category, Product.platform, price_bucket, rating_floor, func.count(Product.id)
+    ).group_by(Product.category, Product.platform, price_bucket, rating_floor).all()
+
+    categories, platforms, prices, ratings = Counter(), Counter(), Counter(), Counter()
+    for category, platform, price_index, rating, count in rows:
+        if category:
+            categories[category] += count
+        platforms[platform or "MT4"] += count
+        if price_index >= 0:
+            prices[price_index] += count
+        ratings[rating] += count
+
+    category_ids = PRODUCT_CATEGORIES + sorted(set(categories) - set(PRODUCT_CATEGORIES))
+    platform_ids = PRODUCT_PLATFORMS + sorted(set(platforms) - set(PRODUCT_PLATFORMS))
+    return {
+        "categories": [
+            {"value": category, "label": PRODUCT_CATEGORY_NAMES.get(category, category.title()), "count": categories[category]}
+            for category in category_ids
+        ],
+        "platforms": [
+            {"value": platform, "label": platform, "count": platforms[platform]}
+            for platform in platform_ids
+        ],
+        "price_ranges": [
+            {
+                "value": f"{low:g}-{high:g}" if high is not None else f"{low:g}+",
+                "label": _price_label(low, high),
+                "count": prices[index],
+                "min": low,
+                "max": high
+            }
+            for index, (low, high) in enumerate(PRICE_RANGES)
+        ],
+        "ratings": [
+            {
+                "value": str(threshold),
+                "label": f"{threshold} stars & up",
+                "count": sum(count for rating, count in ratings.items() if rating >= threshold),
+                "min": threshold
+            }
+            for threshold in RATING_THRESHOLDS
+        ]
+    }
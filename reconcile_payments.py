@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Reconcile pending payments with Paystack.
+
+Transactions left ``pending`` or ``abandoned`` (the customer closed the
+checkout, the verify call never came back, a webhook was lost) are verified
+against Paystack: successful payments are fulfilled, failed and abandoned
+ones get their final status. Runs from the command line and, every
+RECONCILE_INTERVAL_MINUTES, inside the app.
+
+Usage: python reconcile_payments.py [--concurrency 10] [--min-age-minutes 15]
+                                    [--max-age-days 7] [--limit N] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+from sqlalchemy import and_, bindparam, or_, update
+from database import SessionLocal
+from models_mysql import Transaction, User
+from config import settings
+from logging_config import safe_log
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines: workers do not coordinate runs
+    fcntl = None
+
+# Statuses the reconciler looks at, and the final statuses it writes
+RECONCILE_STATUSES = ("pending", "abandoned")
+FINAL_STATUSES = ("failed", "abandoned", "reversed")
+
+class PendingPayment(NamedTuple):
+    id: str
+    reference: str
+    status: str
+    user_id: Optional[str]
+    created_at: datetime
+
+class PaymentReconciler:
+    """Verifies stuck transactions with a bounded-concurrency asyncio pipeline.
+
+    One task pages through the pending transactions (keyset pagination on
+    the ``status`` and ``created_at`` indexes), ``concurrency`` tasks verify
+    them with ``PaymentService.verify_payment`` and one task applies the
+    outcomes: status changes of a batch are written with a single
+    executemany UPDATE and commit, guarded so rows fulfilled meanwhile by the
+    verify endpoint or a webhook are left alone; successful payments go
+    through ``process_successful_payment``, which skips transactions that are
+    already fulfilled. Paystack errors leave the row for the next run.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        payment_service,
+        concurrency: int,
+        batch_size: int,
+        min_age_minutes: int,
+        max_age_days: int,
+        lock_file: Optional[str] = None
+    ):
+        self.session_factory = session_factory
+        self.payment_service = payment_service
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.min_age = timedelta(minutes=min_age_minutes)
+        self.max_age = timedelta(days=max_age_days)
+        self.lock_file = lock_file
+
+    def _scan_page(self, after: Optional[PendingPayment], newest: datetime, oldest: datetime) -> List[PendingPayment]:
+        session = self.session_factory()
+        try:
+            query = session.query(
+                Transaction.id, Transaction.paystack_reference, Transaction.status,
+                Transaction.user_id, Transaction.created_at
+            ).filter(
+                Transaction.status.in_(RECONCILE_STATUSES),
+                Transaction.created_at >= oldest,
+                Transaction.created_at <= newest,
+                Transaction.paystack_reference.isnot(None)
+            )
+            if after is not None:
+                query = query.filter(or_(
+                    Transaction.created_at > after.created_at,
+                    and_(Transaction.created_at == after.created_at, Transaction.id > after.id)
+                ))
+            rows = query.order_by(Transaction.created_at, Transaction.id).limit(self.batch_size).all()
+            return [PendingPayment(*row) for row in rows]
+        finally:
+            session.close()
+
+    def _apply(self, outcomes: List[Dict[str, Any]], stats: Counter):
+        """Write the verification outcomes of one batch"""
+        changes = []
+        paid = []
+        counts: Counter = Counter()
+        for outcome in outcomes:
+            payment, result = outcome["payment"], outcome["result"]
+            if not result.get("success"):
+                counts["errors"] += 1
+                continue
+            status = result.get("status")
+            if status == "success":
+                # Fulfillment sets the status; only the payment details are written here
+                changes.append({"row_id": payment.id, "new_status": payment.status, "new_payment_data": json.dumps(result["data"])})
+                paid.append(payment)
+            elif status in FINAL_STATUSES and status != payment.status:
+                changes.append({"row_id": payment.id, "new_status": status, "new_payment_data": json.dumps(result["data"])})
+                counts[status] += 1
+            else:
+                counts["unchanged"] += 1
+
+        session = self.session_factory()
+        try:
+            if changes:
+                table = Transaction.__table__
+                # IN lists cannot be expanded in an executemany, hence the OR
+                session.connection().execute(
+                    update(table)
+                    .where(table.c.id == bindparam("row_id"), or_(*(table.c.status == status for status in RECONCILE_STATUSES)))
+                    .values(status=bindparam("new_status"), payment_data=bindparam("new_payment_data"), updated_at=datetime.utcnow()),
+                    changes
+                )
+                session.commit()
+            stats.update(counts)
+            for payment in paid:
+                user = session.query(User).filter(User.id == payment.user_id).first()
+                result = self.payment_service.process_successful_payment(session, payment.reference, user) if user else {
+                    "success": False, "error": "User not found"
+                }
+                if result["success"]:
+                    stats["success"] += 1
+                    safe_log("payment", "info", f"Reconciled payment {payment.reference}: fulfilled")
+                else:
+                    stats["fulfillment_failed"] += 1
+                    safe_log("payment", "error", f"Reconciled payment {payment.reference} could not be fulfilled: {result['error']}")
+        finally:
+            session.close()
+
+    async def run(self, limit: Optional[int] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Verify every stuck transaction once; returns counts per outcome"""
+        started = time.monotonic()
+        now = datetime.utcnow()
+        newest, oldest = now - self.min_age, now - self.max_age
+        stats: Counter = Counter()
+        payments: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        outcomes: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size * 2)
+
+        async def scan():
+            after, scanned = None, 0
+            while limit is None or scanned < limit:
+                page = await asyncio.to_thread(self._scan_page, after, newest, oldest)
+                for payment in page[:None if limit is None else limit - scanned]:
+                    await payments.put(payment)
+                    scanned += 1
+                if len(page) < self.batch_size:
+                    break
+                after = page[-1]
+            stats["scanned"] = scanned
+            for _ in range(self.concurrency):
+                await payments.put(None)
+
+        async def verify():
+            while (payment := await payments.get()) is not None:
+                try:
+                    result = await self.payment_service.verify_payment(payment.reference)
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+                await outcomes.put({"payment": payment, "result": result})
+
+        async def apply():
+            batch = []
+            while True:
+                outcome = await outcomes.get()
+                if outcome is not None:
+                    batch.append(outcome)
+                if batch and (outcome is None or len(batch) >= self.batch_size):
+                    if dry_run:
+                        stats.update(o["result"].get("status") or "errors" for o in batch)
+                    else:
+                        try:
+                            await asyncio.to_thread(self._apply, batch, stats)
+                        except Exception as e:
+                            # The rows are still pending and are picked up by the next run
+                            stats["apply_errors"] += len(batch)
+                            safe_log("payment", "error", f"Failed to apply {len(batch)} reconciled payments: {e}")
+                    batch = []
+                if outcome is None:
+                    return
+
+        applier = asyncio.create_task(apply())
+        verifiers = [asyncio.create_task(verify()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(scan(), *verifiers)
+            await outcomes.put(None)
+            await applier
+        finally:
+            # A failed scan leaves the verifiers waiting for payments
+            for task in verifiers + [applier]:
+                task.cancel()
+
+        result = dict(stats)
+        result["seconds"] = round(time.monotonic() - started, 2)
+        safe_log("payment", "info", f"Payment reconciliation finished: {result}")
+        return result
+
+    @contextmanager
+    def _exclusive(self):
+        """Yield whether this process may run; one run at a time per host"""
+        if fcntl is None or not self.lock_file:
+            yield True
+            return
+        with open(self.lock_file, "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    async def run_periodically(self, interval_minutes: float):
+        """Scheduled task of the app: reconcile every ``interval_minutes``"""
+        while True:
+            await asyncio.sleep(interval_minutes * 60)
+            try:
+                with self._exclusive() as acquired:
+                    # Another worker on this host is already running it
+                    if acquired:
+                        await self.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                safe_log("payment", "error", f"Payment reconciliation failed: {e}")
+
+def create_reconciler(payment_service, **overrides) -> PaymentReconciler:
+    options = {
+        "concurrency": settings.reconcile_concurrency,
+        "batch_size": settings.reconcile_batch_size,
+        "min_age_minutes": settings.reconcile_min_age_minutes,
+        "max_age_days": settings.reconcile_max_age_days,
+        "lock_file": settings.reconcile_lock_file
+    }
+    options.update(overrides)
+    return PaymentReconciler(SessionLocal, payment_service, **options)
+
+async def _main(args):
+    # Imported here so the reconciler can be used without the mail settings
+    from payment_service import payment_service
+    from paystack_client import paystack_client
+    reconciler = create_reconciler(
+        payment_service,
+        concurrency=args.concurrency,
+        min_age_minutes=args.min_age_minutes,
+        max_age_days=args.max_age_days
+    )
+    try:
+        with reconciler._exclusive() as acquired:
+            if not acquired:
+                print("Another reconciliation is running")
+                return 1
+            stats = await reconciler.run(limit=args.limit, dry_run=args.dry_run)
+    finally:
+        await paystack_client.close()
+    print(json.dumps(stats, indent=2))
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=settings.reconcile_concurrency)
+    parser.add_argument("--min-age-minutes", type=int, default=settings.reconcile_min_age_minutes)
+    parser.add_argument("--max-age-days", type=int, default=settings.reconcile_max_age_days)
+    parser.add_argument("--limit", type=int, default=None, help="Verify at most this many transactions")
+    parser.add_argument("--dry-run", action="store_true", help="Verify and report, but do not write")
+    raise SystemExit(asyncio.run(_main(parser.parse_args())))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy import func, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from models_mysql import Product, ProductRatingStats, Review
+from logging_config import review_logger
+
+# Star ratings a review can have
+STAR_RATINGS = (1, 2, 3, 4, 5)
+
+def review_state(review: Optional[Review]) -> Optional[int]:
+    """Return the star rating a review contributes to its product's aggregates.
+
+    None means the review does not count (deleted, unapproved or unrated).
+    """
+    if review is None or not review.is_approved or review.rating not in STAR_RATINGS:
+        return None
+    return review.rating
+
+def average_rating(rating_sum: int, rating_count: int) -> float:
+    """Average rating as stored on the product, rounded to one decimal"""
+    return round(rating_sum / rating_count, 1) if rating_count else 0.0
+
+class ReviewStats:
+    """Maintained rating aggregates (sum, count and star histogram) per product.
+
+    Aggregates are adjusted in the same transaction as the review write and
+    copied to ``Product.rating`` / ``Product.total_reviews``, so a new review
+    costs a couple of primary key updates instead of a rescan of every review
+    of the product.
+    """
+
+    def adjust(self, db: Session, product_id: str, before: Optional[int], after: Optional[int]):
+        """Apply the aggregate changes for a review moving from ``before`` to ``after``.
+
+        States come from review_state; None means the review does not count.
+        The review change must already be flushed. The caller commits.
+        """
+        if before == after:
+            return
+
+        deltas = Counter()
+        for stars, sign in ((before, -1), (after, 1)):
+            if stars is None:
+                continue
+            deltas["rating_sum"] += sign * stars
+            deltas["rating_count"] += sign
+            deltas[f"stars_{stars}"] += sign
+
+        updated = db.query(ProductRatingStats).filter(ProductRatingStats.product_id == product_id).update(
+            {getattr(ProductRatingStats, name): getattr(ProductRatingStats, name) + delta for name, delta in deltas.items()},
+            synchronize_session=False
+        )
+        if not updated:
+            # First review write since the aggregates were introduced: the
+            # flushed reviews table already includes this change
+            self.rebuild_product(db, product_id)
+            return
+        self._sync_product(db, product_id)
+
+    def _sync_product(self, db: Session, product_id: str):
+        """Copy a product's aggregates to its rating and total_reviews columns"""
+        rating_sum, rating_count = db.query(
+            ProductRatingStats.rating_sum, ProductRatingStats.rating_count
+        ).filter(ProductRatingStats.product_id == product_id).one()
+        db.query(Product).filter(Product.id == product_id).update(
+            {Product.rating: average_rating(rating_sum, rating_count), Product.total_reviews: rating_count},
+            synchronize_session=False
+        )
+
+    def _histogram(self, db: Session, product_id: str) -> Dict[int, int]:
+        """Approved review count per star rating of one product, from the reviews table"""
+        return dict(db.query(Review.rating, func.count(Review.id)).filter(
+            Review.product_id == product_id,
+            Review.is_approved == True,
+            Review.rating.in_(STAR_RATINGS)
+        ).group_by(Review.rating).all())
+
+    def rebuild_product(self, db: Session, product_id: str) -> Dict[str, Any]:
+        """Recompute one product's aggregates from its approved reviews. The caller commits.
+
+        The row is upserted, so workers writing the first reviews of a product
+        at the same time do not collide on its primary key.
+        """
+        histogram = self._histogram(db, product_id)
+        values = {
+            "rating_sum": sum(stars * count for stars, count in histogram.items()),
+            "rating_count": sum(histogram.values()),
+            **{f"stars_{stars}": histogram.get(stars, 0) for stars in STAR_RATINGS},
+            "updated_at": datetime.utcnow()
+        }
+        table = ProductRatingStats.__table__
+        dialect = db.get_bind().dialect.name
+        if dialect == "mysql":
+            statement = mysql.insert(table).values(product_id=product_id, **values)
+            statement = statement.on_duplicate_key_update(**{name: statement.inserted[name] for name in values})
+        else:
+            statement = (postgresql if dialect == "postgresql" else sqlite).insert(table).values(product_id=product_id, **values)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.product_id],
+                set_={name: statement.excluded[name] for name in values}
+            )
+        db.execute(statement)
+        self._sync_product(db, product_id)
+        return values
+
+    def remove_product(self, db: Session, product_id: str):
+        """Delete the aggregates of a product that is being deleted. The caller commits."""
+        db.query(ProductRatingStats).filter(ProductRatingStats.product_id == product_id).delete(synchronize_session=False)
+
+    def summary(self, db: Session, product_id: str) -> Dict:
+        """Return the average, count and star histogram of a product's approved reviews"""
+        stats = db.get(ProductRatingStats, product_id)
+        if stats is None:
+            # No aggregates yet (no review write since they were introduced):
+            # computed from the reviews, and stored by the next review write
+            histogram = self._histogram(db, product_id)
+            rating_sum = sum(stars * count for stars, count in histogram.items())
+            rating_count = sum(histogram.values())
+        else:
+            histogram = {stars: getattr(stats, f"stars_{stars}") for stars in STAR_RATINGS}
+            rating_sum, rating_count = stats.rating_sum, stats.rating_count
+        return {
+            "product_id": product_id,
+            "average_rating": average_rating(rating_sum, rating_count),
+            "total_reviews": rating_count,
+            "histogram": {stars: histogram.get(stars, 0) for stars in STAR_RATINGS}
+        }
+
+    def rebuild(self, db: Session) -> int:
+        """Recompute the aggregates of every product with one grouped scan of the reviews table"""
+        rows = db.query(Review.product_id, Review.rating, func.count(Review.id)).filter(
+            Review.is_approved == True,
+            Review.rating.in_(STAR_RATINGS)
+        ).group_by(Review.product_id, Review.rating).all()
+
+        stats: Dict[str, Dict[str, int]] = {}
+        for product_id, stars, count in rows:
+            entry = stats.setdefault(product_id, {
+                "product_id": product_id, "rating_sum": 0, "rating_count": 0,
+                **{f"stars_{value}": 0 for value in STAR_RATINGS}
+            })
+            entry["rating_sum"] += stars * count
+            entry["rating_count"] += count
+            entry[f"stars_{stars}"] += count
+
+        db.query(ProductRatingStats).delete(synchronize_session=False)
+        if stats:
+            db.bulk_insert_mappings(ProductRatingStats, list(stats.values()))
+
+        # Only products whose stored rating drifted are written back
+        changes = []
+        for product_id, rating, total_reviews in db.query(Product.id, Product.rating, Product.total_reviews).all():
+            entry = stats.get(product_id, {"rating_sum": 0, "rating_count": 0})
+            expected = (average_rating(entry["rating_sum"], entry["rating_count"]), entry["rating_count"])
+            if (rating, total_reviews) != expected:
+                changes.append({"id": product_id, "rating": expected[0], "total_reviews": expected[1]})
+        if changes:
+            db.execute(update(Product), changes)
+        db.commit()
+        review_logger.info(f"Rebuilt rating aggregates for {len(stats)} products ({len(changes)} product ratings corrected)")
+        return len(stats)
+
+# Create global review stats instance
+review_stats = ReviewStats()
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        count = review_stats.rebuild(db)
+        print(f"✅ Rating aggregates rebuilt for {count} products")
+    finally:
+        db.close()
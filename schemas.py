@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 import json
 
@@ -42,6 +42,15 @@ PRODUCT_CATEGORIES = [
     "education"
 ]
 
+# Display names for product categories
+PRODUCT_CATEGORY_NAMES = {
+    "trading-bot": "Trading Bots",
+    "indicator": "Indicators",
+    "analysis-tool": "Analysis Tools",
+    "risk-management": "Risk Management",
+    "education": "Education"
+}
+
 # Product platforms
 PRODUCT_PLATFORMS = [
     "MT4",
@@ -341,11 +350,42 @@ class ProductResponse(ProductBase):
     class Config:
         from_attributes = True
 
+class FacetBucket(BaseModel):
+    value: str
+    label: str
+    count: int
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class ProductFacets(BaseModel):
+    categories: List[FacetBucket]
+    platforms: List[FacetBucket]
+    price_ranges: List[FacetBucket]
+    ratings: List[FacetBucket]
+
+class ProductListResponse(BaseModel):
+    items: List[ProductResponse]
+    total: int
+    skip: int
+    limit: int
+    next_cursor: Optional[str] = None
+    facets: Optional[ProductFacets] = None
+
+class ProductBatchResponse(BaseModel):
+    # One entry per requested id, then per requested slug; null when not found
+    items: List[Optional[ProductResponse]]
+    missing_ids: List[str]
+    missing_slugs: List[str]
+
 class CategoryResponse(BaseModel):
     id: str
     name: str
     count: int
 
+class TagResponse(BaseModel):
+    tag: str
+    count: int
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -443,6 +483,12 @@ class ReviewUpdate(BaseModel):
     comment: Optional[str] = Field(None, min_length=10, max_length=1000)
     is_approved: Optional[bool] = None
 
+class ReviewSummaryResponse(BaseModel):
+    product_id: str
+    average_rating: float
+    total_reviews: int
+    histogram: Dict[int, int]  # star rating -> number of approved reviews
+
 class ReviewResponse(ReviewBase):
     id: str
     user_id: str
@@ -503,6 +549,11 @@ class BlogPostResponse(BlogPostBase):
     published_at: Optional[datetime]
     created_at: datetime
     updated_at: datetime
+
+    @field_validator('tags', 'youtube_links', 'attached_files', 'gallery_images', mode='before')
+    @classmethod
+    def default_empty_lists(cls, v):
+        return v or []
     
     class Config:
         from_attributes = True
@@ -570,6 +621,14 @@ class NotificationResponse(NotificationBase):
     is_read: bool
     created_at: datetime
 
+    @field_validator('data', mode='before')
+    @classmethod
+    def encode_data(cls, v):
+        """Keep returning notification data as a JSON string"""
+        if v is None or isinstance(v, str):
+            return v
+        return json.dumps(v)
+
     @field_validator('created_at', mode='before')
     @classmethod
     def ensure_utc_datetime(cls, v):
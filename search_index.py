@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Full-text search for products and blog posts.
+
+SQLite uses FTS5 external-content tables kept in sync by triggers, MySQL uses
+FULLTEXT indexes and PostgreSQL uses GIN indexes over a tsvector expression.
+The SQLite tables are created at startup; the MySQL and PostgreSQL indexes
+are created by a migration (e3a1c7f5b209) and only checked here. Every
+backend supports ranked results and prefix matching; databases without
+full-text support, or without the migration, fall back to the previous
+ILIKE scan.
+"""
+
+import re
+import sys
+from typing import List, Optional, Tuple
+from sqlalchemy import Float, String, false, inspect, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+from logging_config import app_logger
+from database import engine
+
+# Searchable sources: table name and indexed columns, most important first
+SEARCH_SOURCES = {
+    "products": ["name", "short_description", "description"],
+    "blog_posts": ["title", "excerpt", "content"]
+}
+
+# Relative weight of each indexed column when ranking (SQLite bm25)
+COLUMN_WEIGHTS = [10.0, 4.0, 1.0]
+
+# Upper bound on the number of terms taken from a search string
+MAX_SEARCH_TERMS = 8
+
+def tokenize_search(term: str) -> List[str]:
+    """Split a user search string into index-friendly words"""
+    return re.findall(r"\w+", (term or "").lower())[:MAX_SEARCH_TERMS]
+
+class SearchIndex:
+    """Dialect-aware full-text index over the searchable tables"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.enabled = False
+
+    def setup(self):
+        """Create the SQLite full-text tables if missing, or check the migrated indexes"""
+        try:
+            with self.engine.begin() as conn:
+                existing_tables = set(inspect(conn).get_table_names())
+                for table, columns in SEARCH_SOURCES.items():
+                    if table not in existing_tables:
+                        continue
+                    if self.dialect == "sqlite":
+                        self._setup_sqlite(conn, table, columns)
+                    elif self.dialect in ("mysql", "postgresql"):
+                        # Created by the migration; workers racing to create
+                        # them at startup would fail
+                        index_name = f"ft_{table}_search" if self.dialect == "mysql" else f"ix_{table}_search"
+                        if not any(index["name"] == index_name for index in inspect(conn).get_indexes(table)):
+                            app_logger.warning(f"Full-text index {index_name} is missing (run the migrations), using ILIKE")
+                            return
+                    else:
+                        app_logger.warning(f"Full-text search is not supported on {self.dialect}, using ILIKE")
+                        return
+            self.enabled = True
+        except Exception as e:
+            app_logger.error(f"Failed to set up full-text search, using ILIKE: {e}")
+            self.enabled = False
+
+    def _setup_sqlite(self, conn, table: str, columns: List[str]):
+        fts_table = f"{table}_fts"
+        exists = conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": fts_table}
+        ).first()
+
+        column_list = ", ".join(columns)
+        new_values = ", ".join(f"new.{column}" for column in columns)
+        old_values = ", ".join(f"old.{column}" for column in columns)
+
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+            f"{column_list}, content='{table}', content_rowid='rowid', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.rowid, {new_values}); "
+            f"END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values}); "
+            f"END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {column_list} ON {table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values}); "
+            f"INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.rowid, {new_values}); "
+            f"END"
+        ))
+
+        if not exists:
+            # Index rows that were written before the triggers existed
+            conn.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+            app_logger.info(f"Built full-text index {fts_table}")
+
+    @staticmethod
+    def _pg_vector(columns: List[str]) -> str:
+        document = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+        return f"to_tsvector('simple', {document})"
+
+    def rebuild(self):
+        """Rebuild the SQLite indexes from their content tables"""
+        if self.dialect != "sqlite":
+            return
+        with self.engine.begin() as conn:
+            existing_tables = set(inspect(conn).get_table_names())
+            for table in SEARCH_SOURCES:
+                if table not in existing_tables:
+                    continue
+                conn.execute(text(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"))
+
+    def match(self, table: str, term: str):
+        """Return a subquery of ``(id, score)`` for rows matching every search word by prefix.
+
+        Higher scores are better matches. Returns None when the term has no
+        searchable words.
+        """
+        words = tokenize_search(term)
+        if not words:
+            return None
+        columns = SEARCH_SOURCES[table]
+
+        if self.dialect == "sqlite":
+            weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS[:len(columns)])
+            statement = text(
+                f"SELECT {table}.id AS id, -bm25({table}_fts, {weights}) AS score "
+                f"FROM {table}_fts JOIN {table} ON {table}.rowid = {table}_fts.rowid "
+                f"WHERE {table}_fts MATCH :query"
+            ).bindparams(query=" ".join(f'"{word}"*' for word in words))
+        elif self.dialect == "mysql":
+            match_expression = f"MATCH({', '.join(columns)}) AGAINST (:query IN BOOLEAN MODE)"
+            statement = text(
+                f"SELECT id, {match_expression} AS score FROM {table} WHERE {match_expression}"
+            ).bindparams(query=" ".join(f"+{word}*" for word in words))
+        else:
+            vector = self._pg_vector(columns)
+            statement = text(
+                f"SELECT id, ts_rank({vector}, to_tsquery('simple', :query)) AS score "
+                f"FROM {table} WHERE {vector} @@ to_tsquery('simple', :query)"
+            ).bindparams(query=" & ".join(f"{word}:*" for word in words))
+
+        return statement.columns(id=String, score=Float).subquery(f"{table}_search")
+
+    def apply(self, query: Query, model, term: str) -> Tuple[Query, Optional[object]]:
+        """Restrict an ORM query on ``model`` to rows matching ``term``.
+
+        Returns the filtered query and a score column usable for ordering, or
+        None for the score when falling back to ILIKE.
+        """
+        table = model.__tablename__
+        if self.enabled:
+            matches = self.match(table, term)
+            if matches is None:
+                # Nothing searchable (e.g. only punctuation) matches nothing
+                return query.filter(false()), None
+            query = query.join(matches, matches.c.id == model.id)
+            return query, matches.c.score
+
+        search_term = f"%{term}%"
+        return query.filter(
+            or_(*[getattr(model, column).ilike(search_term) for column in SEARCH_SOURCES[table]])
+        ), None
+
+# Create global search index instance
+search_index = SearchIndex(engine)
+
+if __name__ == "__main__":
+    search_index.setup()
+    if "--rebuild" in sys.argv:
+        search_index.rebuild()
+        print("✅ Search index rebuilt")
+    else:
+        print(f"✅ Search index ready ({search_index.dialect}, enabled={search_index.enabled})")
@@ -5,7 +5,6 @@ from sqlalchemy.orm import Session
 from database import engine, get_db
 from models_mysql import Base, User, Product
 from auth import get_password_hash
-import json
 import os
 
 # Create tables
@@ -70,9 +69,9 @@ def seed_database():
             "price": 299.99,
             "category": "trading-bot",
             "image": "/products/bot1.png",
-            "tags": json.dumps(["automation", "algorithmic", "professional"]),
-            "features": json.dumps(["Real-time monitoring", "Risk management", "Backtesting", "Multiple strategies"]),
-            "images": json.dumps(["/products/bot1.png", "/products/bot2.png"]),
+            "tags": ["automation", "algorithmic", "professional"],
+            "features": ["Real-time monitoring", "Risk management", "Backtesting", "Multiple strategies"],
+            "images": ["/products/bot1.png", "/products/bot2.png"],
             "rating": 0.0,
             "total_reviews": 0,
             "is_active": True,
@@ -92,9 +91,9 @@ def seed_database():
             "price": 149.99,
             "category": "indicator",
             "image": "/products/indicator1.png",
-            "tags": json.dumps(["technical analysis", "indicators", "professional"]),
-            "features": json.dumps(["50+ indicators", "Customizable", "Real-time alerts", "Documentation"]),
-            "images": json.dumps(["/products/indicator1.png", "/products/indicator2.png"]),
+            "tags": ["technical analysis", "indicators", "professional"],
+            "features": ["50+ indicators", "Customizable", "Real-time alerts", "Documentation"],
+            "images": ["/products/indicator1.png", "/products/indicator2.png"],
             "rating": 0.0,
             "total_reviews": 0,
             "is_active": True,
@@ -114,9 +113,9 @@ def seed_database():
             "price": 199.99,
             "category": "risk-management",
             "image": "/products/risk1.png",
-            "tags": json.dumps(["risk management", "portfolio", "protection"]),
-            "features": json.dumps(["Position sizing", "Stop-loss automation", "Portfolio monitoring", "Risk reports"]),
-            "images": json.dumps(["/products/risk1.png", "/products/risk2.png"]),
+            "tags": ["risk management", "portfolio", "protection"],
+            "features": ["Position sizing", "Stop-loss automation", "Portfolio monitoring", "Risk reports"],
+            "images": ["/products/risk1.png", "/products/risk2.png"],
             "rating": 0.0,
             "total_reviews": 0,
             "is_active": True,
@@ -148,9 +147,9 @@ def seed_database():
             "price": 79.99,
             "category": "education",
             "image": "/products/guide1.png",
-            "tags": json.dumps(["education", "strategy", "guide"]),
-            "features": json.dumps(["Step-by-step tutorials", "Case studies", "Video content", "Community access"]),
-            "images": json.dumps(["/products/guide1.png"]),
+            "tags": ["education", "strategy", "guide"],
+            "features": ["Step-by-step tutorials", "Case studies", "Video content", "Community access"],
+            "images": ["/products/guide1.png"],
             "rating": 0.0,
             "total_reviews": 0,
             "is_active": True,
@@ -170,9 +169,9 @@ def seed_database():
             "price": 399.99,
             "category": "analysis-tool",
             "image": "/products/analysis1.png",
-            "tags": json.dumps(["analysis", "professional", "software"]),
-            "features": json.dumps(["Real-time data", "Advanced charts", "News integration", "API access"]),
-            "images": json.dumps(["/products/analysis1.png"]),
+            "tags": ["analysis", "professional", "software"],
+            "features": ["Real-time data", "Advanced charts", "News integration", "API access"],
+            "images": ["/products/analysis1.png"],
             "rating": 0.0,
             "total_reviews": 0,
             "is_active": True,
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Tuple
+import redis
+from config import settings
+from logging_config import safe_log
+
+# Redis client for sharing flights between workers
+redis_client = None
+try:
+    redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+    redis_client.ping()
+except Exception:
+    redis_client = None
+
+# Deletes the lock only when this flight still holds it
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Paystack statuses that do not change any more
+TERMINAL_PAYMENT_STATUSES = ("success", "failed", "abandoned", "reversed")
+
+class SingleFlight:
+    """Runs one call per key at a time and shares its result.
+
+    Concurrent callers of a key in this worker await the call already in
+    flight. Across workers a Redis lock (``SET NX`` with a TTL) elects the
+    caller that runs; its value names the flight. The holder publishes
+    every result under a per-flight key for ``share_ttl_seconds``, which
+    the waiters of that flight poll, so pending results are shared too.
+    Waiters run the call themselves when the lock goes away without a
+    result or ``wait_seconds`` pass. Without Redis, or when it fails,
+    flights are only shared within the worker. Terminal results
+    (``is_terminal``) are also cached for ``result_ttl_seconds``, in Redis
+    and in the worker; results must be JSON-serialisable. The Redis client
+    is synchronous, so its commands run in a thread.
+    """
+
+    key_prefix = "jarvistrade:single_flight:"
+
+    def __init__(
+        self,
+        name: str,
+        redis_client,
+        is_terminal: Callable[[Any], bool],
+        lock_ttl_seconds: float,
+        result_ttl_seconds: float,
+        wait_seconds: float,
+        share_ttl_seconds: float = 5,
+        poll_interval_ms: int = 100
+    ):
+        self.name = name
+        self.redis = redis_client
+        self.is_terminal = is_terminal
+        self.lock_ttl = lock_ttl_seconds
+        self.result_ttl = result_ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.share_ttl = share_ttl_seconds
+        self.poll_interval = poll_interval_ms / 1000
+        self._lock = threading.Lock()
+        self._flights: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._results: Dict[str, Tuple[float, Any]] = {}
+        self._stats = {
+            "calls": 0, "executed": 0, "coalesced": 0, "cache_hits": 0,
+            "remote_hits": 0, "remote_waits": 0, "fallbacks": 0
+        }
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _cached(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.monotonic():
+                del self._results[key]
+                return False, None
+            return True, entry[1]
+
+    def _remember(self, key: str, result: Any):
+        now = time.monotonic()
+        with self._lock:
+            for stale in [k for k, (expires, _) in self._results.items() if expires <= now]:
+                del self._results[stale]
+            self._results[key] = (now + self.result_ttl, result)
+
+    async def run(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of ``call`` for ``key``, shared with concurrent callers of the same key"""
+        self._count("calls")
+        found, result = self._cached(key)
+        if found:
+            self._count("cache_hits")
+            return result
+
+        # The call runs in its own task, so a caller that goes away does not
+        # cancel it for the others; tasks belong to an event loop, and scripts
+        # and tests may use several
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            flight = loop.create_task(self._run_shared(key, call))
+            self._flights[flight_key] = flight
+            flight.add_done_callback(lambda task: self._landed(flight_key, task))
+        else:
+            self._count("coalesced")
+        return await asyncio.shield(flight)
+
+    def _landed(self, flight_key: Tuple[int, str], task: asyncio.Task):
+        self._flights.pop(flight_key, None)
+        if not task.cancelled():
+            task.exception()  # Retrieved here in case every caller went away
+
+    async def _redis(self, command: str, *args, **kwargs) -> Any:
+        return await asyncio.to_thread(getattr(self.redis, command), *args, **kwargs)
+
+    def _flight_key(self, key: str, token: str) -> str:
+        return f"{self.key_prefix}{self.name}:flight:{key}:{token}"
+
+    def _shared(self, key: str, value: str, stat: str) -> Any:
+        result = json.loads(value)
+        if self.is_terminal(result):
+            self._remember(key, result)
+        self._count(stat)
+        return result
+
+    async def _run_shared(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        if self.redis is None:
+            return await self._execute(key, call)
+
+        lock_key = f"{self.key_prefix}{self.name}:lock:{key}"
+        result_key = f"{self.key_prefix}{self.name}:result:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_seconds
+        holder = None
+        try:
+            while True:
+                cached = await self._redis("get", result_key)
+                if cached is not None:
+                    return self._shared(key, cached, "remote_hits")
+                if holder is not None:
+                    # The flight being waited on has landed
+                    shared = await self._redis("get", self._flight_key(key, holder))
+                    if shared is not None:
+                        return self._shared(key, shared, "remote_hits")
+                if await self._redis("set", lock_key, token, nx=True, px=int(self.lock_ttl * 1000)):
+                    break
+                if time.monotonic() >= deadline:
+                    # The holder is stuck or slow; verifying twice is safe
+                    self._count("fallbacks")
+                    return await self._execute(key, call)
+                current = await self._redis("get", lock_key)
+                if current is not None and current != holder:
+                    if holder is None:
+                        self._count("remote_waits")
+                    holder = current
+                await asyncio.sleep(self.poll_interval)
+        except redis.RedisError as e:
+            safe_log("app", "warning", f"Single flight {self.name} falling back to this worker for {key}: {e}")
+            self._count("fallbacks")
+            return await self._execute(key, call)
+
+        try:
+            result = await self._execute(key, call)
+            try:
+                value = json.dumps(result)
+                await self._redis("set", self._flight_key(key, token), value, px=int(self.share_ttl * 1000))
+                if self.is_terminal(result):
+                    await self._redis("set", result_key, value, px=int(self.result_ttl * 1000))
+            except (redis.RedisError, TypeError, ValueError) as e:
+                safe_log("app", "warning", f"Single flight {self.name} could not share the result for {key}: {e}")
+            return result
+        finally:
+            try:
+                await self._redis("eval", RELEASE_SCRIPT, 1, lock_key, token)
+            except redis.RedisError:
+                pass  # The lock expires after lock_ttl_seconds
+
+    async def _execute(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        self._count("executed")
+        result = await call()
+        if self.is_terminal(result):
+            self._remember(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls, executions and how the others were served, in this worker"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_results"] = len(self._results)
+            stats["in_flight"] = len(self._flights)
+        stats["shared"] = self.redis is not None
+        calls = stats["calls"]
+        stats["deduplicated_ratio"] = round(1 - stats["executed"] / calls, 3) if calls else None
+        return stats
+
+def is_terminal_verification(result: Dict[str, Any]) -> bool:
+    """Whether a ``PaymentService.verify_payment`` result can be reused"""
+    return bool(result.get("success")) and result.get("status") in TERMINAL_PAYMENT_STATUSES
+
+# Create global single flight instance for Paystack payment verifications
+payment_verifications = SingleFlight(
+    "payment_verify",
+    redis_client,
+    is_terminal=is_terminal_verification,
+    lock_ttl_seconds=settings.payment_verify_lock_ttl_seconds,
+    result_ttl_seconds=settings.payment_verify_result_ttl_seconds,
+    wait_seconds=settings.payment_verify_wait_seconds,
+    share_ttl_seconds=settings.payment_verify_share_ttl_seconds
+)
@@ -0,0 +1,102 @@
+from typing import Iterable, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models_mysql import BlogPost, BlogPostTag, Product, ProductTag
+from logging_config import app_logger
+
+# Longest tag stored in the tag tables (matches the column size)
+MAX_TAG_LENGTH = 100
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    """Strip, drop empty and duplicate tags while keeping their order"""
+    seen = []
+    for tag in tags or []:
+        if not isinstance(tag, str):
+            continue
+        tag = tag.strip()[:MAX_TAG_LENGTH]
+        if tag and tag not in seen:
+            seen.append(tag)
+    return seen
+
+class TagIndex:
+    """Keeps the blog_post_tags and product_tags tables in sync with the tag lists.
+
+    Tag rows carry a copy of their owner's created_at, so a tag page is an
+    index range scan on ``(tag, created_at)``.
+    """
+
+    def sync_post(self, db: Session, post: BlogPost):
+        """Replace the tag rows of a blog post. The caller commits."""
+        self.remove_post(db, post.id)
+        db.add_all(
+            BlogPostTag(post_id=post.id, tag=tag, created_at=post.created_at)
+            for tag in normalize_tags(post.tags)
+        )
+
+    def remove_post(self, db: Session, post_id: str):
+        db.query(BlogPostTag).filter(BlogPostTag.post_id == post_id).delete(synchronize_session=False)
+
+    def sync_product(self, db: Session, product: Product):
+        """Replace the tag rows of a product. The caller commits."""
+        self.remove_product(db, product.id)
+        db.add_all(
+            ProductTag(product_id=product.id, tag=tag, created_at=product.created_at)
+            for tag in normalize_tags(product.tags)
+        )
+
+    def remove_product(self, db: Session, product_id: str):
+        db.query(ProductTag).filter(ProductTag.product_id == product_id).delete(synchronize_session=False)
+
+    def blog_tag_counts(self, db: Session, status: Optional[str] = "published", limit: int = 100):
+        """Return ``(tag, count)`` pairs for blog posts, most used first"""
+        query = db.query(BlogPostTag.tag, func.count(BlogPostTag.post_id)).join(
+            BlogPost, BlogPost.id == BlogPostTag.post_id
+        )
+        if status:
+            query = query.filter(BlogPost.status == status)
+        return query.group_by(BlogPostTag.tag).order_by(
+            func.count(BlogPostTag.post_id).desc(), BlogPostTag.tag
+        ).limit(limit).all()
+
+    def product_tag_counts(self, db: Session, limit: int = 100):
+        """Return ``(tag, count)`` pairs for active products, most used first"""
+        return db.query(ProductTag.tag, func.count(ProductTag.product_id)).join(
+            Product, Product.id == ProductTag.product_id
+        ).filter(Product.is_active == True).group_by(ProductTag.tag).order_by(
+            func.count(ProductTag.product_id).desc(), ProductTag.tag
+        ).limit(limit).all()
+
+    def rebuild(self, db: Session):
+        """Rebuild both tag tables from the tag lists on posts and products"""
+        db.query(BlogPostTag).delete(synchronize_session=False)
+        db.query(ProductTag).delete(synchronize_session=False)
+        for post in db.query(BlogPost).all():
+            self.sync_post(db, post)
+        for product in db.query(Product).all():
+            self.sync_product(db, product)
+        db.commit()
+        app_logger.info("Rebuilt blog and product tag tables")
+
+    def setup(self, db: Session):
+        """Populate the tag tables on first run after they were created"""
+        try:
+            has_tags = db.query(BlogPostTag.post_id).first() or db.query(ProductTag.product_id).first()
+            has_tagged_rows = db.query(BlogPost.id).filter(BlogPost.tags != None).first() or \
+                db.query(Product.id).filter(Product.tags != None).first()
+            if not has_tags and has_tagged_rows:
+                self.rebuild(db)
+        except Exception as e:
+            db.rollback()
+            app_logger.error(f"Failed to populate tag tables: {e}")
+
+# Create global tag index instance
+tag_index = TagIndex()
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        tag_index.rebuild(db)
+        print("✅ Tag tables rebuilt")
+    finally:
+        db.close()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test script for the post-payment bundle build pipeline
+"""
+
+import os
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import BundleJob, DownloadToken
+from bundle_jobs import BundleJobs
+from bundle_store import BundleStore
+from zip_stream import ZipStream
+
+def make_session_factory(directory):
+    # A database file, so the build callback thread gets its own connection
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'jobs.db')}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine, tables=[DownloadToken.__table__, BundleJob.__table__])
+    session_factory = sessionmaker(bind=engine)
+    session = session_factory()
+    session.add(DownloadToken(id="t1", token="abc", user_id="u1", transaction_id="tx1"))
+    session.add(DownloadToken(id="t2", token="def", user_id="u2", transaction_id="tx2"))
+    session.commit()
+    session.close()
+    return session_factory
+
+def make_stream(content=b"x" * 4096):
+    stream = ZipStream()
+    stream.add_bytes("Bot/README.txt", b"Product: Bot")
+    stream.add_bytes("Bot/bot.ex5", content)
+    return stream
+
+def make_jobs(session_factory, directory, max_bytes=10 * 1024 * 1024):
+    store = BundleStore(os.path.join(directory, "bundles"), max_bytes=max_bytes, eviction_grace_seconds=0)
+    return BundleJobs(session_factory, store, max_workers=1, stale_seconds=900)
+
+def wait_for(session_factory, job_id, statuses=("ready", "failed")):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        session = session_factory()
+        job = session.get(BundleJob, job_id)
+        session.close()
+        if job.status in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"bundle job stuck in {job.status}")
+
+def test_build_activates_token():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        jobs = make_jobs(session_factory, directory)
+        session = session_factory()
+        try:
+            job = jobs.enqueue(session, "tx1", "t1", "bundle.zip", make_stream())
+            # The request returns before the build is done; nobody else can claim it meanwhile
+            assert not jobs.start(job.id, make_stream())
+
+            job = wait_for(session_factory, job.id)
+            assert job.status == "ready"
+            assert job.attempts == 1
+            session.expire_all()
+            token = session.get(DownloadToken, "t1")
+            assert token.file_path == job.file_path
+            assert os.path.getsize(job.file_path) == job.file_size
+            with zipfile.ZipFile(job.file_path) as zip_file:
+                assert zip_file.read("Bot/README.txt") == b"Product: Bot"
+        finally:
+            session.close()
+            jobs.shutdown()
+
+def test_stalled_job_is_resumed():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        jobs = make_jobs(session_factory, directory)
+        session = session_factory()
+        try:
+            # A worker died halfway through this build
+            job = BundleJob(
+                id="j1", transaction_id="tx1", download_token_id="t1", file_name="bundle.zip",
+                status="building", started_at=datetime.utcnow() - timedelta(hours=1), attempts=1
+            )
+            session.add(job)
+            session.commit()
+
+            requested = []
+            def bundle_factory(db, transaction_id, user_id):
+                requested.append((transaction_id, user_id))
+                return make_stream(), "bundle.zip"
+
+            assert jobs.resume_stalled(bundle_factory) == 1
+            assert requested == [("tx1", "u1")]
+            job = wait_for(session_factory, "j1")
+            assert job.status == "ready"
+            assert job.attempts == 2
+
+            # Finished jobs are left alone
+            assert jobs.resume_stalled(bundle_factory) == 0
+        finally:
+            session.close()
+            jobs.shutdown()
+
+def test_same_products_share_a_stored_bundle():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        jobs = make_jobs(session_factory, directory)
+        session = session_factory()
+        try:
+            file_path = os.path.join(directory, "bot.ex5")
+            with open(file_path, "wb") as f:
+                f.write(os.urandom(4096))
+
+            def make_file_stream():
+                stream = make_stream()
+                stream.add_file(file_path, "Bot/bot-file.ex5")
+                return stream
+
+            expected_key = jobs.store.bundle_key(make_file_stream())
+            # The files are hashed by the build worker, not by the request
+            def file_digest(path):
+                raise AssertionError("product files hashed on the request path")
+            jobs.store.file_digest = file_digest
+
+            first = wait_for(session_factory, jobs.enqueue(session, "tx1", "t1", "bundle.zip", make_file_stream()).id)
+            assert first.status == "ready"
+            assert os.path.basename(first.file_path) == expected_key + ".zip"
+
+            # Another customer buying the same products is served the stored file
+            second = wait_for(session_factory, jobs.enqueue(session, "tx2", "t2", "bundle.zip", make_file_stream()).id)
+            assert second.status == "ready"
+            assert second.file_path == first.file_path
+            session.expire_all()
+            assert session.get(DownloadToken, "t2").file_path == first.file_path
+            assert jobs.store.stats()["files"] == 1
+            assert jobs.store.hits == 1
+        finally:
+            session.close()
+            jobs.shutdown()
+
+def test_evicted_bundle_is_rebuilt():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        # Room for one bundle at a time
+        jobs = make_jobs(session_factory, directory, max_bytes=6000)
+        session = session_factory()
+        try:
+            first = wait_for(session_factory, jobs.enqueue(session, "tx1", "t1", "bundle.zip", make_stream(os.urandom(4096))).id)
+            stream = make_stream(os.urandom(4096))
+            second = wait_for(session_factory, jobs.enqueue(session, "tx2", "t2", "bundle.zip", stream).id)
+            assert os.path.exists(second.file_path)
+            assert not os.path.exists(first.file_path)
+            assert jobs.store.evictions == 1
+
+            # A download of the evicted bundle starts a new build of the same job
+            token = session.get(DownloadToken, "t1")
+            job = jobs.rebuild(session, token, session.get(BundleJob, first.id), lambda db, transaction_id, user_id: (make_stream(), "bundle.zip"))
+            assert job.id == first.id
+            assert job.status in ("building", "ready")
+            job = wait_for(session_factory, first.id)
+            assert job.status == "ready"
+            assert job.attempts == 2
+            session.expire_all()
+            assert os.path.exists(session.get(DownloadToken, "t1").file_path)
+        finally:
+            session.close()
+            jobs.shutdown()
+
+if __name__ == "__main__":
+    test_build_activates_token()
+    test_stalled_job_is_resumed()
+    test_same_products_share_a_stored_bundle()
+    test_evicted_bundle_is_rebuilt()
+    print("✅ Bundle job tests passed")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-process catalog cache and its invalidation
+"""
+
+import redis
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+import cache_versions as cache_versions_module
+from cache_versions import cache_versions
+from database import Base
+from models_mysql import Product
+from catalog_cache import CatalogCache
+
+class BrokenRedis:
+    """A Redis client whose every command fails"""
+
+    def __getattr__(self, command):
+        def fail(*args, **kwargs):
+            raise redis.ConnectionError("Connection refused")
+        return fail
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[Product.__table__])
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Product(id="p1", name="Bot", slug="bot", price=10.0, original_price=12.0),
+        Product(id="p2", name="Indicator", slug="indicator", price=20.0)
+    ])
+    session.commit()
+    statements.clear()
+    return session, statements
+
+def to_ngn(amount):
+    return amount * 1000
+
+def test_currencies_are_cached_separately():
+    session, statements = make_session()
+    with session:
+        cache = CatalogCache()
+        ngn = cache.get_rows(session, ["p1", "p2"], "NGN", to_ngn)
+        assert [(row["price"], row["currency"], row["currency_symbol"]) for row in ngn] == [(10000.0, "NGN", "₦"), (20000.0, "NGN", "₦")]
+        assert ngn[0]["original_price"] == 12000.0
+
+        # The USD rows were cached with them and were not converted in place
+        usd = cache.get_rows(session, ["p2", "p1"], "USD", to_ngn)
+        assert [(row["id"], row["price"], row["currency"]) for row in usd] == [("p2", 20.0, "USD"), ("p1", 10.0, "USD")]
+        assert cache.get_rows(session, ["p1"], "EUR", lambda amount: amount * 0.9)[0]["price"] == 9.0
+        assert len(statements) == 1
+
+def test_version_bump_invalidates_rows_and_listings():
+    session, statements = make_session()
+    with session:
+        cache = CatalogCache()
+        assert cache.get_rows(session, ["p1"], "NGN", to_ngn)[0]["price"] == 10000.0
+        assert cache.get_listing(("all",), lambda: ["p1", "p2"]) == ["p1", "p2"]
+
+        # A product write handled by another worker bumps the shared version
+        session.get(Product, "p1").price = 15.0
+        session.commit()
+        statements.clear()
+        cache_versions.bump("catalog")
+
+        assert cache.get_rows(session, ["p1"], "NGN", to_ngn)[0]["price"] == 15000.0
+        assert cache.get_listing(("all",), lambda: ["p2", "p1"]) == ["p2", "p1"]
+        assert len(statements) == 1
+
+        # New exchange rates drop the converted rows too
+        cache_versions.bump("exchange_rates")
+        assert cache.get_rows(session, ["p1"], "NGN", lambda amount: amount * 2000)[0]["price"] == 30000.0
+
+def test_local_versions_without_redis():
+    session, _ = make_session()
+    original_client = cache_versions_module.redis_client
+    try:
+        for name, client in [("Bot v2", None), ("Bot v3", BrokenRedis())]:
+            cache_versions_module.redis_client = client
+            reader, writer = CatalogCache(), CatalogCache()
+            cached = reader.get_rows(session, ["p1"], "USD", to_ngn)[0]["name"]
+
+            session.get(Product, "p1").name = name
+            session.commit()
+            assert reader.get_rows(session, ["p1"], "USD", to_ngn)[0]["name"] == cached
+            # The counters are local to the process, so its other caches see the write
+            writer.invalidate()
+            assert reader.get_rows(session, ["p1"], "USD", to_ngn)[0]["name"] == name
+            assert cache_versions.get_many(["catalog", "exchange_rates"]) == (
+                cache_versions.get("catalog"), cache_versions.get("exchange_rates")
+            )
+    finally:
+        cache_versions_module.redis_client = original_client
+        session.close()
+
+if __name__ == "__main__":
+    test_currencies_are_cached_separately()
+    test_version_bump_invalidates_rows_and_listings()
+    test_local_versions_without_redis()
+    print("✅ Catalog cache tests passed")
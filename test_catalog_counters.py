@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the maintained catalog counters behind X-Total-Count
+"""
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import CatalogCounter, Product
+from catalog_counters import CatalogCounters, product_state
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[Product.__table__, CatalogCounter.__table__])
+    session = sessionmaker(bind=engine)()
+    for i, (category, is_active) in enumerate([("indicator", True), ("indicator", False), ("trading-bot", True)]):
+        session.add(Product(id=f"p{i}", name=f"Product {i}", slug=f"product-{i}", category=category, is_active=is_active))
+    session.commit()
+    return session
+
+def test_reads_before_seeding_do_not_write():
+    session = make_session()
+    counters = CatalogCounters()
+    assert counters.get(session) == 2
+    assert counters.get(session, "indicator") == 1
+    assert counters.get(session, "education") == 0
+    assert session.query(CatalogCounter).count() == 0
+
+    counters.setup(session)
+    assert dict(session.query(CatalogCounter.scope, CatalogCounter.count).all()) == {
+        "all": 2, "category:indicator": 1, "category:trading-bot": 1
+    }
+    assert counters.get(session, "indicator") == 1
+
+def test_rebuild_and_new_categories_upsert():
+    session = make_session()
+    counters = CatalogCounters()
+    counters.rebuild(session)
+    # A second rebuild (e.g. another worker's) replaces the counts instead of colliding
+    session.add(CatalogCounter(scope="category:retired", count=4))
+    session.commit()
+    counters.rebuild(session)
+    assert counters.get(session) == 2
+    assert session.get(CatalogCounter, "category:retired") is None
+
+    # A category row created meanwhile by another worker is added to
+    session.add(CatalogCounter(scope="category:education", count=1))
+    session.commit()
+    counters._upsert(session, {"category:education": 1}, increment=True)
+    session.commit()
+    assert counters.get(session, "education") == 2
+
+def test_adjust_follows_product_writes():
+    session = make_session()
+    counters = CatalogCounters()
+    counters.rebuild(session)
+
+    product = session.get(Product, "p1")
+    before = product_state(product)
+    product.is_active = True
+    product.category = "education"
+    counters.adjust(session, before, product_state(product))
+    session.commit()
+    assert counters.get(session) == 3
+    assert counters.get(session, "indicator") == 1
+    assert counters.get(session, "education") == 1
+
+    counters.adjust(session, product_state(session.get(Product, "p0")), None)
+    session.delete(session.get(Product, "p0"))
+    session.commit()
+    assert counters.get(session) == 2
+    assert counters.get(session, "indicator") == 0
+
+if __name__ == "__main__":
+    test_reads_before_seeding_do_not_write()
+    test_rebuild_and_new_categories_upsert()
+    test_adjust_follows_product_writes()
+    print("✅ Catalog counter tests passed")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test script for the write-behind download event buffer
+"""
+
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import DownloadLog, DownloadToken, Product
+from download_events import DownloadEvents
+
+def make_session_factory(directory):
+    # A database file, so the flush thread gets its own connection
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'events.db')}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine, tables=[
+        Product.__table__, DownloadToken.__table__, DownloadLog.__table__
+    ])
+    session_factory = sessionmaker(bind=engine)
+    session = session_factory()
+    session.add(Product(id="p1", name="Bot", slug="bot", download_count=3))
+    session.add(DownloadToken(id="t1", token="abc", user_id="u1", product_id="p1", download_count=0))
+    session.commit()
+    session.close()
+    return session_factory
+
+def counts(session_factory):
+    session = session_factory()
+    try:
+        return (
+            session.query(Product.download_count).filter(Product.id == "p1").scalar(),
+            session.query(DownloadToken.download_count).filter(DownloadToken.id == "t1").scalar(),
+            session.query(DownloadLog).count()
+        )
+    finally:
+        session.close()
+
+def test_batches_until_flush():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        events = DownloadEvents(session_factory, flush_interval_ms=60000, max_events=1000)
+        for _ in range(5):
+            events.record("u1", product_id="p1", download_token_id="t1", count_product=True, count_token=True)
+        events.record("u1", product_id="p1", success=False, error_message="boom")
+
+        assert events.pending() == 6
+        assert counts(session_factory) == (3, 0, 0)
+        assert events.flush() == 6
+        assert counts(session_factory) == (8, 5, 6)
+        events.close()
+
+def test_flushes_when_full_and_on_close():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        events = DownloadEvents(session_factory, flush_interval_ms=60000, max_events=3)
+        for _ in range(3):
+            events.record("u1", product_id="p1", count_product=True)
+        deadline = time.monotonic() + 5
+        while counts(session_factory)[2] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert counts(session_factory) == (6, 0, 3)
+
+        events.record("u1", product_id="p1", count_product=True)
+        events.close()
+        assert counts(session_factory) == (7, 0, 4)
+
+def test_failed_flush_keeps_events():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        events = DownloadEvents(session_factory, flush_interval_ms=60000, max_events=1000)
+        events.record("u1", product_id="p1", count_product=True)
+
+        def broken():
+            raise RuntimeError("database unavailable")
+        events.session_factory = broken
+        assert events.flush() == 0
+        assert events.pending() == 1
+
+        events.session_factory = session_factory
+        events.close()
+        assert counts(session_factory) == (4, 0, 1)
+
+if __name__ == "__main__":
+    test_batches_until_flush()
+    test_flushes_when_full_and_on_close()
+    test_failed_flush_keeps_events()
+    print("✅ Download event buffer tests passed")
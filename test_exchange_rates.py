@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Test script for the exchange rate snapshot used by convert_currency
+"""
+
+from exchange_rates import ExchangeRateSnapshot
+
+def make_snapshot():
+    return ExchangeRateSnapshot({
+        ("USD", "NGN"): 1500.0,
+        ("EUR", "USD"): 1.25
+    })
+
+def test_direct_rate():
+    snapshot = make_snapshot()
+    assert snapshot.convert(10, "USD", "NGN") == 15000.0
+
+def test_reverse_rate():
+    snapshot = make_snapshot()
+    assert snapshot.convert(3000, "NGN", "USD") == 2.0
+    assert snapshot.convert(1.25, "USD", "EUR") == 1.0
+
+def test_unknown_pair_returns_amount():
+    snapshot = make_snapshot()
+    assert snapshot.convert(42, "USD", "GBP") == 42
+    assert snapshot.convert(42, "NGN", "NGN") == 42
+
+def test_convert_many_keeps_missing_values():
+    snapshot = make_snapshot()
+    assert snapshot.convert_many([1, None, 2], "USD", "NGN") == [1500.0, None, 3000.0]
+
+def test_base_rates():
+    snapshot = make_snapshot()
+    assert snapshot.base_rates("USD") == {"NGN": 1500.0}
+
+if __name__ == "__main__":
+    test_direct_rate()
+    test_reverse_rate()
+    test_unknown_pair_returns_amount()
+    test_convert_many_keeps_missing_values()
+    test_base_rates()
+    print("✅ Exchange rate snapshot tests passed")
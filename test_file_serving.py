@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for range requests and nginx offload on file-serving endpoints
+"""
+
+import asyncio
+import os
+import tempfile
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+import file_serving
+from file_serving import DownloadOffload, RangeFileResponse, serve_file, parse_range_header
+
+CONTENT = bytes(range(256)) * 40  # 10240 bytes
+
+def make_client(directory):
+    path = os.path.join(directory, "bot.ex5")
+    with open(path, "wb") as f:
+        f.write(CONTENT)
+    app = FastAPI()
+
+    @app.get("/file")
+    async def get_file(request: Request):
+        return serve_file(request, path, media_type="application/octet-stream", filename="bot.ex5")
+
+    return TestClient(app)
+
+def test_parse_range_header():
+    assert parse_range_header("bytes=0-99", 1000) == [(0, 99)]
+    assert parse_range_header("bytes=900-", 1000) == [(900, 999)]
+    assert parse_range_header("bytes=-100", 1000) == [(900, 999)]
+    assert parse_range_header("bytes=990-2000", 1000) == [(990, 999)]
+    assert parse_range_header("bytes=0-9, 5-20, 50-59", 1000) == [(0, 20), (50, 59)]
+    assert parse_range_header("bytes=2000-", 1000) == []
+    assert parse_range_header("bytes=9-1", 1000) is None
+    assert parse_range_header("items=0-9", 1000) is None
+    assert parse_range_header("bytes=" + ",".join(f"{i * 10}-{i * 10}" for i in range(20)), 1000) is None
+
+def test_full_and_single_range():
+    with tempfile.TemporaryDirectory() as directory:
+        client = make_client(directory)
+        full = client.get("/file")
+        assert full.status_code == 200
+        assert full.content == CONTENT
+        assert full.headers["accept-ranges"] == "bytes"
+        assert full.headers["etag"].startswith('"')
+        assert "bot.ex5" in full.headers["content-disposition"]
+
+        partial = client.get("/file", headers={"Range": "bytes=100-199"})
+        assert partial.status_code == 206
+        assert partial.content == CONTENT[100:200]
+        assert partial.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+        assert partial.headers["content-length"] == "100"
+
+        tail = client.get("/file", headers={"Range": "bytes=-10"})
+        assert tail.content == CONTENT[-10:]
+
+def test_multiple_ranges():
+    with tempfile.TemporaryDirectory() as directory:
+        client = make_client(directory)
+        response = client.get("/file", headers={"Range": "bytes=0-9,5000-5009"})
+        assert response.status_code == 206
+        content_type = response.headers["content-type"]
+        assert content_type.startswith("multipart/byteranges; boundary=")
+        boundary = content_type.split("boundary=")[1].encode()
+        assert int(response.headers["content-length"]) == len(response.content)
+
+        parts = response.content.split(b"--" + boundary)
+        assert parts[-1] == b"--\r\n"
+        bodies = [part.split(b"\r\n\r\n", 1) for part in parts[1:-1]]
+        assert b"Content-Range: bytes 0-9/10240" in bodies[0][0]
+        assert bodies[0][1] == CONTENT[0:10] + b"\r\n"
+        assert b"Content-Range: bytes 5000-5009/10240" in bodies[1][0]
+        assert bodies[1][1] == CONTENT[5000:5010] + b"\r\n"
+
+def test_if_range_and_unsatisfiable():
+    with tempfile.TemporaryDirectory() as directory:
+        client = make_client(directory)
+        etag = client.get("/file").headers["etag"]
+
+        resumed = client.get("/file", headers={"Range": "bytes=10-", "If-Range": etag})
+        assert resumed.status_code == 206
+        assert resumed.content == CONTENT[10:]
+
+        # A changed file is sent whole instead of being spliced
+        stale = client.get("/file", headers={"Range": "bytes=10-", "If-Range": '"stale"'})
+        assert stale.status_code == 200
+        assert stale.content == CONTENT
+
+        outside = client.get("/file", headers={"Range": "bytes=20000-"})
+        assert outside.status_code == 416
+        assert outside.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+def test_pathsend_when_server_supports_it():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bot.ex5")
+        with open(path, "wb") as f:
+            f.write(CONTENT)
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "GET", "headers": [], "extensions": {"http.response.pathsend": {}}}
+        asyncio.run(RangeFileResponse(path, stat_result=os.stat(path))(scope, receive, send))
+        assert [message["type"] for message in messages] == ["http.response.start", "http.response.pathsend"]
+        assert messages[1]["path"] == os.path.abspath(path)
+
+        # Ranges are still read and sent by the app
+        messages.clear()
+        asyncio.run(RangeFileResponse(path, stat_result=os.stat(path), ranges=[(0, 9)])(scope, receive, send))
+        assert b"".join(message.get("body", b"") for message in messages[1:]) == CONTENT[:10]
+
+def test_offload_to_nginx():
+    with tempfile.TemporaryDirectory() as directory:
+        client = make_client(directory)
+        offload = DownloadOffload.from_setting(True, f"{directory}=/_protected/files, ./other=/_protected/other/")
+        assert offload.internal_uri(os.path.join(directory, "sub", "My Bot.ex5")) == "/_protected/files/sub/My%20Bot.ex5"
+        assert offload.internal_uri(os.path.join(directory, "..", "secret")) is None
+        assert DownloadOffload.from_setting(False, f"{directory}=/_protected/files").internal_uri(directory + "/bot.ex5") is None
+
+        original = file_serving.download_offload
+        file_serving.download_offload = offload
+        try:
+            response = client.get("/file", headers={"Range": "bytes=0-9"})
+        finally:
+            file_serving.download_offload = original
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["x-accel-redirect"] == "/_protected/files/bot.ex5"
+        assert response.headers["content-disposition"] == 'attachment; filename="bot.ex5"'
+
+if __name__ == "__main__":
+    test_parse_range_header()
+    test_full_and_single_range()
+    test_multiple_ranges()
+    test_if_range_and_unsatisfiable()
+    test_pathsend_when_server_supports_it()
+    test_offload_to_nginx()
+    print("✅ File serving tests passed")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for ETag / If-None-Match handling on read endpoints
+"""
+
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from cache_versions import cache_versions
+from http_cache import CachePolicy, HTTPCache, _etag_matches
+
+POLICY = CachePolicy(("test_http_cache",), "public, max-age=60")
+http_cache = HTTPCache(window_seconds=300)
+
+app = FastAPI()
+
+@app.get("/items")
+async def get_items(request: Request, response: Response, currency: str = "USD"):
+    not_modified = http_cache.check(request, response, POLICY, currency)
+    if not_modified:
+        return not_modified
+    return {"items": [1, 2, 3]}
+
+client = TestClient(app)
+
+def test_etag_matching():
+    assert _etag_matches('"abc"', '"abc"')
+    assert _etag_matches('W/"abc"', '"abc"')
+    assert _etag_matches('"x", W/"abc"', 'W/"abc"')
+    assert _etag_matches("*", '"abc"')
+    assert not _etag_matches('"abd"', '"abc"')
+
+def test_not_modified_flow():
+    first = client.get("/items")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "public, max-age=60"
+
+    cached = client.get("/items", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+    # Another variant or an authenticated request gets its own validator
+    assert client.get("/items?currency=NGN").headers["etag"] != etag
+    private = client.get("/items", headers={"Authorization": "Bearer x"})
+    assert private.headers["cache-control"] == "private, no-cache"
+
+    cache_versions.bump("test_http_cache")
+    changed = client.get("/items", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+if __name__ == "__main__":
+    test_etag_matching()
+    test_not_modified_flow()
+    print("✅ HTTP cache tests passed")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Test script for the JSONType column used by list-valued model fields
+"""
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import Product
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[Product.__table__])
+    return sessionmaker(bind=engine)()
+
+def test_lists_round_trip():
+    session = make_session()
+    session.add(Product(id="p1", name="Bot", slug="bot", tags=["scalper", "gold"], images=[]))
+    session.commit()
+    session.expire_all()
+
+    product = session.get(Product, "p1")
+    assert product.tags == ["scalper", "gold"]
+    assert product.images == []
+    assert product.features is None
+    assert session.execute(text("SELECT tags FROM products")).scalar() == '["scalper", "gold"]'
+
+def test_legacy_text_is_decoded():
+    session = make_session()
+    session.execute(text(
+        "INSERT INTO products (id, name, slug, tags, features) "
+        "VALUES ('p2', 'Legacy', 'legacy', '[\"a\"]', 'not json')"
+    ))
+    session.commit()
+
+    product = session.get(Product, "p2")
+    assert product.tags == ["a"]
+    assert product.features is None
+
+if __name__ == "__main__":
+    test_lists_round_trip()
+    test_legacy_text_is_decoded()
+    print("✅ JSON column tests passed")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for the order item and license inserts of checkout and fulfillment
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import License, OrderItem, Product, Transaction, User
+from orders import cart_lines, grant_licenses, insert_order_items
+
+CART = [
+    {"id": "p1", "quantity": 1, "price": 10},
+    {"id": "p2", "quantity": 1, "price": 20, "is_rental": True, "rental_duration_days": 7},
+    {"id": "p1", "quantity": 2, "price": 10}
+]
+
+def make_session(directory):
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'orders.db')}")
+    Base.metadata.create_all(bind=engine, tables=[
+        User.__table__, Product.__table__, Transaction.__table__, OrderItem.__table__, License.__table__
+    ])
+    session = sessionmaker(bind=engine)()
+    session.add(User(id="u1", email="buyer@example.com", name="Buyer"))
+    session.add_all([Product(id="p1", name="Bot", slug="bot"), Product(id="p2", name="Indicator", slug="indicator")])
+    session.add(Transaction(id="t1", user_id="u1", paystack_reference="ref-1", amount=50, status="pending", purchased_items=CART))
+    session.commit()
+    return session
+
+def test_cart_lines_merge_repeated_products():
+    lines = cart_lines(CART)
+    assert [line["id"] for line in lines] == ["p1", "p2"]
+    assert lines[0]["quantity"] == 3
+    assert lines[1]["is_rental"] is True
+
+def test_inserts_are_idempotent():
+    with tempfile.TemporaryDirectory() as directory:
+        session = make_session(directory)
+        try:
+            assert insert_order_items(session, "t1", CART, existing=()) == 2
+            assert grant_licenses(session, "t1", "u1", CART) == 2
+            session.commit()
+
+            # A redelivered fulfillment adds nothing
+            assert insert_order_items(session, "t1", CART) == 0
+            assert grant_licenses(session, "t1", "u1", CART) == 0
+            session.commit()
+
+            items = {item.product_id: item for item in session.query(OrderItem).all()}
+            assert set(items) == {"p1", "p2"}
+            assert items["p1"].quantity == 3
+            assert items["p2"].rental_duration_days == 7
+
+            licenses = {license.product_id: license for license in session.query(License).all()}
+            assert set(licenses) == {"p1", "p2"}
+            assert licenses["p1"].expires_at is None
+            assert licenses["p1"].license_id.startswith("LIC-")
+            expires_in = licenses["p2"].expires_at - datetime.utcnow()
+            assert timedelta(days=6) < expires_in <= timedelta(days=7)
+        finally:
+            session.close()
+
+def test_unique_constraint_rejects_duplicates():
+    with tempfile.TemporaryDirectory() as directory:
+        session = make_session(directory)
+        try:
+            grant_licenses(session, "t1", "u1", CART, existing=())
+            session.commit()
+            try:
+                grant_licenses(session, "t1", "u1", CART, existing=())
+                session.commit()
+                assert False, "Duplicate licenses were inserted"
+            except IntegrityError:
+                session.rollback()
+            assert session.query(License).count() == 2
+        finally:
+            session.close()
+
+if __name__ == "__main__":
+    test_cart_lines_merge_repeated_products()
+    test_inserts_are_idempotent()
+    test_unique_constraint_rejects_duplicates()
+    print("✅ Order tests passed")
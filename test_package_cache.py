@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for the on-disk download package cache
+"""
+
+import fcntl
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from package_cache import STALE_BUILD_SECONDS, PackageCache, PackageSource
+
+def make_source(directory, name="bot.ex5", content=b"x" * 4096, version="1.0"):
+    file_path = os.path.join(directory, name)
+    with open(file_path, "wb") as f:
+        f.write(content)
+    return PackageSource("p1", version, "Bot", "Grid bot", "trading-bot", file_path)
+
+def test_builds_once_and_reuses():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PackageCache(os.path.join(directory, "cache"), max_bytes=10 * 1024 * 1024)
+        source = make_source(directory)
+        builds = []
+        original_build = cache._build
+        cache._build = lambda *args: builds.append(1) or original_build(*args)
+
+        paths = []
+        threads = [threading.Thread(target=lambda: paths.append(cache.get_package(source))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(builds) == 1
+        assert len(set(paths)) == 1
+        with zipfile.ZipFile(paths[0]) as zip_file:
+            assert zip_file.namelist() == ["bot.ex5", "README.txt"]
+            assert b"Product: Bot" in zip_file.read("README.txt")
+
+        # A new release gets its own package
+        assert cache.get_package(source._replace(version="1.1")) != paths[0]
+
+def test_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PackageCache(os.path.join(directory, "cache"), max_bytes=1, eviction_grace_seconds=0)
+        source = make_source(directory, content=os.urandom(2048))
+        first = cache.get_package(source)
+        second = cache.get_package(source._replace(version="2.0"))
+        assert os.path.exists(second)
+        assert not os.path.exists(first)
+        # Build locks are not removed by eviction
+        assert len([name for name in os.listdir(cache.directory) if name.endswith(".lock")]) == 2
+        assert cache._key_locks == {}
+
+def test_keeps_recently_used_files_and_sweeps_stale_locks():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PackageCache(os.path.join(directory, "cache"), max_bytes=1)
+        source = make_source(directory, content=os.urandom(2048))
+        first = cache.get_package(source)
+        second = cache.get_package(source._replace(version="2.0"))
+        # Served moments ago, so nginx may still be about to open it
+        assert os.path.exists(first) and os.path.exists(second)
+        assert cache.evictions == 0
+
+        stale = time.time() - STALE_BUILD_SECONDS - 60
+        locks = [os.path.join(cache.directory, name) for name in os.listdir(cache.directory) if name.endswith(".lock")]
+        held = open(locks[0], "a")
+        fcntl.flock(held, fcntl.LOCK_EX)
+        for path in locks + [first]:
+            os.utime(path, (stale, stale))
+        assert cache.evict() == 1
+        assert not os.path.exists(first)
+        # The held lock survives the sweep, the other one is removed
+        assert os.path.exists(locks[0]) and not os.path.exists(locks[1])
+        held.close()
+
+if __name__ == "__main__":
+    test_builds_once_and_reuses()
+    test_evicts_least_recently_used()
+    test_keeps_recently_used_files_and_sweeps_stale_locks()
+    print("✅ Package cache tests passed")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test script for keyset (cursor) pagination helpers
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import Product
+from pagination import SortKey, decode_cursor, encode_cursor, keyset_page
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[Product.__table__])
+    session = sessionmaker(bind=engine)()
+    now = datetime(2024, 1, 1)
+    for i in range(7):
+        session.add(Product(
+            id=f"p{i}",
+            name=f"Product {i}",
+            slug=f"product-{i}",
+            # Duplicate and missing prices exercise the id tiebreaker and the NULL handling
+            price=None if i in (3, 4) else float(i // 2),
+            created_at=now + timedelta(minutes=i)
+        ))
+    session.commit()
+    return session
+
+def walk(session, sort_key, sort_by, sort_order, limit):
+    ids, cursor = [], ""
+    while cursor is not None:
+        rows, cursor = keyset_page(session.query(Product), sort_key, Product.id, sort_by, sort_order, cursor, limit)
+        ids.extend(row.id for row in rows)
+    return ids
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30)
+    cursor = encode_cursor("created_at", "desc", created_at, "abc")
+    assert decode_cursor(cursor) == {"s": "created_at", "o": "desc", "v": created_at, "id": "abc"}
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor")
+    assert error.value.status_code == 400
+
+def test_walk_visits_every_row_in_order():
+    session = make_session()
+    products = session.query(Product).all()
+    for sort_key, sort_by in [(SortKey(Product.created_at), "created_at"), (SortKey(Product.price), "price")]:
+        for sort_order in ["asc", "desc"]:
+            expected = sorted(
+                products,
+                # NULLs sort as the lowest values
+                key=lambda product: (sort_key.value(product) is not None, sort_key.value(product) or 0, product.id),
+                reverse=sort_order == "desc"
+            )
+            # Every page size puts a cursor on a NULL price at some point
+            for limit in [1, 2, 3]:
+                assert walk(session, sort_key, sort_by, sort_order, limit) == [product.id for product in expected]
+
+def test_cursor_for_other_sort_is_rejected():
+    session = make_session()
+    _, cursor = keyset_page(session.query(Product), SortKey(Product.created_at), Product.id, "created_at", "desc", "", 2)
+    with pytest.raises(HTTPException):
+        keyset_page(session.query(Product), SortKey(Product.price), Product.id, "price", "desc", cursor, 2)
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_invalid_cursor_is_rejected()
+    test_walk_visits_every_row_in_order()
+    test_cursor_for_other_sort_is_rejected()
+    print("✅ Pagination tests passed")
@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 from datetime import datetime
 from database import SessionLocal
 from models_mysql import Product, User, Transaction
@@ -34,19 +35,14 @@ def test_payment_verification():
         # Test payment service
         payment_service = PaymentService()
         
-        # Test zip creation
+        # Test zip creation (the bundle the background build job writes)
         print("\nTesting zip file creation...")
-        zip_path = payment_service.create_product_zip(products, user)
-        
-        if zip_path and os.path.exists(zip_path):
+        with tempfile.TemporaryDirectory() as directory:
+            zip_path = os.path.join(directory, payment_service.bundle_filename(user))
+            payment_service.product_bundle(products).write_to(zip_path)
             print(f"✓ Zip file created successfully: {zip_path}")
             print(f"  File size: {os.path.getsize(zip_path)} bytes")
-            
-            # Clean up test zip file
-            os.remove(zip_path)
-            print("✓ Test zip file cleaned up")
-        else:
-            print("✗ Failed to create zip file")
+        print("✓ Test zip file cleaned up")
         
         # Test email service (without actually sending)
         print("\nTesting email service...")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled Paystack client, against a local Paystack stub
+"""
+
+import asyncio
+from aiohttp import web
+from paystack_client import PaystackClient, PaystackError
+
+async def start_stub(failures=0, delay=0.0):
+    """Stub of the Paystack endpoints; the first ``failures`` calls get a 503"""
+    state = {"calls": 0, "failures": failures, "connections": set(), "auth": None}
+
+    async def verify(request):
+        state["calls"] += 1
+        state["connections"].add(request.transport.get_extra_info("peername"))
+        state["auth"] = request.headers.get("Authorization")
+        await asyncio.sleep(delay)
+        if state["calls"] <= state["failures"]:
+            return web.json_response({"status": False, "message": "Service unavailable"}, status=503)
+        reference = request.match_info["reference"]
+        return web.json_response({"status": True, "data": {"reference": reference, "status": "success"}})
+
+    async def initialize(request):
+        state["calls"] += 1
+        payload = await request.json()
+        return web.json_response({"status": True, "data": {"reference": payload["reference"], "authorization_url": "https://checkout"}})
+
+    app = web.Application()
+    app.router.add_get("/transaction/verify/{reference}", verify)
+    app.router.add_post("/transaction/initialize", initialize)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", state
+
+def make_client(base_url, read_timeout=5.0, max_retries=2):
+    return PaystackClient(
+        secret_key="sk_test", base_url=base_url, connect_timeout=1, read_timeout=read_timeout,
+        max_connections=4, max_concurrency=2, max_retries=max_retries, retry_backoff_ms=10
+    )
+
+def test_reuses_pooled_connections():
+    async def run():
+        runner, base_url, state = await start_stub()
+        client = make_client(base_url)
+        try:
+            await client.start()
+            for i in range(5):
+                response = await client.verify_transaction(f"ref-{i}")
+                assert response.status == 200
+                assert response.data["data"]["reference"] == f"ref-{i}"
+            response = await client.initialize_transaction({"reference": "ref-new", "amount": 100})
+            assert response.data["data"]["authorization_url"] == "https://checkout"
+
+            # Sequential calls share one keep-alive connection
+            assert len(state["connections"]) == 1
+            assert state["auth"] == "Bearer sk_test"
+            stats = client.stats()
+            assert stats["verify"]["calls"] == 5
+            assert stats["initialize"]["calls"] == 1
+            assert stats["verify"]["latency_ms"]["p50"] is not None
+        finally:
+            await client.close()
+            await runner.cleanup()
+    asyncio.run(run())
+
+def test_retries_server_errors():
+    async def run():
+        runner, base_url, state = await start_stub(failures=2)
+        client = make_client(base_url)
+        try:
+            response = await client.verify_transaction("ref-1")
+            assert response.status == 200
+            assert state["calls"] == 3
+            assert client.stats()["verify"]["retries"] == 2
+            assert client.stats()["verify"]["errors"] == 2
+
+            # Once retries are used up the last 5xx is returned
+            state["calls"], state["failures"] = 0, 10
+            response = await client.verify_transaction("ref-2")
+            assert response.status == 503
+        finally:
+            await client.close()
+            await runner.cleanup()
+    asyncio.run(run())
+
+def test_times_out_slow_responses():
+    async def run():
+        runner, base_url, state = await start_stub(delay=1.0)
+        client = make_client(base_url, read_timeout=0.1, max_retries=1)
+        try:
+            try:
+                await client.verify_transaction("ref-1")
+                raise AssertionError("a slow Paystack response did not time out")
+            except PaystackError:
+                pass
+            # GETs are safe to repeat, so the timeout was retried once
+            assert client.stats()["verify"]["calls"] == 2
+        finally:
+            await client.close()
+            await runner.cleanup()
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_reuses_pooled_connections()
+    test_retries_server_errors()
+    test_times_out_slow_responses()
+    print("✅ Paystack client tests passed")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test script for single-pass product facet counts
+"""
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import Product
+from product_facets import compute_product_facets
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[Product.__table__])
+    session = sessionmaker(bind=engine)()
+    products = [
+        ("indicator", "MT4", 10.0, 4.5),
+        ("indicator", None, 30.0, 3.0),
+        ("trading-bot", "MT5", 300.0, 0.0),
+        ("trading-bot", "MT5", None, None)
+    ]
+    for i, (category, platform, price, rating) in enumerate(products):
+        session.add(Product(
+            id=f"p{i}", name=f"Product {i}", slug=f"product-{i}",
+            category=category, platform=platform, price=price, rating=rating
+        ))
+    session.commit()
+    return session
+
+def counts(buckets):
+    return {bucket["value"]: bucket["count"] for bucket in buckets}
+
+def test_facet_counts():
+    session = make_session()
+    facets = compute_product_facets(session.query(Product))
+    assert counts(facets["categories"])["indicator"] == 2
+    assert counts(facets["categories"])["education"] == 0
+    assert counts(facets["platforms"]) == {"MT4": 2, "MT5": 2, "TradingView": 0}
+    assert counts(facets["price_ranges"]) == {"0-25": 1, "25-50": 1, "50-100": 0, "100-250": 0, "250+": 1}
+    assert counts(facets["ratings"]) == {"4": 1, "3": 2, "2": 2, "1": 2}
+
+def test_facets_follow_query_filters():
+    session = make_session()
+    facets = compute_product_facets(session.query(Product).filter(Product.category == "trading-bot"))
+    assert counts(facets["categories"])["indicator"] == 0
+    assert counts(facets["platforms"])["MT5"] == 2
+
+if __name__ == "__main__":
+    test_facet_counts()
+    test_facets_follow_query_filters()
+    print("✅ Product facet tests passed")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for sparse product fieldsets in the catalog cache
+"""
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import Product
+from catalog_cache import CatalogCache, parse_product_fields
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[Product.__table__])
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    session = sessionmaker(bind=engine)()
+    session.add(Product(id="p1", name="Bot", slug="bot", description="long text", price=10.0, rating=4.5))
+    session.commit()
+    statements.clear()
+    return session, statements
+
+def test_parse_fields():
+    assert parse_product_fields(None) is None
+    assert parse_product_fields(" ") is None
+    assert parse_product_fields("price, name,price") == ("id", "name", "price")
+    try:
+        parse_product_fields("name,secret")
+        assert False, "unknown fields must be rejected"
+    except ValueError as e:
+        assert "secret" in str(e)
+
+def test_sparse_rows():
+    session, statements = make_session()
+    cache = CatalogCache()
+    fields = parse_product_fields("name,price,currency")
+
+    rows = cache.get_rows(session, ["p1"], "NGN", lambda amount: amount * 1000, fields)
+    assert rows == [{"id": "p1", "name": "Bot", "price": 10000.0, "currency": "NGN"}]
+    assert "description" not in statements[-1]
+
+    # Full rows serve later sparse requests without another query
+    full = cache.get_rows(session, ["p1"], "USD", lambda amount: amount)
+    assert full[0]["description"] == "long text"
+    statements.clear()
+    assert cache.get_rows(session, ["p1"], "USD", lambda amount: amount, ("id", "rating")) == [{"id": "p1", "rating": 4.5}]
+    assert statements == []
+
+if __name__ == "__main__":
+    test_parse_fields()
+    test_sparse_rows()
+    print("✅ Product field tests passed")
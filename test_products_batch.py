@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for the batch product lookup by ids and slugs
+"""
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import Product
+from catalog_cache import MAX_BATCH_PRODUCTS, CatalogCache, parse_batch_params, parse_product_fields
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[Product.__table__])
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Product(id="p1", name="Bot", slug="bot", description="long text", price=10.0),
+        Product(id="p2", name="Indicator", slug="indicator", price=20.0),
+        Product(id="p3", name="Script", slug="script", price=5.0)
+    ])
+    session.commit()
+    statements.clear()
+    return session, statements
+
+def get_batch(cache, session, ids, slugs, currency="USD", fields=None):
+    product_ids, product_slugs = parse_batch_params(ids, slugs)
+    return cache.get_batch(session, product_ids, product_slugs, currency, lambda amount: amount * 1000, fields)
+
+def test_parse_batch_params():
+    assert parse_batch_params(None, None) == ([], [])
+    assert parse_batch_params(" p1, ,p2,", "bot") == (["p1", "p2"], ["bot"])
+    half = ",".join(f"p{i}" for i in range(MAX_BATCH_PRODUCTS // 2))
+    assert len(parse_batch_params(half, half)[0]) == MAX_BATCH_PRODUCTS // 2
+    try:
+        parse_batch_params(half, half + ",one-more")
+        assert False, "oversized batches must be rejected"
+    except ValueError as e:
+        assert str(MAX_BATCH_PRODUCTS) in str(e)
+
+def test_ids_and_slugs_in_request_order():
+    session, statements = make_session()
+    with session:
+        cache = CatalogCache()
+        batch = get_batch(cache, session, "p3,p1", "indicator,bot")
+        # Ids first, then slugs, each in the order asked for
+        assert [item["id"] for item in batch["items"]] == ["p3", "p1", "p2", "p1"]
+        assert batch["missing_ids"] == [] and batch["missing_slugs"] == []
+        # One slug query and one IN query for all the rows
+        assert len(statements) == 2
+
+def test_duplicates_and_missing_products():
+    session, _ = make_session()
+    with session:
+        batch = get_batch(CatalogCache(), session, "p1,gone,p1,gone", "nope,bot,nope")
+        assert [item and item["id"] for item in batch["items"]] == ["p1", None, "p1", None, None, "p1", None]
+        # Listed once each
+        assert batch["missing_ids"] == ["gone"]
+        assert batch["missing_slugs"] == ["nope"]
+
+def test_sparse_fields_and_currency():
+    session, statements = make_session()
+    with session:
+        cache = CatalogCache()
+        batch = get_batch(cache, session, "p1", "indicator", currency="NGN", fields=parse_product_fields("price"))
+        assert batch["items"] == [{"id": "p1", "price": 10000.0}, {"id": "p2", "price": 20000.0}]
+        assert "description" not in statements[-1]
+
+        # Rows come from the cache afterwards; only the slugs are looked up
+        statements.clear()
+        assert get_batch(cache, session, "p1", "indicator", currency="NGN", fields=parse_product_fields("price")) == batch
+        assert len(statements) == 1
+
+if __name__ == "__main__":
+    test_parse_batch_params()
+    test_ids_and_slugs_in_request_order()
+    test_duplicates_and_missing_products()
+    test_sparse_fields_and_currency()
+    print("✅ Batch product lookup tests passed")
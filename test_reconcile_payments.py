@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for the pending payment reconciler
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import Transaction, User
+from reconcile_payments import PaymentReconciler
+
+class FakePaymentService:
+    """Paystack outcomes by reference; fulfillment only records the reference"""
+
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fulfilled = []
+
+    async def verify_payment(self, reference):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        status = self.outcomes.get(reference)
+        if status is None:
+            return {"success": False, "error": "Paystack API error: 400", "status": "failed"}
+        return {"success": True, "status": status, "data": {"reference": reference, "status": status}}
+
+    def process_successful_payment(self, db, reference, user):
+        transaction = db.query(Transaction).filter(Transaction.paystack_reference == reference).first()
+        transaction.status = "success"
+        db.commit()
+        self.fulfilled.append(reference)
+        return {"success": True, "message": "Payment processed successfully"}
+
+def make_session_factory(directory):
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'reconcile.db')}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine, tables=[User.__table__, Transaction.__table__])
+    return sessionmaker(bind=engine)
+
+def add_transactions(session_factory, count, status="pending", age=timedelta(hours=1), prefix="ref"):
+    session = session_factory()
+    if session.get(User, "u1") is None:
+        session.add(User(id="u1", email="buyer@example.com", name="Buyer"))
+    created_at = datetime.utcnow() - age
+    for i in range(count):
+        session.add(Transaction(user_id="u1", paystack_reference=f"{prefix}-{i}", amount=10, status=status, created_at=created_at))
+    session.commit()
+    session.close()
+
+def statuses(session_factory):
+    session = session_factory()
+    try:
+        return dict(session.query(Transaction.paystack_reference, Transaction.status).all())
+    finally:
+        session.close()
+
+def make_reconciler(session_factory, service, concurrency=4, batch_size=7):
+    return PaymentReconciler(
+        session_factory, service, concurrency=concurrency, batch_size=batch_size,
+        min_age_minutes=15, max_age_days=7
+    )
+
+def test_applies_paystack_outcomes():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        add_transactions(session_factory, 30)
+        outcomes = {f"ref-{i}": ["success", "failed", "abandoned", "ongoing"][i % 4] for i in range(29)}
+        service = FakePaymentService(outcomes)
+
+        stats = asyncio.run(make_reconciler(session_factory, service).run())
+
+        assert stats["scanned"] == 30
+        assert stats["success"] == 8
+        assert stats["failed"] == 7
+        assert stats["abandoned"] == 7
+        assert stats["unchanged"] == 7
+        # Paystack errors leave the row for the next run
+        assert stats["errors"] == 1
+        assert 1 < service.max_in_flight <= 4
+        result = statuses(session_factory)
+        assert result["ref-0"] == "success" and result["ref-1"] == "failed"
+        assert result["ref-2"] == "abandoned" and result["ref-3"] == "pending"
+        assert result["ref-29"] == "pending"
+
+def test_skips_recent_old_and_settled_transactions():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        add_transactions(session_factory, 2, age=timedelta(minutes=1), prefix="new")
+        add_transactions(session_factory, 2, age=timedelta(days=30), prefix="old")
+        add_transactions(session_factory, 2, status="success", prefix="paid")
+        add_transactions(session_factory, 3, status="abandoned", prefix="left")
+        service = FakePaymentService({"left-0": "success", "left-1": "abandoned", "left-2": "failed"})
+
+        stats = asyncio.run(make_reconciler(session_factory, service).run())
+
+        assert stats["scanned"] == 3
+        assert service.fulfilled == ["left-0"]
+        assert statuses(session_factory)["left-2"] == "failed"
+
+def test_limit_and_dry_run():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        add_transactions(session_factory, 20)
+        service = FakePaymentService({f"ref-{i}": "failed" for i in range(20)})
+
+        stats = asyncio.run(make_reconciler(session_factory, service).run(limit=10, dry_run=True))
+
+        assert stats["scanned"] == 10
+        assert stats["failed"] == 10
+        assert set(statuses(session_factory).values()) == {"pending"}
+
+def test_failed_scan_leaves_no_tasks_behind():
+    with tempfile.TemporaryDirectory() as directory:
+        reconciler = make_reconciler(make_session_factory(directory), FakePaymentService({}))
+
+        def broken_scan(*args):
+            raise RuntimeError("database is gone")
+        reconciler._scan_page = broken_scan
+
+        async def scenario():
+            try:
+                await reconciler.run()
+                assert False, "the scan error must propagate"
+            except RuntimeError:
+                pass
+            await asyncio.sleep(0)
+            return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+        assert asyncio.run(scenario()) == []
+
+if __name__ == "__main__":
+    test_applies_paystack_outcomes()
+    test_skips_recent_old_and_settled_transactions()
+    test_limit_and_dry_run()
+    test_failed_scan_leaves_no_tasks_behind()
+    print("✅ Payment reconciler tests passed")
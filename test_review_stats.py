@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the maintained product rating aggregates
+"""
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import Product, ProductRatingStats, Review
+from review_stats import ReviewStats, review_state
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[
+        Product.__table__, Review.__table__, ProductRatingStats.__table__
+    ])
+    session = sessionmaker(bind=engine)()
+    session.add(Product(id="p1", name="Bot", slug="bot", rating=0.0, total_reviews=0))
+    session.commit()
+    return session
+
+def add_review(session, stats, review_id, rating, is_approved=True):
+    review = Review(id=review_id, user_id="u1", product_id="p1", rating=rating, comment="x", is_approved=is_approved)
+    session.add(review)
+    session.flush()
+    stats.adjust(session, "p1", None, review_state(review))
+    session.commit()
+    return review
+
+def test_incremental_aggregates():
+    with make_session() as session:
+        stats = ReviewStats()
+        add_review(session, stats, "r1", 5)
+        add_review(session, stats, "r2", 4)
+        hidden = add_review(session, stats, "r3", 1, is_approved=False)
+
+        summary = stats.summary(session, "p1")
+        assert summary["total_reviews"] == 2
+        assert summary["average_rating"] == 4.5
+        assert summary["histogram"] == {1: 0, 2: 0, 3: 0, 4: 1, 5: 1}
+
+        # Approving a review counts it; deleting one removes it
+        before = review_state(hidden)
+        hidden.is_approved = True
+        session.flush()
+        stats.adjust(session, "p1", before, review_state(hidden))
+        review = session.get(Review, "r1")
+        before = review_state(review)
+        session.delete(review)
+        session.flush()
+        stats.adjust(session, "p1", before, None)
+        session.commit()
+
+        product = session.get(Product, "p1")
+        session.refresh(product)
+        assert (product.rating, product.total_reviews) == (2.5, 2)
+        assert stats.summary(session, "p1")["histogram"] == {1: 1, 2: 0, 3: 0, 4: 1, 5: 0}
+
+def test_rebuild_matches_incremental():
+    with make_session() as session:
+        stats = ReviewStats()
+        session.add_all([
+            Review(id="r1", user_id="u1", product_id="p1", rating=3, comment="x", is_approved=True),
+            Review(id="r2", user_id="u2", product_id="p1", rating=4, comment="x", is_approved=True)
+        ])
+        session.commit()
+
+        # Reviews written before the aggregates existed are summarized without writing
+        assert stats.summary(session, "p1")["average_rating"] == 3.5
+        assert session.get(ProductRatingStats, "p1") is None
+        assert stats.rebuild(session) == 1
+        row = session.get(ProductRatingStats, "p1")
+        assert (row.rating_sum, row.rating_count, row.stars_3, row.stars_4) == (7, 2, 1, 1)
+
+def test_first_reviews_upsert_the_aggregates():
+    with make_session() as session:
+        stats = ReviewStats()
+        session.add(Review(id="r1", user_id="u1", product_id="p1", rating=5, comment="x", is_approved=True))
+        session.flush()
+        # Another worker stored the aggregates of its first review in the meantime
+        session.add(ProductRatingStats(product_id="p1", rating_sum=4, rating_count=1, stars_4=1))
+        session.flush()
+        session.add(Review(id="r2", user_id="u2", product_id="p1", rating=4, comment="x", is_approved=True))
+        session.flush()
+        stats.rebuild_product(session, "p1")
+        session.commit()
+
+        session.expire_all()
+        row = session.get(ProductRatingStats, "p1")
+        assert (row.rating_sum, row.rating_count, row.stars_4, row.stars_5) == (9, 2, 1, 1)
+        assert session.get(Product, "p1").rating == 4.5
+
+if __name__ == "__main__":
+    test_incremental_aggregates()
+    test_rebuild_matches_incremental()
+    test_first_reviews_upsert_the_aggregates()
+    print("✅ Review stats tests passed")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for the full-text product and blog search
+"""
+
+import os
+import tempfile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import BlogPost, Product
+from search_index import SearchIndex, tokenize_search
+
+def make_index(directory):
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'search.db')}")
+    Base.metadata.create_all(bind=engine, tables=[Product.__table__, BlogPost.__table__])
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Product(id="p1", name="Gold Scalper", slug="gold-scalper", short_description="Fast entries", description="Trades XAUUSD"),
+        Product(id="p2", name="Grid Bot", slug="grid-bot", short_description="Grid trading", description="Works well on gold"),
+        Product(id="p3", name="Trend Indicator", slug="trend-indicator", short_description="Signals", description="Moving averages")
+    ])
+    session.commit()
+    index = SearchIndex(engine)
+    # Rows written before setup are indexed by it
+    index.setup()
+    assert index.enabled
+    return index, session
+
+def search(index, session, model, term):
+    query, score = index.apply(session.query(model), model, term)
+    if score is not None:
+        query = query.order_by(score.desc())
+    return [row.id for row in query.all()]
+
+def test_tokenize_search():
+    assert tokenize_search("Gold-Scalper  EA!") == ["gold", "scalper", "ea"]
+    assert tokenize_search("---") == []
+    assert tokenize_search(None) == []
+
+def test_ranking_and_prefix_matching():
+    with tempfile.TemporaryDirectory() as directory:
+        index, session = make_index(directory)
+        try:
+            # A name match ranks above a description match
+            assert search(index, session, Product, "gold") == ["p1", "p2"]
+            assert search(index, session, Product, "indic") == ["p3"]
+            # Every word has to match
+            assert search(index, session, Product, "grid gold") == ["p2"]
+            assert search(index, session, Product, "grid trend") == []
+        finally:
+            session.close()
+
+def test_index_follows_writes():
+    with tempfile.TemporaryDirectory() as directory:
+        index, session = make_index(directory)
+        try:
+            session.get(Product, "p3").name = "Momentum Oscillator"
+            session.add(BlogPost(id="b1", title="Scalping gold", slug="scalping-gold", content="How to scalp", excerpt="Tips", author_id="u1"))
+            session.delete(session.get(Product, "p2"))
+            session.commit()
+
+            assert search(index, session, Product, "trend") == []
+            assert search(index, session, Product, "oscill") == ["p3"]
+            assert search(index, session, Product, "grid") == []
+            assert search(index, session, BlogPost, "scalp") == ["b1"]
+        finally:
+            session.close()
+
+def test_search_without_words_matches_nothing():
+    with tempfile.TemporaryDirectory() as directory:
+        index, session = make_index(directory)
+        try:
+            assert search(index, session, Product, "---") == []
+            assert search(index, session, Product, "%") == []
+            assert search(index, session, BlogPost, "   ") == []
+        finally:
+            session.close()
+
+if __name__ == "__main__":
+    test_tokenize_search()
+    test_ranking_and_prefix_matching()
+    test_index_follows_writes()
+    test_search_without_words_matches_nothing()
+    print("✅ Search index tests passed")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for the single flight of payment verifications
+"""
+
+import asyncio
+import time
+import redis
+from single_flight import SingleFlight, is_terminal_verification
+
+class FakeRedis:
+    """The commands SingleFlight uses, in memory; ``down`` makes every command fail"""
+
+    def __init__(self):
+        self.values = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise redis.ConnectionError("Connection refused")
+
+    def get(self, key):
+        self._check()
+        value, expires = self.values.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+    def set(self, key, value, nx=False, px=None):
+        self._check()
+        if nx and self.get(key) is not None:
+            return None
+        self.values[key] = (value, time.monotonic() + px / 1000 if px else None)
+        return True
+
+    def eval(self, script, numkeys, key, token):
+        self._check()
+        if self.get(key) == token:
+            del self.values[key]
+            return 1
+        return 0
+
+class FakePaystack:
+    def __init__(self, status="success", delay=0.05):
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+
+    async def verify(self, reference):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"success": True, "status": self.status, "reference": reference}
+
+def make_flight(redis_client=None, result_ttl_seconds=60, wait_seconds=5):
+    return SingleFlight(
+        "test", redis_client, is_terminal=is_terminal_verification,
+        lock_ttl_seconds=5, result_ttl_seconds=result_ttl_seconds, wait_seconds=wait_seconds, poll_interval_ms=10
+    )
+
+def test_concurrent_callers_share_one_call():
+    flight, paystack = make_flight(), FakePaystack()
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.run("ref-1", lambda: paystack.verify("ref-1")) for _ in range(10)))
+        # The final status is reused afterwards
+        results.append(await flight.run("ref-1", lambda: paystack.verify("ref-1")))
+        return results
+
+    results = asyncio.run(scenario())
+    assert paystack.calls == 1
+    assert all(result["status"] == "success" for result in results)
+    stats = flight.stats()
+    assert stats["executed"] == 1 and stats["coalesced"] == 9 and stats["cache_hits"] == 1
+
+def test_pending_results_and_errors_are_not_cached():
+    flight, paystack = make_flight(), FakePaystack(status="ongoing", delay=0)
+
+    async def scenario():
+        await flight.run("ref-1", lambda: paystack.verify("ref-1"))
+        await flight.run("ref-1", lambda: paystack.verify("ref-1"))
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        return await asyncio.gather(*(flight.run("ref-2", fail) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert paystack.calls == 2
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert flight.stats()["executed"] == 3
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight, paystack = make_flight(), FakePaystack(delay=0.1)
+
+    async def scenario():
+        first = asyncio.create_task(flight.run("ref-1", lambda: paystack.verify("ref-1")))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(flight.run("ref-1", lambda: paystack.verify("ref-1")))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario())["status"] == "success"
+    assert paystack.calls == 1
+
+def test_workers_share_verifications_through_redis():
+    shared = FakeRedis()
+    worker_a, worker_b = make_flight(shared), make_flight(shared)
+    paystack = FakePaystack(delay=0.1)
+
+    async def scenario():
+        first = asyncio.create_task(worker_a.run("ref-1", lambda: paystack.verify("ref-1")))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(first, worker_b.run("ref-1", lambda: paystack.verify("ref-1")))
+
+    results = asyncio.run(scenario())
+    assert paystack.calls == 1
+    assert results[0] == results[1]
+    assert worker_b.stats()["remote_waits"] == 1 and worker_b.stats()["remote_hits"] == 1
+    # The lock was released
+    assert all(":lock:" not in key for key in shared.values)
+
+def test_workers_share_pending_results_through_redis():
+    shared = FakeRedis()
+    worker_a, worker_b = make_flight(shared), make_flight(shared)
+    paystack = FakePaystack(status="ongoing", delay=0.1)
+
+    async def scenario():
+        first = asyncio.create_task(worker_a.run("ref-1", lambda: paystack.verify("ref-1")))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(first, worker_b.run("ref-1", lambda: paystack.verify("ref-1")))
+
+    results = asyncio.run(scenario())
+    # The waiting worker got the pending status instead of verifying after the holder
+    assert paystack.calls == 1
+    assert results[0] == results[1] and results[0]["status"] == "ongoing"
+    assert worker_b.stats()["remote_hits"] == 1
+    # Only handed to the waiters of that flight, not cached
+    assert [key for key in shared.values if ":flight:ref-1:" in key]
+    assert all(":result:" not in key for key in shared.values)
+
+def test_falls_back_to_the_worker_without_redis():
+    shared = FakeRedis()
+    shared.down = True
+    flight, paystack = make_flight(shared), FakePaystack(delay=0.01)
+
+    async def scenario():
+        return await asyncio.gather(*(flight.run("ref-1", lambda: paystack.verify("ref-1")) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert paystack.calls == 1
+    assert all(result["status"] == "success" for result in results)
+    assert flight.stats()["fallbacks"] == 1
+
+if __name__ == "__main__":
+    test_concurrent_callers_share_one_call()
+    test_pending_results_and_errors_are_not_cached()
+    test_cancelled_caller_does_not_cancel_the_others()
+    test_workers_share_verifications_through_redis()
+    test_workers_share_pending_results_through_redis()
+    test_falls_back_to_the_worker_without_redis()
+    print("✅ Single flight tests passed")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script for the normalized blog and product tag tables
+"""
+
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import BlogPost, BlogPostTag, Product, ProductTag
+from tag_index import TagIndex, normalize_tags
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[
+        BlogPost.__table__, BlogPostTag.__table__, Product.__table__, ProductTag.__table__
+    ])
+    return sessionmaker(bind=engine)()
+
+def test_normalize_tags():
+    assert normalize_tags([" MT4 ", "MT4", "", None, "grid"]) == ["MT4", "grid"]
+    assert normalize_tags(None) == []
+
+def test_sync_and_counts():
+    session = make_session()
+    index = TagIndex()
+    post = BlogPost(id="b1", title="Post", slug="post", content="c", excerpt="e", author_id="u1",
+                    status="published", tags=["news", "gold"], created_at=datetime(2024, 1, 1))
+    draft = BlogPost(id="b2", title="Draft", slug="draft", content="c", excerpt="e", author_id="u1",
+                     status="draft", tags=["gold"], created_at=datetime(2024, 1, 2))
+    session.add_all([post, draft])
+    session.flush()
+    index.sync_post(session, post)
+    index.sync_post(session, draft)
+    session.commit()
+    assert index.blog_tag_counts(session) == [("gold", 1), ("news", 1)]
+    assert index.blog_tag_counts(session, status=None) == [("gold", 2), ("news", 1)]
+
+    post.tags = ["news"]
+    index.sync_post(session, post)
+    session.commit()
+    rows = session.query(BlogPostTag.tag, BlogPostTag.created_at).filter(BlogPostTag.post_id == "b1").all()
+    assert rows == [("news", datetime(2024, 1, 1))]
+
+    product = Product(id="p1", name="Bot", slug="bot", tags=["grid", "grid"], is_active=True)
+    session.add(product)
+    session.flush()
+    index.sync_product(session, product)
+    session.commit()
+    assert index.product_tag_counts(session) == [("grid", 1)]
+
+    index.remove_product(session, "p1")
+    session.commit()
+    assert index.product_tag_counts(session) == []
+
+if __name__ == "__main__":
+    test_normalize_tags()
+    test_sync_and_counts()
+    print("✅ Tag index tests passed")
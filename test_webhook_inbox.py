@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script for the webhook inbox and its consumer
+"""
+
+import json
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models_mysql import WebhookEvent
+from webhook_inbox import WebhookInbox
+
+def make_session_factory(directory):
+    # A database file, so the consumer thread gets its own connection
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'inbox.db')}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine, tables=[WebhookEvent.__table__])
+    return sessionmaker(bind=engine)
+
+def body(event, event_id, reference):
+    return json.dumps({"event": event, "data": {"id": event_id, "reference": reference}}).encode()
+
+def make_inbox(session_factory, handler, max_attempts=3):
+    return WebhookInbox(
+        session_factory, handler, poll_interval_ms=20, max_attempts=max_attempts,
+        retry_backoff_seconds=0, stale_seconds=300
+    )
+
+def test_redeliveries_are_stored_once():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        inbox = make_inbox(session_factory, lambda db, event, data: "ok")
+        inbox.notify = lambda: None
+        session = session_factory()
+        try:
+            event, created = inbox.receive(session, body("charge.success", 1, "r1"))
+            assert created
+            assert event.reference == "r1"
+            again, created = inbox.receive(session, body("charge.success", 1, "r1"))
+            assert not created
+            assert again.id == event.id
+            assert session.query(WebhookEvent).count() == 1
+        finally:
+            session.close()
+
+def test_events_of_a_reference_run_in_order():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        applied = []
+        failures = {"charge.failed:1": 1}
+
+        def handler(db, event, data):
+            key = f"{event}:{data['id']}"
+            if failures.get(key):
+                failures[key] -= 1
+                raise RuntimeError("database busy")
+            applied.append(key)
+            return "ok"
+
+        inbox = make_inbox(session_factory, handler)
+        inbox.notify = lambda: None
+        session = session_factory()
+        try:
+            inbox.receive(session, body("charge.failed", 1, "r1"))
+            inbox.receive(session, body("charge.success", 2, "r1"))
+            inbox.receive(session, body("charge.success", 3, "r2"))
+
+            # The first event of r1 fails, so the second waits; r2 is not held up
+            assert inbox.process_pending() == 2
+            assert applied == ["charge.success:3"]
+            assert inbox.process_pending() == 1
+            assert inbox.process_pending() == 1
+            assert applied == ["charge.success:3", "charge.failed:1", "charge.success:2"]
+
+            stats = inbox.stats()
+            assert stats["done"] == 3
+            assert stats["pending"] == 0
+            assert stats["lag_seconds"] == 0
+            assert stats["retried_events"] == 1
+            assert stats["retries"] == 1
+        finally:
+            session.close()
+
+def test_gives_up_after_max_attempts():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+
+        def handler(db, event, data):
+            raise RuntimeError("products not found")
+
+        inbox = make_inbox(session_factory, handler, max_attempts=2)
+        inbox.notify = lambda: None
+        session = session_factory()
+        try:
+            inbox.receive(session, body("charge.success", 1, "r1"))
+            inbox.receive(session, body("charge.success", 2, "r1"))
+            inbox.process_pending()
+            inbox.process_pending()
+            event = session.query(WebhookEvent).filter(WebhookEvent.event_id == "charge.success:1").one()
+            assert event.status == "failed"
+            assert event.attempts == 2
+            assert event.last_error == "products not found"
+            # A failed event no longer holds up the reference
+            inbox.process_pending()
+            session.expire_all()
+            later = session.query(WebhookEvent).filter(WebhookEvent.event_id == "charge.success:2").one()
+            assert later.attempts == 1
+        finally:
+            session.close()
+
+def test_consumer_applies_new_events():
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = make_session_factory(directory)
+        applied = []
+        inbox = make_inbox(session_factory, lambda db, event, data: applied.append(data["id"]) or "ok")
+        session = session_factory()
+        try:
+            inbox.receive(session, body("charge.success", 1, "r1"))
+            deadline = time.monotonic() + 5
+            while not inbox.processed and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert applied == [1]
+            assert inbox.processed == 1
+        finally:
+            session.close()
+            inbox.close()
+
+if __name__ == "__main__":
+    test_redeliveries_are_stored_once()
+    test_events_of_a_reference_run_in_order()
+    test_gives_up_after_max_attempts()
+    test_consumer_applies_new_events()
+    print("✅ Webhook inbox tests passed")
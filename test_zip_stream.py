@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming ZIP writer used by product bundles
+"""
+
+import io
+import os
+import tempfile
+import zipfile
+from zip_stream import ZipStream, ZIP_DEFLATED, ZIP_STORED
+
+def test_round_trip():
+    with tempfile.TemporaryDirectory() as directory:
+        text_path = os.path.join(directory, "bot.mq4")
+        with open(text_path, "w") as f:
+            f.write("input int Period = 14;\n" * 2000)
+        image_path = os.path.join(directory, "chart.png")
+        image = os.urandom(4096)
+        with open(image_path, "wb") as f:
+            f.write(image)
+
+        bundle = ZipStream(chunk_size=1024)
+        bundle.add_bytes("Grid Bot/README.txt", "Customer: Adé".encode())
+        bundle.add_file(text_path, "Grid Bot/bot.mq4")
+        bundle.add_file(image_path, "Grid Bot/chart.png")
+        chunks = list(bundle)
+
+        # Data is produced incrementally rather than as one buffer
+        assert max(len(chunk) for chunk in chunks) <= 4096
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zip_file:
+            assert zip_file.testzip() is None
+            methods = {info.filename: info.compress_type for info in zip_file.infolist()}
+            assert methods == {
+                "Grid Bot/README.txt": ZIP_STORED,
+                "Grid Bot/bot.mq4": ZIP_DEFLATED,
+                "Grid Bot/chart.png": ZIP_STORED
+            }
+            assert zip_file.read("Grid Bot/README.txt").decode() == "Customer: Adé"
+            assert zip_file.read("Grid Bot/chart.png") == image
+
+def test_empty_archive():
+    with zipfile.ZipFile(io.BytesIO(b"".join(ZipStream()))) as zip_file:
+        assert zip_file.namelist() == []
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_empty_archive()
+    print("✅ Zip stream tests passed")
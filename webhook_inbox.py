@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, exists, func, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+from database import SessionLocal
+from models_mysql import WebhookEvent
+from config import settings
+from logging_config import safe_log
+
+# Applies one event: (session, event type, event data) -> outcome message; raises to retry
+WebhookHandler = Callable[[Session, str, Dict[str, Any]], str]
+
+# Longest wait between two attempts of a failing event
+MAX_RETRY_DELAY_SECONDS = 3600
+
+def event_key(payload: Dict[str, Any], body: bytes) -> str:
+    """Identity of a delivery: Paystack repeats the event name and data id on redelivery"""
+    event = payload.get("event") or "unknown"
+    data = payload.get("data") or {}
+    if isinstance(data, dict) and data.get("id") is not None:
+        return f"{event}:{data['id']}"
+    return f"{event}:sha256:{hashlib.sha256(body).hexdigest()}"
+
+class WebhookInbox:
+    """Durable inbox for payment provider webhooks.
+
+    The webhook endpoint only stores the raw event in ``webhook_events`` and
+    answers straight away; redeliveries of a stored event are recognised by
+    the unique event id and acknowledged without a new row. A consumer thread
+    in each worker applies stored events with ``handler``: events are claimed
+    with a conditional UPDATE, so each is applied by one worker, and an event
+    waits while an earlier event of the same reference is unfinished. Failed
+    events are retried with exponential backoff and given up on (``failed``)
+    after ``max_attempts``; events whose worker died are claimed again after
+    ``stale_seconds``.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        handler: Optional[WebhookHandler],
+        poll_interval_ms: int,
+        max_attempts: int,
+        retry_backoff_seconds: float,
+        stale_seconds: int,
+        batch_size: int = 50
+    ):
+        self.session_factory = session_factory
+        self.handler = handler
+        self.poll_interval = poll_interval_ms / 1000
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.stale_seconds = stale_seconds
+        self.batch_size = batch_size
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            # Threads do not survive fork; preloaded workers start their own
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._wakeup = False
+        self._lags: deque = deque(maxlen=1000)
+        self.processed = 0
+
+    def receive(self, db: Session, body: bytes, provider: str = "paystack") -> Tuple[Optional[WebhookEvent], bool]:
+        """Store a webhook delivery; returns the event and whether it is new.
+
+        Raises ``ValueError`` when the body is not a JSON object.
+        """
+        payload = json.loads(body)
+        if not isinstance(payload, dict):
+            raise ValueError("Webhook body is not a JSON object")
+        data = payload.get("data") if isinstance(payload.get("data"), dict) else {}
+        now = datetime.utcnow()
+        event = WebhookEvent(
+            event_id=event_key(payload, body),
+            provider=provider,
+            event_type=payload.get("event"),
+            reference=data.get("reference"),
+            payload=body.decode("utf-8"),
+            status="pending",
+            received_at=now,
+            available_at=now
+        )
+        db.add(event)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            existing = db.query(WebhookEvent).filter(WebhookEvent.event_id == event.event_id).first()
+            return existing, False
+        self.notify()
+        return event, True
+
+    def notify(self):
+        """Wake the consumer for a new event"""
+        with self._condition:
+            if self._closed or self.handler is None:
+                return
+            self._wakeup = True
+            self._start_thread()
+            self._condition.notify()
+
+    def start(self, handler: Optional[WebhookHandler] = None):
+        """Start the consumer; called from the app lifespan to drain the backlog"""
+        with self._condition:
+            if handler is not None:
+                self.handler = handler
+            self._closed = False
+            self._start_thread()
+
+    def _start_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="webhook-inbox", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                handled = self.process_pending()
+            except Exception as e:
+                safe_log("payment", "error", f"Webhook inbox consumer error: {e}")
+                handled = 0
+            with self._condition:
+                # Handled events may have unblocked later events of their reference
+                if not self._closed and not self._wakeup and not handled:
+                    self._condition.wait(self.poll_interval)
+                self._wakeup = False
+                if self._closed:
+                    return
+
+    def _next_events(self, session: Session, now: datetime) -> List[WebhookEvent]:
+        """Oldest due events that have no unfinished earlier event of the same reference"""
+        earlier = aliased(WebhookEvent)
+        blocked = exists().where(
+            earlier.reference == WebhookEvent.reference,
+            earlier.id != WebhookEvent.id,
+            earlier.status.in_(["pending", "processing"]),
+            or_(
+                earlier.received_at < WebhookEvent.received_at,
+                and_(earlier.received_at == WebhookEvent.received_at, earlier.id < WebhookEvent.id)
+            )
+        )
+        return session.query(WebhookEvent).filter(
+            or_(
+                and_(WebhookEvent.status == "pending", WebhookEvent.available_at <= now),
+                and_(WebhookEvent.status == "processing", WebhookEvent.locked_at < now - timedelta(seconds=self.stale_seconds))
+            ),
+            or_(WebhookEvent.reference.is_(None), ~blocked)
+        ).order_by(WebhookEvent.received_at, WebhookEvent.id).limit(self.batch_size).all()
+
+    def _claim(self, session: Session, event_id: str, now: datetime) -> bool:
+        claimed = session.execute(
+            update(WebhookEvent)
+            .where(
+                WebhookEvent.id == event_id,
+                or_(
+                    WebhookEvent.status == "pending",
+                    and_(WebhookEvent.status == "processing", WebhookEvent.locked_at < now - timedelta(seconds=self.stale_seconds))
+                )
+            )
+            .values(status="processing", locked_at=now, attempts=WebhookEvent.attempts + 1)
+        ).rowcount
+        session.commit()
+        return bool(claimed)
+
+    def process_pending(self) -> int:
+        """Apply the events that are due; returns how many were handled"""
+        session = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            events = [event.id for event in self._next_events(session, now)]
+        finally:
+            session.close()
+
+        # Later events of a reference are picked up by the next pass
+        return sum(self._process(event_id) for event_id in events)
+
+    def _process(self, event_id: str) -> bool:
+        session = self.session_factory()
+        try:
+            if not self._claim(session, event_id, datetime.utcnow()):
+                return False
+            event = session.get(WebhookEvent, event_id)
+            payload = json.loads(event.payload)
+            started = time.monotonic()
+            try:
+                outcome = self.handler(session, payload.get("event"), payload.get("data") or {})
+            except Exception as e:
+                session.rollback()
+                event = session.get(WebhookEvent, event_id)
+                self._retry_later(session, event, e)
+                return True
+
+            event = session.get(WebhookEvent, event_id)
+            event.status = "done"
+            event.processed_at = datetime.utcnow()
+            event.last_error = None
+            session.commit()
+            lag = (event.processed_at - event.received_at).total_seconds()
+            with self._condition:
+                self._lags.append(lag)
+                self.processed += 1
+            safe_log(
+                "payment", "info",
+                f"Webhook {event.event_type} {event.reference} processed in {(time.monotonic() - started) * 1000:.0f}ms "
+                f"({lag:.2f}s after receipt): {outcome}"
+            )
+            return True
+        finally:
+            session.close()
+
+    def _retry_later(self, session: Session, event: WebhookEvent, error: Exception):
+        event.last_error = str(error)[:500]
+        event.locked_at = None
+        if event.attempts >= self.max_attempts:
+            event.status = "failed"
+            safe_log("payment", "error", f"Webhook {event.event_type} {event.reference} failed after {event.attempts} attempts: {error}")
+        else:
+            delay = min(self.retry_backoff_seconds * 2 ** (event.attempts - 1), MAX_RETRY_DELAY_SECONDS)
+            event.status = "pending"
+            event.available_at = datetime.utcnow() + timedelta(seconds=delay)
+            safe_log("payment", "warning", f"Webhook {event.event_type} {event.reference} failed, retrying in {delay:.0f}s: {error}")
+        session.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Inbox backlog, age of the oldest unfinished event and retry counts"""
+        session = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            counts = dict(session.query(WebhookEvent.status, func.count(WebhookEvent.id)).group_by(WebhookEvent.status).all())
+            oldest = session.query(func.min(WebhookEvent.received_at)).filter(
+                WebhookEvent.status.in_(["pending", "processing"])
+            ).scalar()
+            retried, retries = session.query(
+                func.count(WebhookEvent.id), func.coalesce(func.sum(WebhookEvent.attempts - 1), 0)
+            ).filter(WebhookEvent.attempts > 1).one()
+        finally:
+            session.close()
+        with self._condition:
+            lags = sorted(self._lags)
+            processed = self.processed
+        return {
+            "pending": counts.get("pending", 0),
+            "processing": counts.get("processing", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "lag_seconds": round((now - oldest).total_seconds(), 3) if oldest else 0,
+            "retried_events": retried,
+            "retries": int(retries),
+            "processed_by_worker": processed,
+            "processing_lag_p50_seconds": round(lags[len(lags) // 2], 3) if lags else None,
+            "processing_lag_max_seconds": round(lags[-1], 3) if lags else None
+        }
+
+    def close(self):
+        """Stop the consumer; an event being applied is finished first"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=30)
+
+# Create global webhook inbox instance; the app lifespan starts it with its handler
+webhook_inbox = WebhookInbox(
+    SessionLocal,
+    handler=None,
+    poll_interval_ms=settings.webhook_poll_interval_ms,
+    max_attempts=settings.webhook_max_attempts,
+    retry_backoff_seconds=settings.webhook_retry_backoff_seconds,
+    stale_seconds=settings.webhook_stale_seconds
+)
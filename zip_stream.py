@@ -0,0 +1,252 @@
+import hashlib
+import os
+import struct
+import time
+import zlib
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# File types that are already compressed and are stored as-is
+STORED_EXTENSIONS = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".mp3", ".mp4", ".mov", ".pdf"
+}
+
+# Entries smaller than this are not worth deflating
+MIN_DEFLATE_SIZE = 512
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+# General purpose flags: sizes and CRC follow the data (bit 3), UTF-8 names (bit 11)
+FLAGS = 0x0008 | 0x0800
+
+ZIP32_LIMIT = 0xFFFFFFFF
+
+class _Entry(NamedTuple):
+    arcname: str
+    method: int
+    modified: float
+    path: Optional[str]
+    data: Optional[bytes]
+
+class _Written(NamedTuple):
+    name: bytes
+    method: int
+    dos_time: int
+    dos_date: int
+    crc: int
+    compressed_size: int
+    size: int
+    offset: int
+    zip64: bool
+
+def _dos_datetime(timestamp: float) -> Tuple[int, int]:
+    """Convert a timestamp to the DOS (time, date) pair used in ZIP headers"""
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    return (
+        (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+        ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    )
+
+# SHA-256 of files hashed by this process, by path, size and modification time
+_file_digests: Dict[Tuple[str, int, int], str] = {}
+
+def file_digest(path: str) -> str:
+    """Return the SHA-256 of a file, memoized for this process"""
+    stat = os.stat(path)
+    memo_key = (path, stat.st_size, stat.st_mtime_ns)
+    digest = _file_digests.get(memo_key)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                sha256.update(chunk)
+        digest = _file_digests[memo_key] = sha256.hexdigest()
+    return digest
+
+def choose_method(arcname: str, size: int) -> int:
+    """Store small and already-compressed files, deflate everything else"""
+    if size < MIN_DEFLATE_SIZE or os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS:
+        return ZIP_STORED
+    return ZIP_DEFLATED
+
+class ZipStream:
+    """ZIP archive written incrementally from a generator.
+
+    Entries are queued with ``add_file``/``add_bytes`` and the archive is
+    produced by iterating the stream: each entry's local header, its data and
+    a data descriptor (CRC and sizes, known only after the data) are yielded
+    as they are produced, followed by the central directory. Files are read
+    ``chunk_size`` bytes at a time, so memory use does not depend on the size
+    of the bundle and nothing is written to disk. ZIP64 records are used when
+    an entry or the archive outgrows the 4GB limits of the classic format.
+
+    The stream can be passed to ``StreamingResponse`` (as ``iter(stream)``)
+    or written to disk with ``write_to``.
+    """
+
+    def __init__(self, chunk_size: int = 64 * 1024, compresslevel: int = 6):
+        self.chunk_size = chunk_size
+        self.compresslevel = compresslevel
+        self._entries: List[_Entry] = []
+
+    def add_file(self, path: str, arcname: str, method: Optional[int] = None):
+        """Queue a file from disk; it is opened when the stream reaches it"""
+        stat = os.stat(path)
+        if method is None:
+            method = choose_method(arcname, stat.st_size)
+        self._entries.append(_Entry(arcname, method, stat.st_mtime, path, None))
+
+    def add_bytes(self, arcname: str, data: bytes, method: Optional[int] = None):
+        """Queue an in-memory entry, such as a generated README"""
+        if method is None:
+            method = choose_method(arcname, len(data))
+        self._entries.append(_Entry(arcname, method, time.time(), None, data))
+
+    def __iter__(self) -> Iterator[bytes]:
+        offset = 0
+        written: List[_Written] = []
+        for entry in self._entries:
+            for chunk, record in self._write_entry(entry, offset):
+                if record is not None:
+                    written.append(record)
+                offset += len(chunk)
+                yield chunk
+        yield from self._central_directory(written, offset)
+
+    def fingerprint(self, file_digest: Callable[[str], str]) -> str:
+        """Digest of the archive's contents: entry names, methods and data.
+
+        Timestamps are left out, so streams queued from the same files and
+        bytes share a fingerprint. ``file_digest`` hashes files from disk.
+        """
+        sha256 = hashlib.sha256()
+        for entry in self._entries:
+            data_digest = file_digest(entry.path) if entry.data is None else hashlib.sha256(entry.data).hexdigest()
+            sha256.update(f"{entry.arcname}\0{entry.method}\0{data_digest}\n".encode())
+        return sha256.hexdigest()
+
+    def identity(self) -> tuple:
+        """What the stream reads (entry names, methods, file paths and times, data digests).
+
+        Unlike ``fingerprint`` no file is read, so this is cheap enough to tell
+        apart concurrent builds in a request.
+        """
+        return tuple(
+            (entry.arcname, entry.method, entry.path, entry.modified if entry.data is None else hashlib.sha256(entry.data).hexdigest())
+            for entry in self._entries
+        )
+
+    def write_content_addressed(self, directory: str, key_length: int) -> Tuple[str, int, bool]:
+        """Write the archive to ``directory`` under its fingerprint, unless it is already there.
+
+        Returns the path, its size and whether the file already existed.
+        Meant for a worker process: hashing the files is part of the job.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.fingerprint(file_digest)[:key_length]}.zip")
+        if os.path.exists(path):
+            return path, os.path.getsize(path), True
+        return path, self.write_to(path), False
+
+    def write_to(self, path: str) -> int:
+        """Write the archive to ``path`` atomically and return its size.
+
+        Streams are picklable, so this can run in a worker process.
+        """
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                for chunk in self:
+                    f.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return os.path.getsize(path)
+
+    def _read_chunks(self, entry: _Entry) -> Iterator[bytes]:
+        if entry.data is not None:
+            yield entry.data
+            return
+        with open(entry.path, "rb") as f:
+            while chunk := f.read(self.chunk_size):
+                yield chunk
+
+    def _write_entry(self, entry: _Entry, offset: int) -> Iterator[Tuple[bytes, Optional[_Written]]]:
+        name = entry.arcname.encode("utf-8")
+        dos_time, dos_date = _dos_datetime(entry.modified)
+        expected_size = len(entry.data) if entry.data is not None else os.path.getsize(entry.path)
+        # Sizes are only known after the data, so ZIP64 is decided up front
+        # from the source size (deflate output of a >4GB file stays close to it)
+        zip64 = expected_size >= ZIP32_LIMIT or offset >= ZIP32_LIMIT
+        extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0) if zip64 else b""
+
+        yield struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 45 if zip64 else 20, FLAGS, entry.method,
+            dos_time, dos_date, 0, 0, 0, len(name), len(extra)
+        ) + name + extra, None
+
+        crc = 0
+        size = 0
+        compressed_size = 0
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15) if entry.method == ZIP_DEFLATED else None
+        for chunk in self._read_chunks(entry):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                compressed_size += len(chunk)
+                yield chunk, None
+        if compressor is not None:
+            chunk = compressor.flush()
+            compressed_size += len(chunk)
+            yield chunk, None
+
+        if not zip64 and max(size, compressed_size) >= ZIP32_LIMIT:
+            raise ValueError(f"{entry.arcname} grew past 4GB while being written")
+        size_format = "<IIQQ" if zip64 else "<IIII"
+        yield struct.pack(size_format, 0x08074B50, crc, compressed_size, size), _Written(
+            name, entry.method, dos_time, dos_date, crc, compressed_size, size, offset, zip64
+        )
+
+    def _central_directory(self, written: List[_Written], offset: int) -> Iterator[bytes]:
+        start = offset
+        for record in written:
+            zip64_fields = []
+            compressed_size, size, entry_offset = record.compressed_size, record.size, record.offset
+            if record.zip64 or size >= ZIP32_LIMIT:
+                zip64_fields.append(size)
+                size = ZIP32_LIMIT
+            if record.zip64 or compressed_size >= ZIP32_LIMIT:
+                zip64_fields.append(compressed_size)
+                compressed_size = ZIP32_LIMIT
+            if entry_offset >= ZIP32_LIMIT:
+                zip64_fields.append(entry_offset)
+                entry_offset = ZIP32_LIMIT
+            extra = struct.pack(f"<HH{len(zip64_fields)}Q", 0x0001, 8 * len(zip64_fields), *zip64_fields) if zip64_fields else b""
+            version = 45 if zip64_fields else 20
+            header = struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | version, version, FLAGS, record.method,
+                record.dos_time, record.dos_date, record.crc, compressed_size, size,
+                len(record.name), len(extra), 0, 0, 0, 0o100644 << 16, entry_offset
+            ) + record.name + extra
+            offset += len(header)
+            yield header
+
+        count = len(written)
+        directory_size = offset - start
+        if count >= 0xFFFF or directory_size >= ZIP32_LIMIT or start >= ZIP32_LIMIT:
+            yield struct.pack(
+                "<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, directory_size, start
+            ) + struct.pack("<IIQI", 0x07064B50, 0, offset, 1)
+            yield struct.pack(
+                "<IHHHHIIH", 0x06054B50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                min(directory_size, ZIP32_LIMIT), min(start, ZIP32_LIMIT), 0
+            )
+        else:
+            yield struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, directory_size, start, 0)